@@ -0,0 +1,207 @@
+"""
+단계별 입장 제어(admission control) + 부하 차단(load shedding)
+- 단계 종류(cpu: rembg 추론, llm: Gemini 호출)마다 동시 실행 수 + 대기열 길이 상한 (StageLimiter)
+- 대기열이 가득 찼거나 ADMISSION_<STAGE>_MAX_WAIT_SEC 안에 차례가 오지 않으면 Overloaded
+  → main.py에서 429 + Retry-After. 요청 입구에서 check()로 먼저 확인해 일을 시작하기 전에 거절
+- 대기 시간(queue wait)과 처리 시간(service time)을 따로 기록 (/metrics, Server-Timing의 queue_<stage>)
+- 비동기 작업(job)처럼 기다려도 되는 경로는 patient() 안에서 실행 → 대기열 상한/대기 시간 제한 없이 순서대로
+스토리지 업로드는 이미 크기가 제한된 write-behind 큐(storage.UploadQueue) → 대기/처리 시간만 observe()로 기록
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+import metrics
+
+# 단계별 대기열 길이 기본값 = 동시 실행 수 x 이 배수 (ADMISSION_<STAGE>_QUEUE로 직접 지정, 0이면 제한 없음)
+ADMISSION_QUEUE_FACTOR = int(os.getenv("ADMISSION_QUEUE_FACTOR", 4))
+# 대기열에서 기다리는 최대 시간 기본값 (ADMISSION_<STAGE>_MAX_WAIT_SEC, 0이면 제한 없음)
+ADMISSION_MAX_WAIT_SEC = float(os.getenv("ADMISSION_MAX_WAIT_SEC", 10))
+ADMISSION_RETRY_AFTER_MAX_SEC = int(os.getenv("ADMISSION_RETRY_AFTER_MAX_SEC", 30))
+
+WAIT_SECONDS = metrics.REGISTRY.histogram("core_d_admission_wait_seconds", "단계별 대기열 대기 시간 (초)", ["stage"])
+SERVICE_SECONDS = metrics.REGISTRY.histogram(
+    "core_d_admission_service_seconds", "단계별 처리 시간 (초, 대기 제외)", ["stage"]
+)
+REJECTED = metrics.REGISTRY.counter(
+    "core_d_admission_rejected_total", "부하 차단으로 거절된 요청 수 (early/queue_full/wait_timeout)", ["stage", "reason"]
+)
+
+_patient: contextvars.ContextVar[bool] = contextvars.ContextVar("admission_patient", default=False)
+
+
+class Overloaded(Exception):
+    """단계 대기열이 가득 참 → 429 + Retry-After"""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"요청이 많아 처리할 수 없습니다 ({stage}). {retry_after}초 후 다시 시도해주세요.")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+@contextmanager
+def patient():
+    """이 안에서(만들어진 태스크 포함) 잡는 슬롯은 거절하지 않고 차례를 기다림"""
+    token = _patient.set(True)
+    try:
+        yield
+    finally:
+        _patient.reset(token)
+
+
+def shed(stage: str, retry_after: int, reason: str = "early") -> Overloaded:
+    """거절 카운터를 올리고 던질 예외 반환 (StageLimiter 밖에서 판단하는 단계용)"""
+    REJECTED.inc(stage=stage, reason=reason)
+    return Overloaded(stage, retry_after)
+
+
+def observe(stage: str, wait: float, service: float) -> None:
+    """StageLimiter 밖에서 대기/처리하는 단계(업로드 큐 등)의 시간 기록"""
+    WAIT_SECONDS.observe(wait, stage=stage)
+    SERVICE_SECONDS.observe(service, stage=stage)
+
+
+class StageLimiter:
+    """
+    동시 실행 수 제한 + 길이 제한 FIFO 대기열. 이벤트 루프 스레드에서만 사용.
+    acquire()는 시작 시각을 돌려주고 release(started)에 그대로 전달 (처리 시간 기록).
+    """
+
+    def __init__(self, stage: str, concurrency: int, max_queue: int, max_wait: float):
+        self.stage = stage
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # 처리 시간 지수 이동 평균 → 예상 대기 시간 / Retry-After
+        self._service_ewma: Optional[float] = None
+        self.counters = {"admitted": 0, "queued": 0, "early": 0, "queue_full": 0, "wait_timeout": 0}
+
+    @classmethod
+    def from_env(cls, stage: str, concurrency: int) -> "StageLimiter":
+        """ADMISSION_<STAGE>_QUEUE / ADMISSION_<STAGE>_MAX_WAIT_SEC 설정으로 생성"""
+        env = f"ADMISSION_{stage.upper()}"
+        return cls(
+            stage,
+            concurrency,
+            int(os.getenv(f"{env}_QUEUE", max(1, concurrency) * ADMISSION_QUEUE_FACTOR)),
+            float(os.getenv(f"{env}_MAX_WAIT_SEC", ADMISSION_MAX_WAIT_SEC)),
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """지금 들어오면 기다릴 시간 추정 (초)"""
+        if self.active < self.concurrency:
+            return 0.0
+        return (self._service_ewma or 0.0) * (self.waiting + 1) / self.concurrency
+
+    def retry_after(self) -> int:
+        return max(1, min(ADMISSION_RETRY_AFTER_MAX_SEC, math.ceil(self.expected_wait())))
+
+    def check(self) -> None:
+        """요청 입구에서 확인 - 지금 들어오면 거절될 상황이면 Overloaded (슬롯은 잡지 않음)"""
+        if _patient.get():
+            return
+        if self._queue_full() or (self.max_wait > 0 and self.expected_wait() > self.max_wait):
+            self._reject("early")
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        슬롯을 잡고 시작 시각 반환. 대기열이 가득 찼거나 max_wait 안에 못 잡으면 Overloaded,
+        호출 측 timeout(데드라인)이 먼저 끝나면 TimeoutError.
+        """
+        t0 = time.perf_counter()
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+        else:
+            patient = _patient.get()
+            if not patient and self._queue_full():
+                self._reject("queue_full")
+            limit = timeout
+            shedding = not patient and self.max_wait > 0 and (limit is None or self.max_wait < limit)
+            if shedding:
+                limit = self.max_wait
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            self.counters["queued"] += 1
+            try:
+                await asyncio.wait((fut,), timeout=limit)
+            except asyncio.CancelledError:
+                self._abandon(fut)
+                raise
+            if not fut.done():
+                self._abandon(fut)
+                if shedding:
+                    self._reject("wait_timeout")
+                raise TimeoutError(f"{self.stage} 대기 시간 초과")
+        started = time.perf_counter()
+        wait = started - t0
+        self.counters["admitted"] += 1
+        WAIT_SECONDS.observe(wait, stage=self.stage)
+        if wait > 0.001:
+            metrics.record(f"queue_{self.stage}", wait)
+        return started
+
+    def release(self, started: float) -> None:
+        service = time.perf_counter() - started
+        SERVICE_SECONDS.observe(service, stage=self.stage)
+        self._service_ewma = service if self._service_ewma is None else 0.8 * self._service_ewma + 0.2 * service
+        self._release_slot()
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        started = await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "max_wait_sec": self.max_wait,
+            "service_ms_ewma": round(self._service_ewma * 1000, 1) if self._service_ewma is not None else None,
+            **self.counters,
+        }
+
+    # ---- 내부 ----------------------------------------------------------------
+
+    def _queue_full(self) -> bool:
+        return self.max_queue > 0 and self.active >= self.concurrency and self.waiting >= self.max_queue
+
+    def _reject(self, reason: str):
+        self.counters[reason] += 1
+        raise shed(self.stage, self.retry_after(), reason)
+
+    def _release_slot(self) -> None:
+        # 다음 대기자에게 슬롯을 그대로 넘김 (active 유지), 없으면 반납
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def _abandon(self, fut: asyncio.Future) -> None:
+        if fut.done() and not fut.cancelled():
+            # 포기하는 순간 슬롯을 넘겨받았으면 다음 대기자에게
+            self._release_slot()
+            return
+        fut.cancel()
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
@@ -0,0 +1 @@
+"""백엔드 성능 측정 스크립트 모음 (backend/ 에서 `python -m bench.<name>` 으로 실행)"""
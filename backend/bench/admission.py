@@ -0,0 +1,226 @@
+"""
+부하 차단 벤치마크 - 지속 가능한 부하의 1배/2배(--loads)를 열린 루프(포아송 도착)로 /api/analyze 에 보내
+입장 제어 켜짐(shed) / 꺼짐(unbounded) 각각에서 받아들여진 요청의 p50/p99 지연, 429 수, 실패 수를 비교
+
+서버는 bench/load.py와 같은 방식(별도 프로세스 + 가짜 외부 서비스, 기본 가짜 rembg)으로 띄움.
+처리 용량 = REMBG_WORKERS(--workers) / rembg 추론 시간(--rembg-ms), 지속 가능한 부하 = 용량 x --utilization.
+요청마다 다른 이미지를 보내 배경 제거 캐시 적중을 막음.
+
+--check: shed 모드에서 가장 높은 부하의 p99가 첫 부하 p99보다 --tolerance 이상 크면 종료 코드 1
+
+    cd backend
+    python -m bench.admission
+    python -m bench.admission --duration 30 --loads 1 2 3 --check --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bench.load import _free_port, _percentile, _start_server, make_image
+
+# 입장 제어 끔: 대기열/대기 시간 제한 없음 (기존 동작)
+_UNBOUNDED_ENV = {"ADMISSION_CPU_QUEUE": "0", "ADMISSION_LLM_QUEUE": "0", "ADMISSION_MAX_WAIT_SEC": "0"}
+_ADMISSION_ENV = ("ADMISSION_CPU_QUEUE", "ADMISSION_LLM_QUEUE", "ADMISSION_MAX_WAIT_SEC")
+
+
+def _server_args(args, port: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        port=port, gemini_ms=args.gemini_ms, gemini_failure=0.0, youtube_ms=50, youtube_failure=0.0,
+        storage_ms=20, storage_failure=0.0, rembg="fake", rembg_ms=args.rembg_ms, jitter=args.jitter, seed=args.seed,
+    )
+
+
+async def _wait_ready(client, server) -> None:
+    import httpx
+
+    for _ in range(600):
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            raise SystemExit("서버 프로세스가 시작하지 못했습니다.")
+        await asyncio.sleep(0.1)
+    raise SystemExit("서버가 준비되지 않았습니다.")
+
+
+async def _open_loop(client, rate: float, duration: float, images, rng: random.Random, timeout: float) -> dict:
+    """포아송 도착으로 duration초 동안 요청 (응답을 기다리지 않고 다음 요청 발사)"""
+    data = {"aesthetic": "모리걸", "personal_color": "봄 웜"}
+    ok_ms, shed_ms, retry_after = [], [], []
+    outcomes = {"ok": 0, "shed": 0, "app_error": 0, "http_error": 0, "timeout": 0}
+
+    async def one(content: bytes) -> None:
+        t = time.perf_counter()
+        try:
+            r = await asyncio.wait_for(
+                client.post("/api/analyze", files={"file": ("a.jpg", content, "image/jpeg")}, data=data), timeout
+            )
+        except asyncio.TimeoutError:
+            outcomes["timeout"] += 1
+            return
+        except Exception:
+            outcomes["http_error"] += 1
+            return
+        ms = (time.perf_counter() - t) * 1000
+        if r.status_code == 429:
+            outcomes["shed"] += 1
+            shed_ms.append(ms)
+            retry_after.append(int(r.headers.get("retry-after", 0)))
+        elif r.status_code == 200 and r.json().get("success"):
+            outcomes["ok"] += 1
+            ok_ms.append(ms)
+        elif r.status_code == 200:
+            outcomes["app_error"] += 1
+        else:
+            outcomes["http_error"] += 1
+
+    tasks, sent = [], 0
+    t0 = time.perf_counter()
+    next_at = 0.0
+    while next_at < duration:
+        delay = next_at - (time.perf_counter() - t0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(images[sent % len(images)])))
+        sent += 1
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - t0
+    ok_ms.sort()
+    return {
+        "sent": sent,
+        **outcomes,
+        "goodput_rps": round(outcomes["ok"] / wall, 2),
+        "p50_ms": round(_percentile(ok_ms, 0.50), 1),
+        "p99_ms": round(_percentile(ok_ms, 0.99), 1),
+        "max_ms": round(ok_ms[-1], 1) if ok_ms else 0.0,
+        "shed_p50_ms": round(statistics.median(shed_ms), 1) if shed_ms else None,
+        "retry_after_sec": statistics.median(retry_after) if retry_after else None,
+    }
+
+
+async def _run_mode(args, mode: str, images) -> dict:
+    import httpx
+
+    saved = {k: os.environ.get(k) for k in (*_ADMISSION_ENV, "REMBG_WORKERS")}
+    os.environ["REMBG_WORKERS"] = str(args.workers)
+    for k in _ADMISSION_ENV:
+        os.environ.pop(k, None)
+    if mode == "unbounded":
+        os.environ.update(_UNBOUNDED_ENV)
+
+    capacity = args.workers * 1000 / args.rembg_ms
+    sustainable = capacity * args.utilization
+    rng = random.Random(args.seed)
+    levels = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="core-d-admission-") as workdir:
+            port = _free_port()
+            server = _start_server(_server_args(args, port), workdir)
+            try:
+                limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+                    await _wait_ready(client, server)
+                    offset = 0
+                    for load in args.loads:
+                        rate = sustainable * load
+                        # 부하 단계마다 처음 보는 이미지
+                        count = int(rate * args.duration * 1.5) + 10
+                        batch = images[offset:offset + count] or images
+                        offset += count
+                        result = await _open_loop(client, rate, args.duration, batch, rng, args.timeout)
+                        levels.append({"load": load, "offered_rps": round(rate, 2), **result})
+                        # 다음 단계 전에 밀린 요청 정리
+                        await asyncio.sleep(args.cooldown)
+                    stats = (await client.get("/api/cache/stats")).json().get("admission")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return {
+        "mode": mode,
+        "capacity_rps": round(capacity, 2),
+        "sustainable_rps": round(sustainable, 2),
+        "levels": levels,
+        "admission": stats,
+    }
+
+
+def check_stable(run: dict, tolerance: float) -> list[str]:
+    levels = run["levels"]
+    if len(levels) < 2:
+        return []
+    base, top = levels[0], levels[-1]
+    if top["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+        return [
+            f"{run['mode']}: 부하 x{base['load']} → x{top['load']} 받아들인 요청 p99 "
+            f"{base['p99_ms']} → {top['p99_ms']} ms (허용 {tolerance:.0%})"
+        ]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["shed", "unbounded"], default=["shed", "unbounded"])
+    parser.add_argument("--loads", type=float, nargs="+", default=[1.0, 2.0], help="지속 가능한 부하 대비 배수")
+    parser.add_argument("--utilization", type=float, default=0.8, help="처리 용량 대비 지속 가능한 부하")
+    parser.add_argument("--duration", type=float, default=20, help="부하 단계별 요청 발사 시간 (초)")
+    parser.add_argument("--cooldown", type=float, default=2)
+    parser.add_argument("--workers", type=int, default=2, help="서버 REMBG_WORKERS")
+    parser.add_argument("--rembg-ms", type=float, default=200)
+    parser.add_argument("--gemini-ms", type=float, default=300)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=120, help="요청 1건 클라이언트 타임아웃 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sustainable = args.workers * 1000 / args.rembg_ms * args.utilization
+    total = int(sum(sustainable * load * args.duration * 1.5 + 10 for load in args.loads))
+    images = [make_image(320, 400, "JPEG", rng) for _ in range(total)]
+
+    runs = [asyncio.run(_run_mode(args, mode, images)) for mode in args.modes]
+    failures = [line for run in runs if run["mode"] == "shed" for line in check_stable(run, args.tolerance)]
+    failures = failures if args.check else []
+
+    if args.json:
+        print(json.dumps({"runs": runs, "failures": failures}, ensure_ascii=False))
+    else:
+        for run in runs:
+            print(f"\n[{run['mode']}] 용량 {run['capacity_rps']} rps, 지속 가능 {run['sustainable_rps']} rps "
+                  f"(REMBG_WORKERS={args.workers}, rembg {args.rembg_ms:.0f} ms)")
+            print(f"{'부하':>5}{'rps':>7}{'보냄':>6}{'ok':>6}{'429':>6}{'실패':>6}{'goodput':>9}"
+                  f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'429 ms':>8}{'Retry':>6}")
+            for r in run["levels"]:
+                failed = r["app_error"] + r["http_error"] + r["timeout"]
+                shed_ms = "-" if r["shed_p50_ms"] is None else f"{r['shed_p50_ms']:.0f}"
+                retry = "-" if r["retry_after_sec"] is None else f"{r['retry_after_sec']}"
+                print(f"{'x' + str(r['load']):>5}{r['offered_rps']:>7.1f}{r['sent']:>6}{r['ok']:>6}{r['shed']:>6}"
+                      f"{failed:>6}{r['goodput_rps']:>9.2f}{r['p50_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['max_ms']:>9.0f}"
+                      f"{shed_ms:>8}{retry:>6}")
+        for line in failures:
+            print(f"실패: {line}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
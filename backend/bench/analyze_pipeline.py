@@ -0,0 +1,85 @@
+"""
+/api/analyze 스테이지 그래프 벤치마크 (외부 서비스 지연을 sleep으로 모델링)
+
+sequential: 기존 순서 - rembg → 트렌드 → 분류 → 추천
+graph     : main._analyze_pipeline 과 같은 의존 그래프 - rembg ∥ (축소 → 분류 → 추천)
+
+두 방식 모두 pipeline.Pipeline 으로 실행하므로 스케줄링 오버헤드는 동일.
+
+    cd backend
+    python -m bench.analyze_pipeline --rembg-ms 1800 --classify-ms 1500 --recommend-ms 3000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+
+from pipeline import Pipeline, Stage
+
+
+def _sleeper(mean_ms: float, jitter: float):
+    async def fn(**_inputs):
+        await asyncio.sleep(max(0.0, random.gauss(mean_ms, mean_ms * jitter)) / 1000)
+    return fn
+
+
+def build(mode: str, args) -> Pipeline:
+    s = lambda ms: _sleeper(ms, args.jitter)  # noqa: E731
+    if mode == "sequential":
+        return Pipeline([
+            Stage("cutout", s(args.rembg_ms)),
+            Stage("trends", s(args.trends_ms), deps=("cutout",)),
+            Stage("classify", s(args.classify_ms), deps=("trends",)),
+            Stage("recommend", s(args.recommend_ms), deps=("classify",)),
+        ])
+    return Pipeline([
+        Stage("cutout", s(args.rembg_ms)),
+        Stage("preview", s(args.preview_ms)),
+        Stage("trends", s(0)),  # 트렌드 캐시 조회
+        Stage("classify", s(args.classify_ms), deps=("preview",)),
+        Stage("recommend", s(args.recommend_ms), deps=("classify", "trends", "preview")),
+    ])
+
+
+async def measure(mode: str, args) -> dict:
+    samples, paths = [], {}
+    for _ in range(args.iterations):
+        run = await build(mode, args).run()
+        samples.append(run.critical_path_ms)
+        key = ">".join(run.critical_path)
+        paths[key] = paths.get(key, 0) + 1
+    samples.sort()
+    return {
+        "mode": mode,
+        "p50_ms": round(statistics.median(samples), 1),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 1),
+        "critical_paths": paths,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rembg-ms", type=float, default=1800)
+    parser.add_argument("--preview-ms", type=float, default=40)
+    parser.add_argument("--trends-ms", type=float, default=0, help="sequential 모드의 인라인 트렌드 수집 시간 (캐시 도입 전 비교용)")
+    parser.add_argument("--classify-ms", type=float, default=1500)
+    parser.add_argument("--recommend-ms", type=float, default=3000)
+    parser.add_argument("--jitter", type=float, default=0.2, help="지연 표준편차 (평균 대비 비율)")
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [await measure("sequential", args), await measure("graph", args)]
+    results.append({"speedup_p50": round(results[0]["p50_ms"] / results[1]["p50_ms"], 2)})
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    for r in results[:2]:
+        print(f"{r['mode']:>10}: p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms  paths {r['critical_paths']}")
+    print(f"p50 speedup: x{results[2]['speedup_p50']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+배경 제거 동시성 벤치마크
+
+before: 기존 방식 - async 핸들러 안에서 세션 없이 rembg.remove() 직접 호출
+after : BackgroundRemover - 웜 세션 + 워커 풀에서 await
+
+동시에 도는 헬스체크 프로브(20ms 주기)의 지연으로 이벤트 루프 블로킹 정도도 함께 측정.
+
+    cd backend
+    python -m bench.bg_removal --requests 16 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import time
+
+from bg_removal import BackgroundRemover
+
+
+def make_sample(width: int, height: int) -> bytes:
+    """단색 배경 위 옷 모양 도형 - 모델 다운로드 외 외부 파일 불필요"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (width, height), (235, 235, 230))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((width // 4, height // 5, width * 3 // 4, height * 4 // 5), fill=(40, 70, 140))
+    draw.ellipse((width // 3, height // 8, width * 2 // 3, height // 3), fill=(235, 235, 230))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def _inline(content: bytes) -> None:
+    from PIL import Image
+    from rembg import remove
+
+    img = Image.open(io.BytesIO(content)).convert("RGBA")
+    output_img = remove(img)
+    output_img.save(io.BytesIO(), format="PNG")
+
+
+async def _probe(stop: asyncio.Event, lags: list[float], interval: float = 0.02) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - t0 - interval)
+
+
+async def run_mode(name: str, handler, content: bytes, requests: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await handler(content)
+            latencies.append(time.perf_counter() - t0)
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(_probe(stop, lags))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await probe
+
+    latencies.sort()
+    return {
+        "mode": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_sec": round(requests / elapsed, 3),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "latency_max_ms": round(latencies[-1] * 1000, 1),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="BackgroundRemover 워커 수 (기본: REMBG_WORKERS)")
+    parser.add_argument("--size", type=int, nargs=2, default=(1024, 1280), metavar=("W", "H"))
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 한 줄로 출력")
+    args = parser.parse_args()
+
+    content = make_sample(*args.size)
+    engine = BackgroundRemover(**({"workers": args.workers} if args.workers else {}))
+    await engine.warmup()
+
+    results = [
+        await run_mode("before", _inline, content, args.requests, args.concurrency),
+        await run_mode("after", engine.cutout, content, args.requests, args.concurrency),
+    ]
+    engine.shutdown()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    for r in results:
+        print(
+            f"{r['mode']:>6}: {r['requests_per_sec']:7.2f} req/s  "
+            f"p50 {r['latency_p50_ms']:8.1f} ms  max {r['latency_max_ms']:8.1f} ms  "
+            f"loop lag max {r['loop_lag_max_ms']:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
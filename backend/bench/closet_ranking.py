@@ -0,0 +1,84 @@
+"""
+내 옷장 로컬 후보 순위 벤치마크 (LLM 폴백 경로의 지연)
+
+옷장 크기별로 rank_candidates 1회 지연(p50/p95)과 아이템당 color_histogram 계산 시간을 측정.
+히스토그램은 업로드 시 저장되므로 요청 경로에서는 순위 계산만 발생.
+
+    cd backend
+    python -m bench.closet_ranking --sizes 10 100 1000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from closet_ranking import HIST_SIZE, PERSONAL_COLOR_PALETTES, color_histogram, rank_candidates
+
+TYPES = ["이너", "하의", "아우터"]
+
+
+def _random_hist(rng: random.Random) -> list[float]:
+    hist = [0.0] * HIST_SIZE
+    for _ in range(3):
+        hist[rng.randrange(HIST_SIZE)] += rng.random()
+    total = sum(hist)
+    return [v / total for v in hist]
+
+
+def _histogram_ms(iterations: int) -> float:
+    from PIL import Image
+
+    img = Image.new("RGBA", (1024, 1024), (0, 0, 0, 0))
+    img.paste(Image.new("RGBA", (600, 800), (120, 80, 200, 255)), (200, 100))
+    samples = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        color_histogram(img)
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def measure(size: int, iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    items = [(f"item-{i}", rng.choice(TYPES), _random_hist(rng)) for i in range(size)]
+    selected = _random_hist(rng)
+    personal_colors = list(PERSONAL_COLOR_PALETTES)
+    rank_candidates("하의", selected, items, personal_colors[0])  # 행렬 캐시 워밍업
+
+    samples = []
+    for i in range(iterations):
+        t = time.perf_counter()
+        rank_candidates("하의", selected, items, personal_colors[i % len(personal_colors)])
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    return {
+        "wardrobe_size": size,
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        "histogram_ms": round(_histogram_ms(20), 3),
+        "rank": [measure(size, args.iterations, args.seed) for size in args.sizes],
+    }
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    print(f"color_histogram (1024px 컷아웃): {results['histogram_ms']:.2f} ms")
+    for r in results["rank"]:
+        print(f"옷장 {r['wardrobe_size']:>5}벌: p50 {r['p50_ms']:7.3f} ms  p95 {r['p95_ms']:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
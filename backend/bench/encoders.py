@@ -0,0 +1,144 @@
+"""
+컷아웃 인코더 벤치마크 - 인코딩 시간, 디코딩 시간, 출력 크기, (손실 인코더) 화질
+
+코퍼스: 옷 모양 RGBA 컷아웃 합성 (질감 있는 천 + 부드러운 알파 가장자리 + 완전 투명 배경)
+또는 --corpus 디렉터리의 컷아웃 PNG (예: backend/.cache/images).
+인코더는 encoders.ENCODERS 전체, 크기는 원본(IMAGE_MAX_SIDE_PREVIEW로 축소된 컷아웃)과 thumb.
+화질: 알파를 곱한(premultiplied) RGB PSNR, 알파 최대 오차 - 무손실이면 inf / 0.
+
+    cd backend
+    python -m bench.encoders --count 12
+    python -m bench.encoders --corpus .cache/images --json
+"""
+
+import argparse
+import io
+import json
+import math
+import random
+import statistics
+import time
+from pathlib import Path
+
+import encoders
+import imaging
+
+
+def make_cutout(width: int, height: int, rng: random.Random):
+    """배경이 완전 투명한 옷 모양 RGBA (rembg 출력과 비슷한 가장자리/질감)"""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter
+
+    np_rng = np.random.default_rng(rng.randrange(2**32))
+    base = np.array([rng.randrange(20, 220) for _ in range(3)], dtype=np.int16)
+    # 천 질감: 저주파 얼룩 + 고주파 직조 노이즈
+    blotch = np_rng.integers(-30, 30, size=(height // 16 + 1, width // 16 + 1, 3), dtype=np.int16)
+    blotch = np.asarray(Image.fromarray((blotch + 128).astype(np.uint8)).resize((width, height)), dtype=np.int16) - 128
+    weave = np_rng.integers(-10, 10, size=(height, width, 3), dtype=np.int16)
+    rgb = np.clip(base + blotch + weave, 0, 255).astype(np.uint8)
+
+    mask = Image.new("L", (width, height), 0)
+    draw = ImageDraw.Draw(mask)
+    w, h = width, height
+    draw.rectangle((w // 4, h // 5, w * 3 // 4, h * 9 // 10), fill=255)
+    draw.polygon([(w // 4, h // 5), (w // 12, h * 3 // 5), (w // 4, h * 3 // 5)], fill=255)
+    draw.polygon([(w * 3 // 4, h // 5), (w * 11 // 12, h * 3 // 5), (w * 3 // 4, h * 3 // 5)], fill=255)
+    draw.ellipse((w * 2 // 5, h // 7, w * 3 // 5, h // 4), fill=0)
+    mask = mask.filter(ImageFilter.GaussianBlur(2))
+
+    img = Image.fromarray(rgb, "RGB").convert("RGBA")
+    img.putalpha(mask)
+    # rembg naive_cutout처럼 투명 영역의 색은 0
+    return Image.composite(img, Image.new("RGBA", img.size, (0, 0, 0, 0)), mask)
+
+
+def load_corpus(args):
+    from PIL import Image
+
+    if args.corpus:
+        paths = sorted(Path(args.corpus).glob("*.png"))[: args.count]
+        if not paths:
+            raise SystemExit(f"{args.corpus}에 PNG가 없습니다.")
+        return [Image.open(p).convert("RGBA") for p in paths]
+    rng = random.Random(args.seed)
+    sizes = [(768, 1024), (1024, 1024), (1024, 768), (640, 960)]
+    return [imaging.downscale(make_cutout(*rng.choice(sizes), rng), "preview") for _ in range(args.count)]
+
+
+def quality(original, decoded) -> tuple[float, int]:
+    """(premultiplied RGB PSNR dB, 알파 최대 오차)"""
+    import numpy as np
+
+    a = np.asarray(original.convert("RGBA"), dtype=np.float64)
+    b = np.asarray(decoded.convert("RGBA"), dtype=np.float64)
+    pa = a[..., :3] * a[..., 3:4] / 255
+    pb = b[..., :3] * b[..., 3:4] / 255
+    mse = float(np.mean((pa - pb) ** 2))
+    psnr = math.inf if mse == 0 else 10 * math.log10(255**2 / mse)
+    return psnr, int(np.abs(a[..., 3] - b[..., 3]).max())
+
+
+def measure(images, name: str, size: str, repeat: int) -> dict:
+    from PIL import Image
+
+    encode_ms, decode_ms, sizes, psnrs, alpha_err = [], [], [], [], 0
+    for img in images:
+        src = encoders.thumbnail(img) if size == "thumb" else img
+        best_enc = best_dec = math.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            data = encoders.encode(src, name)
+            best_enc = min(best_enc, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            decoded = Image.open(io.BytesIO(data))
+            decoded.load()
+            best_dec = min(best_dec, time.perf_counter() - t0)
+        encode_ms.append(best_enc * 1000)
+        decode_ms.append(best_dec * 1000)
+        sizes.append(len(data))
+        psnr, err = quality(src, decoded)
+        psnrs.append(psnr)
+        alpha_err = max(alpha_err, err)
+    return {
+        "encoder": name,
+        "size": size,
+        "lossless": encoders.ENCODERS[name].lossless,
+        "encode_ms": round(statistics.median(encode_ms), 2),
+        "decode_ms": round(statistics.median(decode_ms), 2),
+        "mean_kb": round(statistics.fmean(sizes) / 1024, 1),
+        "min_psnr_db": None if min(psnrs) == math.inf else round(min(psnrs), 2),
+        "max_alpha_error": alpha_err,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="컷아웃 PNG 디렉터리 (없으면 합성)")
+    parser.add_argument("--count", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3, help="이미지당 반복 (최솟값 사용)")
+    parser.add_argument("--encoders", nargs="+", choices=list(encoders.ENCODERS), default=list(encoders.ENCODERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    images = load_corpus(args)
+    results = [measure(images, name, size, args.repeat) for size in encoders.SIZES for name in args.encoders]
+    # 기준: 원본 크기의 현재 원본 인코더(png)
+    base = next((r for r in results if (r["encoder"], r["size"]) == (encoders.MASTER, "original")), None)
+    for r in results:
+        r["size_vs_png"] = round(r["mean_kb"] / base["mean_kb"], 3) if base else None
+
+    if args.json:
+        print(json.dumps({"images": len(images), "results": results}, ensure_ascii=False))
+        return
+    print(f"컷아웃 {len(images)}장 ({'--corpus ' + args.corpus if args.corpus else '합성'}), 반복 {args.repeat}회 중 최솟값의 중앙값")
+    print(f"{'encoder':<11}{'size':<10}{'enc ms':>8}{'dec ms':>8}{'KB':>9}{'vs png':>8}{'PSNR':>8}{'αerr':>6}")
+    for r in results:
+        psnr = "∞" if r["min_psnr_db"] is None else f"{r['min_psnr_db']:.1f}"
+        ratio = "-" if r["size_vs_png"] is None else f"{r['size_vs_png']:.2f}"
+        print(f"{r['encoder']:<11}{r['size']:<10}{r['encode_ms']:>8.1f}{r['decode_ms']:>8.1f}"
+              f"{r['mean_kb']:>9.1f}{ratio:>8}{psnr:>8}{r['max_alpha_error']:>6}")
+
+
+if __name__ == "__main__":
+    main()
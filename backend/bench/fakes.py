@@ -0,0 +1,229 @@
+"""
+벤치마크/부하 테스트용 로컬 가짜 외부 서비스 (Gemini, YouTube, Supabase Storage, rembg 세션)
+
+- 서비스마다 지연(평균 + 지터)과 실패율을 설정 (FakeLatency)
+- Gemini 응답은 각 프롬프트가 요구하는 JSON 형식의 고정 응답 (canned_response)
+- install(main, ...): 앱 모듈의 클라이언트/팩토리를 가짜로 교체. lifespan 시작(앱 기동) 전에 호출.
+
+    import main
+    from bench import fakes
+    fakes.install(main, gemini=fakes.FakeLatency(800, failure_rate=0.02))
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+
+from bg_removal import TIERS
+from storage import StorageBackend
+
+ITEM_TYPES = ["아우터", "이너", "하의"]
+
+
+class FakeServiceError(RuntimeError):
+    # 일시적 장애(503)로 취급 → LLM 게이트웨이 재시도 대상
+    code = 503
+
+
+@dataclass
+class FakeLatency:
+    mean_ms: float
+    jitter: float = 0.2  # 표준편차 (평균 대비 비율)
+    failure_rate: float = 0.0
+
+    def __post_init__(self):
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def seed(self, seed: int) -> "FakeLatency":
+        self._rng.seed(seed)
+        return self
+
+    def draw(self, what: str) -> float:
+        """지연(초)을 뽑고, 실패로 뽑히면 지연 후 던질 예외를 함께 결정"""
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.mean_ms, self.mean_ms * self.jitter)) / 1000
+            failed = self._rng.random() < self.failure_rate
+        return delay if not failed else -delay - 1e-9
+
+    def sleep_sync(self, what: str) -> None:
+        delay = self.draw(what)
+        time.sleep(abs(delay))
+        if delay < 0:
+            raise FakeServiceError(f"가짜 {what} 실패")
+
+    async def sleep(self, what: str) -> None:
+        delay = self.draw(what)
+        await asyncio.sleep(abs(delay))
+        if delay < 0:
+            raise FakeServiceError(f"가짜 {what} 실패")
+
+
+# =============================================================================
+# Gemini
+# =============================================================================
+
+_CLOSET_ID = re.compile(r"^- ID: ([^,]+),", re.MULTILINE)
+_BATCH_COUNT = re.compile(r"첨부된 옷 이미지 (\d+)장")
+
+
+def _descriptor(rng: random.Random) -> dict:
+    return {
+        "item_type": rng.choice(ITEM_TYPES),
+        "material": rng.choice(["면", "울", "데님", "린넨", "니트"]),
+        "pattern": rng.choice(["무지", "스트라이프", "체크"]),
+        "formality": rng.choice(["캐주얼", "세미포멀", "포멀"]),
+        "style_tags": [rng.choice(["미니멀", "스트릿", "빈티지", "클래식"])],
+        "color_names": [rng.choice(["차콜", "아이보리", "네이비", "베이지"])],
+    }
+
+
+def canned_response(prompt: str, rng: random.Random) -> str:
+    """프롬프트 종류를 알아보고 그 프롬프트가 요구하는 형식의 JSON 문자열 반환"""
+    if "분류해줘" in prompt:
+        return json.dumps({"item_type": rng.choice(ITEM_TYPES)}, ensure_ascii=False)
+    m = _BATCH_COUNT.search(prompt)
+    if m:
+        return json.dumps([_descriptor(rng) for _ in range(int(m.group(1)))], ensure_ascii=False)
+    if "아래 항목을 판별" in prompt:
+        return json.dumps(_descriptor(rng), ensure_ascii=False)
+    if '"coordinations"' in prompt or "coordinations" in prompt:
+        ids = _CLOSET_ID.findall(prompt)
+        return json.dumps({"coordinations": [
+            {"recommended_item_ids": [i], "styling_tip": "톤을 맞춰 차분하게 연출"} for i in ids[:3]
+        ]}, ensure_ascii=False)
+    if "코디 아이템 3가지" in prompt:
+        return json.dumps([
+            {"keyword": k, "description": "추구미와 어울리는 실루엣"} for k in ("와이드 슬랙스", "크롭 가디건", "로퍼")
+        ], ensure_ascii=False)
+    if "업로드된 옷은" in prompt:
+        # 마지막 줄이 요구 형식 ({"inner": ..., "bottom": ..., "shoes": ...})
+        keys = json.loads(prompt.strip().splitlines()[-1])
+        return json.dumps({k: f"{k} 추천 아이템 (가짜 응답)" for k in keys}, ensure_ascii=False)
+    if "영상 자막" in prompt:
+        return "오버핏 아우터, 뉴트럴 컬러, 레이어드 스타일이 강세"
+    return "{}"
+
+
+class FakeGemini:
+    """llm.GeminiClient 와 같은 인터페이스 (generate_content / generate_content_stream)"""
+
+    def __init__(self, latency: FakeLatency, stream_chunks: int = 8, seed: int = 0):
+        self.latency = latency
+        self.stream_chunks = max(1, stream_chunks)
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _text(self, contents) -> str:
+        self.calls += 1
+        prompt = contents[0] if isinstance(contents, list) else contents
+        return canned_response(str(prompt), self._rng)
+
+    def open(self) -> bool:
+        return True
+
+    async def aclose(self) -> None:
+        pass
+
+    async def generate_content(self, contents, model: Optional[str] = None):
+        await self.latency.sleep("gemini")
+        return SimpleNamespace(text=self._text(contents), usage_metadata=None)
+
+    async def generate_content_stream(self, contents, model: Optional[str] = None):
+        # 첫 토큰까지는 지연의 절반, 나머지는 청크로 나눠 도착
+        delay = self.latency.draw("gemini")
+        text = self._text(contents)
+        await asyncio.sleep(abs(delay) / 2)
+        if delay < 0:
+            raise FakeServiceError("가짜 gemini 실패")
+        step = max(1, len(text) // self.stream_chunks)
+        for i in range(0, len(text), step):
+            yield SimpleNamespace(text=text[i:i + step])
+            await asyncio.sleep(abs(delay) / 2 / self.stream_chunks)
+
+
+# =============================================================================
+# YouTube (trends.TrendFetcher의 search/transcript 대체)
+# =============================================================================
+
+class FakeYouTube:
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+
+    def search(self, query: str, limit: int = 5) -> list[str]:
+        self.latency.sleep_sync("youtube search")
+        return [f"fake-{abs(hash(query)) % 10_000}-{i}" for i in range(limit)]
+
+    def transcript(self, video_id: str) -> str:
+        self.latency.sleep_sync("youtube transcript")
+        return f"{video_id} 영상 자막: 올해는 오버핏 아우터와 뉴트럴 컬러 레이어드가 유행"
+
+
+# =============================================================================
+# Supabase Storage (storage.StorageBackend)
+# =============================================================================
+
+class FakeStorage(StorageBackend):
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.objects: dict[str, int] = {}  # 경로 → 크기 (바이트는 보관하지 않음)
+
+    def upload(self, path, data, content_type):
+        self.latency.sleep_sync("storage upload")
+        self.objects[path] = len(data)
+
+    def public_url(self, path):
+        return f"https://storage.fake.local/{path}"
+
+
+# =============================================================================
+# rembg 세션 (모델 파일 없이 부하 테스트할 때)
+# =============================================================================
+
+def fake_rembg_session(latency: FakeLatency):
+    """전체 불투명 마스크를 반환하는 세션. 추론 시간은 latency만큼 워커 스레드를 점유."""
+    from PIL import Image
+    from rembg.sessions.base import BaseSession
+
+    class FakeRembgSession(BaseSession):
+        def __init__(self):
+            pass
+
+        def predict(self, img, *args, **kwargs):
+            latency.sleep_sync("rembg")
+            return [Image.new("L", img.size, 255)]
+
+    return FakeRembgSession()
+
+
+def install(
+    main,
+    gemini: FakeLatency,
+    youtube: FakeLatency,
+    storage: FakeLatency,
+    rembg: Optional[FakeLatency] = None,
+    seed: int = 0,
+) -> dict:
+    """main 모듈의 외부 연동을 가짜로 교체. 반환값은 호출 횟수 등을 확인할 수 있는 가짜 객체들."""
+    from trends import TrendFetcher
+
+    fake_gemini = FakeGemini(gemini.seed(seed), seed=seed)
+    fake_youtube = FakeYouTube(youtube.seed(seed + 1))
+    fake_storage = FakeStorage(storage.seed(seed + 2))
+
+    main._get_gemini_key = lambda: "fake-gemini-key"
+    main.gemini = fake_gemini
+    main.llm.client = fake_gemini
+    main.trend_fetcher = TrendFetcher(search=fake_youtube.search, transcript=fake_youtube.transcript)
+    main.create_storage = lambda: fake_storage
+    if rembg is not None:
+        # 모든 품질 단계가 같은 가짜 세션을 사용
+        session = fake_rembg_session(rembg.seed(seed + 3))
+        main.bg_remover._sessions = {tier.model: session for tier in TIERS.values()}
+    return {"gemini": fake_gemini, "youtube": fake_youtube, "storage": fake_storage}
@@ -0,0 +1,474 @@
+"""
+엔드포인트 부하 테스트 (외부 서비스는 bench/fakes.py 가짜로 대체, 네트워크 불필요)
+
+서버는 별도 프로세스(uvicorn)로 띄우고 가짜 Gemini/YouTube/Storage를 설치한 뒤,
+엔드포인트별로 --requests 건을 --concurrency 동시성으로 보내 다음을 측정:
+  p50/p95/p99/평균 지연, 처리량(req/s), 실패율(HTTP 오류 / success=false), 서버 최대 RSS
+
+이미지는 휴대폰 사진 크기 위주의 합성 코퍼스(JPEG/PNG/WebP, 노이즈 배경) 또는 --corpus 디렉터리.
+--json 결과를 파일로 저장해 두고 --compare 로 비교하면 p95가 --tolerance 이상 늘어난 엔드포인트를 표시하고 종료 코드 1.
+
+    cd backend
+    python -m bench.load --requests 40 --concurrency 8 --gemini-ms 800 --json > bench.json
+    python -m bench.load --compare bench.json
+    python -m bench.load --rembg fake --rembg-ms 600   # rembg 모델 파일 없이
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+ENDPOINTS = [
+    "health",
+    "wardrobe_process",
+    "wardrobe_batch",
+    "image_get",
+    "analyze",
+    "analyze_stream",
+    "job_analyze",
+    "closet_coordinate",
+    "shop_search",
+]
+
+# (너비, 높이, 포맷, 비율) - 휴대폰 원본 사진이 대부분
+_CORPUS_SHAPES = [
+    ((3024, 4032), "JPEG", 0.35),
+    ((1512, 2016), "JPEG", 0.25),
+    ((1080, 1350), "JPEG", 0.2),
+    ((1200, 1600), "PNG", 0.1),
+    ((1000, 1000), "WEBP", 0.1),
+]
+
+
+# =============================================================================
+# 이미지 코퍼스
+# =============================================================================
+
+def make_image(width: int, height: int, fmt: str, rng: random.Random) -> bytes:
+    """노이즈 배경 위 옷 모양 도형 - 실제 사진과 비슷한 압축 크기가 나오도록 질감 추가"""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    np_rng = np.random.default_rng(rng.randrange(2**32))
+    base = np.array([rng.randrange(180, 240) for _ in range(3)], dtype=np.int16)
+    noise = np_rng.integers(-18, 18, size=(height // 4, width // 4, 3), dtype=np.int16)
+    bg = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).resize((width, height))
+    draw = ImageDraw.Draw(bg)
+    color = tuple(rng.randrange(20, 200) for _ in range(3))
+    w, h = width, height
+    draw.rectangle((w // 4, h // 5, w * 3 // 4, h * 4 // 5), fill=color)
+    draw.polygon([(w // 4, h // 5), (w // 10, h // 2), (w // 4, h // 2)], fill=color)
+    draw.polygon([(w * 3 // 4, h // 5), (w * 9 // 10, h // 2), (w * 3 // 4, h // 2)], fill=color)
+    draw.ellipse((w * 2 // 5, h // 8, w * 3 // 5, h // 4), fill=tuple(int(c) for c in base))
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        bg.save(buffer, format="JPEG", quality=rng.choice([85, 90, 95]))
+    else:
+        bg.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def build_corpus(size: int, seed: int, directory: Optional[str] = None) -> list[tuple[str, bytes, str]]:
+    """[(파일명, 바이트, content-type)]"""
+    if directory:
+        files = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"))
+        if not files:
+            raise SystemExit(f"{directory}에 이미지가 없습니다.")
+        mime = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+        return [(p.name, p.read_bytes(), mime[p.suffix.lower()]) for p in files[:size]]
+
+    rng = random.Random(seed)
+    shapes = [s for s, _, _ in _CORPUS_SHAPES]
+    fmts = {s: f for s, f, _ in _CORPUS_SHAPES}
+    weights = [w for _, _, w in _CORPUS_SHAPES]
+    corpus = []
+    for i in range(size):
+        shape = rng.choices(shapes, weights)[0]
+        fmt = fmts[shape]
+        ext = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}[fmt]
+        corpus.append((f"img-{i}.{ext}", make_image(*shape, fmt, rng), f"image/{ext.replace('jpg', 'jpeg')}"))
+    return corpus
+
+
+# =============================================================================
+# 서버 프로세스 (가짜 외부 서비스 설치 후 uvicorn 실행)
+# =============================================================================
+
+def _serve(args) -> None:
+    import uvicorn
+
+    import main
+    from bench import fakes
+
+    latency = lambda ms, jitter, fail: fakes.FakeLatency(ms, jitter, fail)  # noqa: E731
+    fakes.install(
+        main,
+        gemini=latency(args.gemini_ms, args.jitter, args.gemini_failure),
+        youtube=latency(args.youtube_ms, args.jitter, args.youtube_failure),
+        storage=latency(args.storage_ms, args.jitter, args.storage_failure),
+        rembg=latency(args.rembg_ms, args.jitter, 0.0) if args.rembg == "fake" else None,
+        seed=args.seed,
+    )
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(args, workdir: str) -> subprocess.Popen:
+    # 캐시/옷장/작업 DB는 임시 디렉터리로 (이전 실행의 캐시 적중이 결과를 흐리지 않도록)
+    env = {
+        **os.environ,
+        "WARDROBE_STORE_BACKEND": "sqlite",
+        "WARDROBE_DB_PATH": f"{workdir}/wardrobe.sqlite3",
+        "WARDROBE_IMAGE_DIR": f"{workdir}/wardrobe",
+        "CUTOUT_CACHE_DIR": f"{workdir}/cutouts",
+        "IMAGE_CACHE_DIR": f"{workdir}/images",
+        "JOB_STORE": "memory",
+    }
+    cmd = [sys.executable, "-m", "bench.load", "--serve", "--port", str(args.port)]
+    for name in ("gemini_ms", "gemini_failure", "youtube_ms", "youtube_failure",
+                 "storage_ms", "storage_failure", "rembg", "rembg_ms", "jitter", "seed"):
+        cmd += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    return subprocess.Popen(cmd, cwd=Path(__file__).resolve().parent.parent, env=env)
+
+
+class RSSSampler:
+    """서버 프로세스 RSS를 주기적으로 읽어 구간별 최대값 기록 (Linux /proc)"""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.path = Path(f"/proc/{pid}/status")
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def available(self) -> bool:
+        return self.path.exists()
+
+    def read(self) -> int:
+        try:
+            for line in self.path.read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def reset(self) -> int:
+        self.peak = self.read()
+        return self.peak
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.read())
+
+    def start(self) -> None:
+        if self.available:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# =============================================================================
+# 시나리오 (요청 1건 = 호출 1번, 반환: 앱 수준 성공 여부)
+# =============================================================================
+
+Scenario = Callable[["Context", int], Awaitable[bool]]
+
+
+class Context:
+    def __init__(self, client, corpus, args):
+        self.client = client
+        self.corpus = corpus
+        self.args = args
+        self.style = {"aesthetic": "모리걸", "personal_color": "봄 웜"}
+        self.item_ids: list[str] = []
+        self.image_urls: list[str] = []
+
+    def image(self, i: int) -> tuple[str, bytes, str]:
+        return self.corpus[i % len(self.corpus)]
+
+
+async def _health(ctx: Context, i: int) -> bool:
+    r = await ctx.client.get("/health")
+    return r.status_code == 200
+
+
+async def _wardrobe_process(ctx: Context, i: int) -> bool:
+    r = await ctx.client.post("/api/wardrobe/process", files={"file": ctx.image(i)})
+    body = r.json()
+    if body.get("item_id"):
+        ctx.item_ids.append(body["item_id"])
+    if body.get("processed_image_url"):
+        ctx.image_urls.append(body["processed_image_url"])
+    return r.status_code == 200 and body.get("success", False)
+
+
+async def _wardrobe_batch(ctx: Context, i: int) -> bool:
+    files = [("files", ctx.image(i * ctx.args.batch_size + k)) for k in range(ctx.args.batch_size)]
+    ok = False
+    async with ctx.client.stream("POST", "/api/wardrobe/process-batch", files=files) as r:
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "done":
+                done = json.loads(line[5:])
+                ok = done.get("succeeded") == done.get("total")
+    return r.status_code == 200 and ok
+
+
+async def _image_get(ctx: Context, i: int) -> bool:
+    if not ctx.image_urls:
+        return False
+    r = await ctx.client.get(ctx.image_urls[i % len(ctx.image_urls)])
+    return r.status_code == 200
+
+
+async def _analyze(ctx: Context, i: int) -> bool:
+    r = await ctx.client.post("/api/analyze", files={"file": ctx.image(i)}, data=ctx.style)
+    return r.status_code == 200 and r.json().get("success", False)
+
+
+async def _analyze_stream(ctx: Context, i: int) -> bool:
+    ok = False
+    async with ctx.client.stream("POST", "/api/analyze/stream", files={"file": ctx.image(i)}, data=ctx.style) as r:
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "done":
+                ok = json.loads(line[5:]).get("success", False)
+    return r.status_code == 200 and ok
+
+
+async def _job_analyze(ctx: Context, i: int) -> bool:
+    """제출 → 완료까지 폴링 (지연 = 제출부터 결과 확인까지)"""
+    r = await ctx.client.post("/api/jobs/analyze", files={"file": ctx.image(i)}, data=ctx.style)
+    if r.status_code != 202:
+        return False
+    status_url = r.json()["status_url"]
+    while True:
+        await asyncio.sleep(0.05)
+        job = (await ctx.client.get(status_url)).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job["status"] == "succeeded" and (job.get("result") or {}).get("success", False)
+
+
+async def _closet_coordinate(ctx: Context, i: int) -> bool:
+    if len(ctx.item_ids) < 2:
+        return False
+    ids = ctx.item_ids
+    selected = ids[i % len(ids)]
+    body = {
+        "selected_item": {"id": selected},
+        "wardrobe_item_ids": [x for x in ids if x != selected],
+        **ctx.style,
+    }
+    r = await ctx.client.post("/api/closet-coordinate", json=body)
+    return r.status_code == 200 and r.json().get("success", False)
+
+
+async def _shop_search(ctx: Context, i: int) -> bool:
+    _, data, _ = ctx.image(i)
+    body = {"selected_item_base64": base64.b64encode(data).decode(), "item_type": "이너", **ctx.style}
+    r = await ctx.client.post("/api/shop-search", json=body)
+    return r.status_code == 200 and r.json().get("success", False)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "health": _health,
+    "wardrobe_process": _wardrobe_process,
+    "wardrobe_batch": _wardrobe_batch,
+    "image_get": _image_get,
+    "analyze": _analyze,
+    "analyze_stream": _analyze_stream,
+    "job_analyze": _job_analyze,
+    "closet_coordinate": _closet_coordinate,
+    "shop_search": _shop_search,
+}
+
+
+def _percentile(sorted_samples: list[float], p: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    k = min(len(sorted_samples) - 1, max(0, int(round(p * len(sorted_samples))) - 1))
+    return sorted_samples[k]
+
+
+async def run_scenario(name: str, ctx: Context, rss: RSSSampler) -> dict:
+    scenario = SCENARIOS[name]
+    requests, concurrency = ctx.args.requests, ctx.args.concurrency
+    if name == "wardrobe_batch":
+        requests = max(1, requests // ctx.args.batch_size)
+    latencies: list[float] = []
+    outcomes = {"ok": 0, "app_error": 0, "http_error": 0}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            t = time.perf_counter()
+            try:
+                ok = await scenario(ctx, i)
+                outcomes["ok" if ok else "app_error"] += 1
+            except Exception:
+                outcomes["http_error"] += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    # 워밍업 요청은 집계하지 않음 (첫 요청의 지연 import/세션 생성 등)
+    for i in range(ctx.args.warmup):
+        try:
+            await scenario(ctx, requests + i)
+        except Exception:
+            pass
+
+    rss_start = rss.reset()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        **outcomes,
+        "error_rate": round(1 - outcomes["ok"] / requests, 4),
+        "p50_ms": round(_percentile(latencies, 0.50), 1),
+        "p95_ms": round(_percentile(latencies, 0.95), 1),
+        "p99_ms": round(_percentile(latencies, 0.99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else 0.0,
+        "rss_start_mb": round(rss_start / 2**20, 1) if rss.available else None,
+        "peak_rss_mb": round(max(rss.peak, rss_start) / 2**20, 1) if rss.available else None,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    corpus = build_corpus(args.corpus_size, args.seed, args.corpus)
+    with tempfile.TemporaryDirectory(prefix="core-d-bench-") as workdir:
+        args.port = args.port or _free_port()
+        server = _start_server(args, workdir)
+        rss = RSSSampler(server.pid)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+                for _ in range(300):
+                    try:
+                        if (await client.get("/ready")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if server.poll() is not None:
+                        raise SystemExit("서버 프로세스가 시작하지 못했습니다.")
+                    await asyncio.sleep(0.1)
+                rss.start()
+                ctx = Context(client, corpus, args)
+                # 옷장 데이터가 필요한 시나리오(closet_coordinate, image_get)는 wardrobe_process 이후에 실행
+                ordered = [e for e in ENDPOINTS if e in args.endpoints]
+                results = [await run_scenario(name, ctx, rss) for name in ordered]
+                server_stats = (await client.get("/api/cache/stats")).json()
+        finally:
+            rss.stop()
+            server.terminate()
+            server.wait(timeout=30)
+
+    return {
+        "config": {
+            k: getattr(args, k) for k in (
+                "requests", "concurrency", "warmup", "batch_size", "corpus_size", "gemini_ms", "gemini_failure",
+                "youtube_ms", "youtube_failure", "storage_ms", "storage_failure", "rembg", "rembg_ms",
+                "jitter", "seed",
+            )
+        },
+        "corpus_mb": round(sum(len(d) for _, d, _ in corpus) / 2**20, 1),
+        "endpoints": results,
+        "server_stats": server_stats,
+    }
+
+
+def compare(current: dict, baseline_path: str, tolerance: float) -> list[str]:
+    """p95 또는 실패율이 기준보다 나빠진 엔드포인트 목록"""
+    baseline = {r["endpoint"]: r for r in json.loads(Path(baseline_path).read_text())["endpoints"]}
+    regressions = []
+    for r in current["endpoints"]:
+        b = baseline.get(r["endpoint"])
+        if b is None:
+            continue
+        if b["p95_ms"] > 0 and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['endpoint']}: p95 {b['p95_ms']} → {r['p95_ms']} ms")
+        if r["error_rate"] > b["error_rate"] + 0.01:
+            regressions.append(f"{r['endpoint']}: 실패율 {b['error_rate']} → {r['error_rate']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=40, help="엔드포인트별 요청 수 (배치는 파일 수 기준)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="엔드포인트별 집계 제외 워밍업 요청 수")
+    parser.add_argument("--batch-size", type=int, default=5, help="wardrobe_batch 1회 파일 수")
+    parser.add_argument("--corpus", help="이미지 디렉터리 (없으면 합성 코퍼스)")
+    parser.add_argument("--corpus-size", type=int, default=24)
+    parser.add_argument("--gemini-ms", type=float, default=800)
+    parser.add_argument("--gemini-failure", type=float, default=0.0)
+    parser.add_argument("--youtube-ms", type=float, default=300)
+    parser.add_argument("--youtube-failure", type=float, default=0.0)
+    parser.add_argument("--storage-ms", type=float, default=150)
+    parser.add_argument("--storage-failure", type=float, default=0.0)
+    parser.add_argument("--rembg", choices=["real", "fake"], default="real", help="fake: 모델 없이 고정 지연 마스크")
+    parser.add_argument("--rembg-ms", type=float, default=600, help="--rembg fake 일 때 추론 시간")
+    parser.add_argument("--jitter", type=float, default=0.2, help="가짜 서비스 지연 표준편차 (평균 대비 비율)")
+    parser.add_argument("--timeout", type=float, default=120, help="요청 1건 타임아웃 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--compare", help="이전 --json 결과 파일 - p95/실패율 회귀 시 종료 코드 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="--compare 허용 p95 증가율")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args)
+        return
+
+    results = asyncio.run(run(args))
+    regressions = compare(results, args.compare, args.tolerance) if args.compare else []
+    if args.json:
+        print(json.dumps({**results, "regressions": regressions}, ensure_ascii=False))
+    else:
+        print(f"코퍼스 {args.corpus_size}장 ({results['corpus_mb']} MB), "
+              f"요청 {args.requests}건 x 동시성 {args.concurrency}, rembg={args.rembg}")
+        print(f"{'endpoint':<18}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>8}{'err':>7}{'peakRSS':>10}")
+        for r in results["endpoints"]:
+            rss = f"{r['peak_rss_mb']:.0f}MB" if r["peak_rss_mb"] is not None else "-"
+            print(f"{r['endpoint']:<18}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                  f"{r['throughput_rps']:>8.2f}{r['error_rate']:>7.1%}{rss:>10}")
+        for line in regressions:
+            print(f"회귀: {line}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+이미지 정규화 벤치마크 - 엔드포인트별 전처리 지연, 피크 메모리, LLM 업로드 바이트
+
+before: 기존 방식 - 원본 해상도 RGBA로 디코딩, LLM에는 PIL 이미지 전달 (SDK가 PNG로 인코딩)
+after : imaging 모듈 - EXIF 적용 + 용도별 축소 + LLM용 JPEG 재인코딩
+
+rembg 추론 자체는 제외 (입력 크기만 비교). 측정마다 별도 프로세스에서 실행해 피크 RSS를 분리.
+
+    cd backend
+    python -m bench.normalize --size 4032 3024 --closet 20
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing as mp
+import resource
+import time
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """폰 사진과 비슷한 크기/압축률의 JPEG (노이즈가 있어 압축이 잘 안 됨)"""
+    from PIL import Image, ImageDraw
+
+    img = Image.effect_noise((width, height), 40).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((width // 4, height // 5, width * 3 // 4, height * 4 // 5), fill=(40, 70, 140))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=88)
+    return buffer.getvalue()
+
+
+def _sdk_png_bytes(img) -> int:
+    """google-genai가 PIL 이미지를 보낼 때와 같은 PNG 인코딩 크기"""
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return len(buffer.getvalue())
+
+
+def _before(endpoint: str, photo: bytes, closet: int) -> int:
+    from PIL import Image
+
+    def load(b):
+        return Image.open(io.BytesIO(b)).convert("RGBA")
+
+    if endpoint in ("analyze", "wardrobe"):
+        rembg_input = load(photo)  # rembg 입력 = 원본 해상도
+        llm = _sdk_png_bytes(rembg_input)  # (배경 제거 결과를 같은 크기로 전송)
+        return llm * (2 if endpoint == "analyze" else 1)
+    if endpoint == "shop":
+        return _sdk_png_bytes(load(base64.b64decode(base64.b64encode(photo))))
+    b64 = base64.b64encode(photo).decode()
+    images = [load(base64.b64decode(b64)) for _ in range(closet + 1)]
+    return sum(_sdk_png_bytes(i) for i in images)
+
+
+def _after(endpoint: str, photo: bytes, closet: int) -> int:
+    import imaging
+
+    if endpoint in ("analyze", "wardrobe"):
+        imaging.decode(photo, "rembg")
+        llm = len(imaging.llm_input(photo).data)
+        return llm * (2 if endpoint == "analyze" else 1)
+    if endpoint == "shop":
+        return len(imaging.llm_input(base64.b64decode(base64.b64encode(photo))).data)
+    b64 = base64.b64encode(photo).decode()
+    return sum(len(imaging.llm_input(base64.b64decode(b64)).data) for _ in range(closet + 1))
+
+
+def _worker(mode: str, endpoint: str, photo: bytes, closet: int, out) -> None:
+    import PIL.Image  # noqa: F401 - import 비용은 측정에서 제외
+    import imaging  # noqa: F401
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    upload = (_before if mode == "before" else _after)(endpoint, photo, closet)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+    out.put({
+        "endpoint": endpoint,
+        "mode": mode,
+        "latency_ms": round(elapsed * 1000, 1),
+        "peak_rss_delta_mb": round(peak / 1024, 1),  # Linux ru_maxrss 단위 = KB
+        "llm_upload_bytes": upload,
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs=2, default=(4032, 3024), metavar=("W", "H"))
+    parser.add_argument("--closet", type=int, default=20, help="closet-coordinate 옷장 아이템 수")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    photo = make_photo(*args.size)
+    ctx = mp.get_context("spawn")
+    results = []
+    for endpoint in ("analyze", "wardrobe", "closet", "shop"):
+        for mode in ("before", "after"):
+            out = ctx.Queue()
+            proc = ctx.Process(target=_worker, args=(mode, endpoint, photo, args.closet, out))
+            proc.start()
+            results.append(out.get())
+            proc.join()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    print(f"photo: {args.size[0]}x{args.size[1]} JPEG {len(photo) / 1e6:.1f} MB, closet items: {args.closet}")
+    for r in results:
+        print(
+            f"{r['endpoint']:>9} {r['mode']:>6}: {r['latency_ms']:9.1f} ms  "
+            f"peak RSS +{r['peak_rss_delta_mb']:7.1f} MB  LLM upload {r['llm_upload_bytes'] / 1e6:8.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
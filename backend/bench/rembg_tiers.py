@@ -0,0 +1,120 @@
+"""
+배경 제거 품질 단계 벤치마크 - 단계(fast / balanced / high)별 지연과 기준 단계(기본 high) 대비 마스크 IoU
+
+픽스처: --fixtures 디렉터리의 사진(jpg/png/webp) 또는 합성 옷 사진 (bench.bg_removal.make_sample).
+단계마다 세션 로드 시간, 이미지당 추론 시간(디코딩 ~ PNG 인코딩, --repeat 회 중 최솟값)의 p50/p95,
+기준 단계 마스크와의 IoU(알파 ≥ 128을 전경으로) 평균/최솟값, 알파 평균 절대 오차를 출력.
+단계별 모델/입력 크기는 서버와 같은 환경 변수(REMBG_TIER_<단계>_MODEL / _MAX_SIDE)를 따름.
+
+    cd backend
+    python -m bench.rembg_tiers --fixtures ~/photos/clothes
+    python -m bench.rembg_tiers --tiers fast balanced --reference balanced --json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from bg_removal import TIERS, BackgroundRemover
+from bench.bg_removal import make_sample
+
+_FIXTURE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_fixtures(args) -> list[tuple[str, bytes]]:
+    if args.fixtures:
+        paths = sorted(p for p in Path(args.fixtures).iterdir() if p.suffix.lower() in _FIXTURE_SUFFIXES)
+        if not paths:
+            raise SystemExit(f"{args.fixtures}에 이미지가 없습니다.")
+        return [(p.name, p.read_bytes()) for p in paths[: args.count]]
+    sizes = [(1024, 1280), (1536, 2048), (900, 1200), (3000, 4000)]
+    return [(f"synthetic-{w}x{h}", make_sample(w, h)) for w, h in sizes[: args.count]]
+
+
+def run_tier(engine: BackgroundRemover, tier: str, fixtures, repeat: int) -> tuple[dict, list]:
+    """(지연 요약, 픽스처별 알파 마스크)"""
+    t0 = time.perf_counter()
+    engine._get_session(TIERS[tier].model)
+    load_ms = (time.perf_counter() - t0) * 1000
+    # ONNX 첫 실행 초기화는 서버 워밍업과 같이 측정에서 제외
+    engine.cutout_sync(fixtures[0][1], tier)
+
+    latencies, masks = [], []
+    for _, content in fixtures:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            output_img, _png = engine.cutout_sync(content, tier)
+            best = min(best, time.perf_counter() - t0)
+        latencies.append(best * 1000)
+        masks.append(output_img.getchannel("A"))
+    latencies.sort()
+    return {
+        "tier": tier,
+        "model": TIERS[tier].model,
+        "max_side": TIERS[tier].max_side,
+        "session_load_ms": round(load_ms, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+    }, masks
+
+
+def compare(mask, reference) -> tuple[float, float]:
+    """(IoU, 알파 평균 절대 오차 0-1). 해상도가 다르면 기준 마스크 크기로 맞춤."""
+    import numpy as np
+    from PIL import Image
+
+    if mask.size != reference.size:
+        mask = mask.resize(reference.size, Image.Resampling.BILINEAR)
+    a = np.asarray(mask, dtype=np.float32) / 255
+    b = np.asarray(reference, dtype=np.float32) / 255
+    fa, fb = a >= 0.5, b >= 0.5
+    union = int(np.logical_or(fa, fb).sum())
+    iou = 1.0 if union == 0 else int(np.logical_and(fa, fb).sum()) / union
+    return iou, float(np.abs(a - b).mean())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="사진 디렉터리 (없으면 합성)")
+    parser.add_argument("--count", type=int, default=50, help="최대 픽스처 수")
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS), default=list(TIERS))
+    parser.add_argument("--reference", choices=list(TIERS), default="high", help="IoU 기준 단계")
+    parser.add_argument("--repeat", type=int, default=3, help="이미지당 반복 (최솟값 사용)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args)
+    engine = BackgroundRemover(workers=1)
+    order = [args.reference] + [t for t in args.tiers if t != args.reference]
+    runs = {tier: run_tier(engine, tier, fixtures, args.repeat) for tier in order}
+    reference_masks = runs[args.reference][1]
+
+    results = []
+    for tier in args.tiers if args.reference in args.tiers else order:
+        summary, masks = runs[tier]
+        scores = [compare(m, ref) for m, ref in zip(masks, reference_masks)]
+        ious = [iou for iou, _ in scores]
+        results.append({
+            **summary,
+            "mean_iou": round(statistics.fmean(ious), 4),
+            "min_iou": round(min(ious), 4),
+            "min_iou_fixture": fixtures[ious.index(min(ious))][0],
+            "alpha_mae": round(statistics.fmean(mae for _, mae in scores), 4),
+        })
+    engine.shutdown()
+
+    if args.json:
+        print(json.dumps({"fixtures": len(fixtures), "reference": args.reference, "results": results}, ensure_ascii=False))
+        return
+    print(f"픽스처 {len(fixtures)}장 ({args.fixtures or '합성'}), 기준 단계 {args.reference}, 반복 {args.repeat}회 중 최솟값")
+    print(f"{'tier':<10}{'model':<20}{'side':>6}{'load ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'IoU':>8}{'min IoU':>9}{'α MAE':>8}")
+    for r in results:
+        print(f"{r['tier']:<10}{r['model']:<20}{r['max_side']:>6}{r['session_load_ms']:>9.0f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['mean_iou']:>8.3f}{r['min_iou']:>9.3f}{r['alpha_mae']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+업로드 메모리 벤치마크 - 큰 사진(기본 12MP JPEG)을 동시에 N건 올릴 때 서버 최대 RSS가 동시성에 비례해 늘지 않는지 확인
+
+서버는 bench/load.py와 같은 방식(별도 프로세스 + 가짜 외부 서비스)으로 띄우고,
+IMAGE_MEMORY_BUDGET_MB 값(--budgets, 0은 제한 없음)마다 동시성 단계(--levels)별로 /api/analyze 를 한 번에 보내
+단계별 최대 RSS, 단계 시작 대비 증가량, 동시 요청 1건당 증가량, 요청별 이미지 메모리 추정 최대치(p95)를 출력.
+
+--check: 마지막 예산 설정에서 가장 높은 동시성의 최대 RSS가 두 번째 단계보다 --tolerance 이상 크면 종료 코드 1
+
+    cd backend
+    python -m bench.upload_memory --rembg fake
+    python -m bench.upload_memory --rembg fake --levels 1 10 50 --budgets 0 256 --check --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bench.load import RSSSampler, _free_port, _start_server, make_image
+
+
+def _server_args(args, port: int) -> SimpleNamespace:
+    # bench.load 서버 옵션 (외부 서비스는 짧은 고정 지연)
+    return SimpleNamespace(
+        port=port, gemini_ms=args.gemini_ms, gemini_failure=0.0, youtube_ms=50, youtube_failure=0.0,
+        storage_ms=20, storage_failure=0.0, rembg=args.rembg, rembg_ms=args.rembg_ms, jitter=0.1, seed=args.seed,
+    )
+
+
+def _histogram_p95(metrics_text: str, name: str) -> float:
+    """Prometheus 히스토그램 버킷(모든 라벨 합산)에서 p95 상한 (바이트)"""
+    buckets: dict[float, float] = {}
+    for line in metrics_text.splitlines():
+        if line.startswith(f"{name}_bucket"):
+            le = line.split('le="')[1].split('"')[0]
+            bound = float("inf") if le == "+Inf" else float(le)
+            buckets[bound] = buckets.get(bound, 0.0) + float(line.rsplit(" ", 1)[1])
+    if not buckets:
+        return 0.0
+    total = buckets.get(float("inf"), 0.0)
+    for bound in sorted(buckets):
+        if buckets[bound] >= total * 0.95:
+            return bound
+    return 0.0
+
+
+async def _run_budget(args, budget_mb: int, images: list[bytes]) -> dict:
+    import httpx
+
+    os.environ["IMAGE_MEMORY_BUDGET_MB"] = str(budget_mb)
+    with tempfile.TemporaryDirectory(prefix="core-d-membench-") as workdir:
+        port = _free_port()
+        server = _start_server(_server_args(args, port), workdir)
+        rss = RSSSampler(server.pid, interval=0.01)
+        levels = []
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout) as client:
+                for _ in range(600):
+                    try:
+                        if (await client.get("/ready")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if server.poll() is not None:
+                        raise SystemExit("서버 프로세스가 시작하지 못했습니다.")
+                    await asyncio.sleep(0.1)
+                rss.start()
+                data = {"aesthetic": "모리걸", "personal_color": "봄 웜"}
+                offset = 0
+
+                async def one(content: bytes) -> tuple[float, bool]:
+                    t = time.perf_counter()
+                    r = await client.post("/api/analyze", files={"file": ("a.jpg", content, "image/jpeg")}, data=data)
+                    return (time.perf_counter() - t) * 1000, r.status_code == 200 and r.json().get("success", False)
+
+                for level in args.levels:
+                    # 단계마다 처음 보는 이미지 (배경 제거 캐시 적중 방지)
+                    batch = [images[(offset + i) % len(images)] for i in range(level)]
+                    offset += level
+                    start = rss.reset()
+                    results = await asyncio.gather(*(one(c) for c in batch))
+                    latencies = sorted(ms for ms, _ in results)
+                    peak = max(rss.peak, start)
+                    levels.append({
+                        "concurrency": level,
+                        "ok": sum(1 for _, ok in results if ok),
+                        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                        "rss_start_mb": round(start / 2**20, 1),
+                        "peak_rss_mb": round(peak / 2**20, 1),
+                        "growth_mb": round((peak - start) / 2**20, 1),
+                        "growth_per_request_mb": round((peak - start) / 2**20 / level, 2),
+                    })
+                stats = (await client.get("/api/cache/stats")).json().get("image_memory")
+                metrics_text = (await client.get("/metrics")).text
+        finally:
+            rss.stop()
+            server.terminate()
+            server.wait(timeout=30)
+    return {
+        "budget_mb": budget_mb,
+        "levels": levels,
+        "image_memory": stats,
+        "request_image_memory_p95_mb": round(_histogram_p95(metrics_text, "core_d_request_image_memory_bytes") / 2**20, 1),
+    }
+
+
+def check_flat(run: dict, tolerance: float) -> list[str]:
+    levels = run["levels"]
+    if len(levels) < 3:
+        return []
+    ref, top = levels[1], levels[-1]
+    if top["peak_rss_mb"] > ref["peak_rss_mb"] * (1 + tolerance):
+        return [
+            f"budget={run['budget_mb']}MB: 동시성 {ref['concurrency']} → {top['concurrency']} 최대 RSS "
+            f"{ref['peak_rss_mb']} → {top['peak_rss_mb']} MB (허용 {tolerance:.0%})"
+        ]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 25, 50], help="동시 업로드 수 단계")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 512], help="IMAGE_MEMORY_BUDGET_MB (0은 제한 없음)")
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--distinct", type=int, default=24, help="서로 다른 합성 이미지 수")
+    parser.add_argument("--rembg", choices=["real", "fake"], default="real")
+    parser.add_argument("--rembg-ms", type=float, default=300)
+    parser.add_argument("--gemini-ms", type=float, default=300)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    width = int((args.megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = random.Random(args.seed)
+    images = [make_image(width, height, "JPEG", rng) for _ in range(args.distinct)]
+
+    runs = [asyncio.run(_run_budget(args, budget, images)) for budget in args.budgets]
+    failures = check_flat(runs[-1], args.tolerance) if args.check else []
+
+    if args.json:
+        print(json.dumps({
+            "image": {"width": width, "height": height, "mean_kb": round(sum(map(len, images)) / len(images) / 1024)},
+            "runs": runs,
+            "failures": failures,
+        }, ensure_ascii=False))
+    else:
+        print(f"{width}x{height} JPEG (평균 {sum(map(len, images)) / len(images) / 2**20:.1f} MB), rembg={args.rembg}")
+        for run in runs:
+            label = "제한 없음" if run["budget_mb"] == 0 else f"{run['budget_mb']}MB"
+            print(f"\nIMAGE_MEMORY_BUDGET_MB={label}  (요청별 이미지 메모리 p95 ≤ {run['request_image_memory_p95_mb']} MB)")
+            print(f"{'동시성':>6}{'ok':>5}{'p95 ms':>10}{'시작RSS':>10}{'최대RSS':>10}{'증가':>9}{'건당':>9}")
+            for r in run["levels"]:
+                print(f"{r['concurrency']:>6}{r['ok']:>5}{r['p95_ms']:>10.0f}{r['rss_start_mb']:>10.0f}"
+                      f"{r['peak_rss_mb']:>10.0f}{r['growth_mb']:>9.0f}{r['growth_per_request_mb']:>9.2f}")
+        for line in failures:
+            print(f"실패: {line}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
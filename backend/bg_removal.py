@@ -0,0 +1,400 @@
+"""
+rembg 배경 제거 엔진
+- ONNX 세션을 프로세스 수명 동안 유지 (요청마다 세션/모델 초기화 X)
+- 추론(+디코딩/PNG 인코딩)은 크기가 제한된 스레드 풀에서 실행 → 이벤트 루프 블로킹 X
+- 같은 업로드는 콘텐츠 주소 캐시(cutout_cache.py)에서 바로 반환
+- 품질 단계(fast / balanced / high)마다 rembg 모델과 입력 해상도가 다르고, 단계별 세션을 따로 유지
+- service가 있으면 추론은 공유 배경 제거 서비스(rembg_service.py)로 보내고, 서비스를 쓸 수 없을 때만 프로세스 안에서 실행
+"""
+
+import asyncio
+import base64
+import contextvars
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Optional
+
+import admission
+import encoders
+import imaging
+import metrics
+from cutout_cache import CutoutCache, cutout_key
+
+REMBG_MODEL = os.getenv("REMBG_MODEL", "u2net")  # balanced 단계 모델
+# 동시에 실행되는 추론 수. onnxruntime이 추론 1건에도 여러 코어를 쓰므로 작게 유지
+REMBG_WORKERS = int(os.getenv("REMBG_WORKERS", min(2, os.cpu_count() or 1)))
+# 여러 장 처리 시 ONNX 1회 실행으로 묶는 최대 장 수
+REMBG_BATCH_SIZE = int(os.getenv("REMBG_BATCH_SIZE", 4))
+# 배치 추론이 가능한 모델 (같은 320x320 전처리 + 단일 마스크 출력)
+_BATCHABLE_MODELS = {"u2net", "u2netp", "silueta"}
+
+REMBG_SECONDS = metrics.REGISTRY.histogram("core_d_rembg_seconds", "품질 단계별 배경 제거 추론 시간 (초)", ["tier"])
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """배경 제거 품질 단계 = rembg 모델 + 입력 최대 변 길이"""
+    name: str
+    model: str
+    max_side: int
+
+
+def _tier(name: str, model: str, max_side: int) -> QualityTier:
+    env = f"REMBG_TIER_{name.upper()}"
+    return QualityTier(name, os.getenv(f"{env}_MODEL", model), int(os.getenv(f"{env}_MAX_SIDE", max_side)))
+
+
+# fast: 경량 모델(u2netp, 4.7MB) + 축소 입력 / balanced: 기존 기본값 / high: 고해상도 모델(isnet, 1024x1024 추론)
+# 모델/입력 크기는 REMBG_TIER_<단계>_MODEL / REMBG_TIER_<단계>_MAX_SIDE 로 변경
+TIERS = {
+    t.name: t
+    for t in (
+        _tier("fast", "u2netp", 768),
+        _tier("balanced", REMBG_MODEL, imaging.MAX_SIDE["rembg"]),
+        _tier("high", "isnet-general-use", imaging.MAX_SIDE["rembg"]),
+    )
+}
+# 요청/엔드포인트에서 단계를 지정하지 않을 때
+REMBG_DEFAULT_TIER = os.getenv("REMBG_DEFAULT_TIER", "balanced")
+
+
+class UnknownTier(ValueError):
+    def __init__(self, name: str):
+        super().__init__(f"알 수 없는 배경 제거 품질 단계: {name} (가능: {', '.join(TIERS)})")
+        self.name = name
+
+
+def get_tier(name: Optional[str] = None) -> QualityTier:
+    tier = TIERS.get(name or REMBG_DEFAULT_TIER)
+    if tier is None:
+        raise UnknownTier(name or REMBG_DEFAULT_TIER)
+    return tier
+
+
+# 기동 시 세션 로드 + 더미 추론할 단계 (기본: 전부)
+REMBG_WARM_TIERS = [
+    get_tier(name.strip()).name for name in os.getenv("REMBG_WARM_TIERS", ",".join(TIERS)).split(",") if name.strip()
+]
+
+
+@dataclass
+class Cutout:
+    """배경 제거 결과. 캐시 적중 시 image는 필요할 때만 PNG에서 디코딩."""
+    png: bytes
+    cache_hit: bool = False
+    image: Optional[object] = field(default=None, repr=False)
+
+    def pil(self):
+        if self.image is None:
+            from PIL import Image
+
+            self.image = Image.open(io.BytesIO(self.png))
+        return self.image
+
+    @cached_property
+    def b64(self) -> str:
+        return base64.b64encode(self.png).decode("utf-8")
+
+    @cached_property
+    def sha256(self) -> str:
+        """PNG 콘텐츠 해시 - /api/images URL 키"""
+        return hashlib.sha256(self.png).hexdigest()
+
+
+class BackgroundRemover:
+    """웜 세션 + 전용 워커 풀을 가진 배경 제거 엔진. 핸들러에서는 await로 호출."""
+
+    def __init__(
+        self,
+        workers: int = REMBG_WORKERS,
+        cache: Optional[CutoutCache] = None,
+        service=None,
+    ):
+        self.workers = max(1, workers)
+        self.cache = cache
+        # 캐시 미스 추론의 동시 실행 수(= 워커 수) + 대기열 상한 (가득 차면 admission.Overloaded)
+        self.limiter = admission.StageLimiter.from_env("cpu", self.workers)
+        # rembg_service.RembgServiceClient (None이면 항상 프로세스 안에서 추론)
+        self.service = service
+        # 모델 이름 → 세션 (같은 모델을 쓰는 단계끼리 공유)
+        self._sessions: dict[str, object] = {}
+        self._session_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def settings(tier: QualityTier) -> str:
+        """캐시 키에 포함되는 rembg 설정 (바뀌면 기존 캐시와 섞이지 않음)"""
+        key = f"model={tier.model};{imaging.settings_key()}"
+        # 입력 크기가 IMAGE_MAX_SIDE_REMBG와 다른 단계만 붙임 → balanced 단계는 기존 캐시 키 그대로
+        if tier.max_side != imaging.MAX_SIDE["rembg"]:
+            key += f";rembg_side={tier.max_side}"
+        return key
+
+    # ---- 동기 API (워커 스레드에서 실행) ---------------------------------------
+
+    def _get_session(self, model: str):
+        # InferenceSession.run은 스레드 안전 → 모델별 세션 1개를 워커들이 공유
+        session = self._sessions.get(model)
+        if session is None:
+            with self._session_lock:
+                session = self._sessions.get(model)
+                if session is None:
+                    from rembg import new_session
+
+                    session = self._sessions[model] = new_session(model)
+        return session
+
+    def remove_sync(self, img, tier: Optional[str] = None):
+        from rembg import remove
+
+        return remove(img, session=self._get_session(get_tier(tier).model))
+
+    def cutout_sync(self, content: bytes, tier: Optional[str] = None):
+        """
+        업로드 바이트 → (배경 제거된 RGBA 이미지, PNG 바이트). 입력 크기는 품질 단계, 출력 크기는 imaging 설정으로 제한.
+        디코딩 ~ 인코딩 구간은 이미지 메모리 예산 안에서 실행.
+        """
+        tier = get_tier(tier)
+        with imaging.budget(content, "rembg", tier.max_side):
+            with metrics.stage("image_decode"):
+                img = imaging.decode(content, "rembg", max_side=tier.max_side)
+            t0 = time.perf_counter()
+            with metrics.stage("rembg"):
+                out = self.remove_sync(img, tier.name)
+            REMBG_SECONDS.observe(time.perf_counter() - t0, tier=tier.name)
+            del img  # 인코딩 전에 입력 RGBA 해제
+            return self._encode(out)
+
+    def cutout_batch_sync(self, contents: list[bytes], tier: Optional[str] = None) -> list:
+        """
+        여러 장을 한 번에: 디코딩 → 마스크 추론 1회(배치) → 합성/인코딩.
+        항목별 결과는 (이미지, PNG) 또는 예외 객체 (한 장이 깨져도 나머지는 처리).
+        """
+        tier = get_tier(tier)
+        with imaging.budget_many(contents, "rembg", tier.max_side):
+            return self._cutout_batch(contents, tier)
+
+    def _cutout_batch(self, contents: list[bytes], tier: QualityTier) -> list:
+        results: list = [None] * len(contents)
+        decoded = []
+        for i, content in enumerate(contents):
+            try:
+                with metrics.stage("image_decode"):
+                    decoded.append((i, imaging.decode(content, "rembg", max_side=tier.max_side)))
+            except Exception as e:
+                results[i] = e
+        t0 = time.perf_counter()
+        with metrics.stage("rembg_batch"):
+            masks = self._predict_masks([img for _, img in decoded], tier.model)
+        if masks is not None:
+            REMBG_SECONDS.observe((time.perf_counter() - t0) / len(masks), tier=tier.name)
+        for n, (i, img) in enumerate(decoded):
+            try:
+                with metrics.stage("rembg"):
+                    if masks is None:
+                        t0 = time.perf_counter()
+                        out = self.remove_sync(img, tier.name)
+                        REMBG_SECONDS.observe(time.perf_counter() - t0, tier=tier.name)
+                    else:
+                        from rembg.bg import naive_cutout
+
+                        out = naive_cutout(img, masks[n])
+                results[i] = self._encode(out)
+            except Exception as e:
+                results[i] = e
+        return results
+
+    def _predict_masks(self, imgs: list, model: str) -> Optional[list]:
+        """
+        u2net 계열 마스크를 (N, 3, 320, 320) 텐서 하나로 추론 (rembg U2netSession.predict와 같은 전/후처리).
+        배치를 지원하지 않는 모델/입력(고정 batch=1 등)이면 None → 호출 측에서 1장씩 처리.
+        """
+        if len(imgs) < 2 or model not in _BATCHABLE_MODELS:
+            return None
+        import numpy as np
+        from PIL import Image
+
+        session = self._get_session(model)
+        inner = getattr(session, "inner_session", None)
+        if inner is None:
+            return None
+        inp = inner.get_inputs()[0]
+        if isinstance(inp.shape[0], int) and inp.shape[0] != len(imgs):
+            return None
+        mean, std = (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)
+        batch = np.concatenate([session.normalize(img, mean, std, (320, 320))[inp.name] for img in imgs])
+        try:
+            pred = inner.run(None, {inp.name: batch})[0][:, 0, :, :]
+        except Exception:
+            return None
+        masks = []
+        for img, p in zip(imgs, pred):
+            lo, hi = p.min(), p.max()
+            p = (p - lo) / max(hi - lo, 1e-6)
+            mask = Image.fromarray((p.clip(0, 1) * 255).astype("uint8"), mode="L")
+            masks.append(mask.resize(img.size, Image.Resampling.LANCZOS))
+        return masks
+
+    @staticmethod
+    def _encode(output_img):
+        # 원본은 항상 PNG (압축 레벨은 CUTOUT_PNG_COMPRESS_LEVEL), WebP 등 변환본은 전달 시점에 생성
+        with metrics.stage("png_encode"):
+            output_img = imaging.downscale(output_img, "preview")
+            return output_img, encoders.encode(output_img, encoders.MASTER)
+
+    # ---- 비동기 API -----------------------------------------------------------
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="rembg"
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        # contextvars 복사 → 워커 스레드의 구간 기록도 요청의 Server-Timing에 들어감
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), ctx.run, fn, *args)
+
+    async def remove(self, img, tier: Optional[str] = None):
+        return await self._run(self.remove_sync, img, tier)
+
+    async def _cutout_one(self, content: bytes, tier: str):
+        """(이미지 또는 None, PNG) - 서비스 결과는 PNG만 (이미지는 Cutout.pil()에서 필요할 때 디코딩)"""
+        async with self.limiter.slot():
+            if self.service is not None:
+                png = await self.service.cutout(content, tier)
+                if png is not None:
+                    return None, png
+            return await self._run(self.cutout_sync, content, tier)
+
+    async def _cutout_chunk(self, contents: list[bytes], tier: str) -> list:
+        if self.service is None:
+            return await self._run(self.cutout_batch_sync, contents, tier)
+        # 서비스가 다른 워커의 요청과 함께 배치로 묶음 → 1장씩 동시에 보냄
+        results = list(await asyncio.gather(
+            *(self.service.cutout(content, tier) for content in contents), return_exceptions=True
+        ))
+        local = [i for i, result in enumerate(results) if result is None]
+        if local:
+            fallback = await self._run(self.cutout_batch_sync, [contents[i] for i in local], tier)
+            for i, result in zip(local, fallback):
+                results[i] = result
+        return [r if isinstance(r, (Exception, tuple)) else (None, r) for r in results]
+
+    async def is_cached(self, content: bytes, tier: Optional[str] = None) -> bool:
+        """배경 제거 결과가 캐시에 있는지 (있으면 추론 없이 반환 → 요청 입구에서 cpu 단계 입장 확인 생략)"""
+        if self.cache is None:
+            return False
+        settings = self.settings(get_tier(tier))
+        key = await asyncio.to_thread(cutout_key, content, settings)
+        return self.cache.contains(key)
+
+    async def cutout(self, content: bytes, tier: Optional[str] = None) -> Cutout:
+        tier = get_tier(tier).name
+        if self.cache is None:
+            output_img, png = await self._cutout_one(content, tier)
+            return Cutout(png, image=output_img)
+
+        key = cutout_key(content, self.settings(TIERS[tier]))
+        png = await asyncio.to_thread(self.cache.get, key)
+        if png is not None:
+            return Cutout(png, cache_hit=True)
+
+        # 같은 파일 동시 재시도는 추론 1번으로 합침
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._cutout_and_store(key, content, tier))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+        output_img, png = await asyncio.shield(fut)
+        return Cutout(png, image=output_img)
+
+    async def cutout_many(self, contents: list[bytes], tier: Optional[str] = None):
+        """
+        여러 장 배경 제거. 캐시 미스는 REMBG_BATCH_SIZE장씩 묶어 워커 풀에 배치로 제출하고,
+        (입력 인덱스, Cutout 또는 예외)를 끝나는 순서대로 yield.
+        """
+        tier = get_tier(tier).name
+        settings = self.settings(TIERS[tier])
+        pending: list[tuple[int, bytes, Optional[str]]] = []
+        for i, content in enumerate(contents):
+            key = cutout_key(content, settings) if self.cache is not None else None
+            png = await asyncio.to_thread(self.cache.get, key) if key else None
+            if png is not None:
+                yield i, Cutout(png, cache_hit=True)
+            else:
+                pending.append((i, content, key))
+
+        async def run_chunk(chunk):
+            try:
+                # 배치 1개 = 워커 1개 → 슬롯 1개
+                async with self.limiter.slot():
+                    results = await self._cutout_chunk([content for _, content, _ in chunk], tier)
+            except admission.Overloaded as e:
+                results = [e] * len(chunk)
+            for (_, _, key), result in zip(chunk, results):
+                if key is not None and not isinstance(result, Exception):
+                    await asyncio.to_thread(self.cache.put, key, result[1])
+            return chunk, results
+
+        size = max(1, REMBG_BATCH_SIZE)
+        tasks = [
+            asyncio.ensure_future(run_chunk(pending[n:n + size]))
+            for n in range(0, len(pending), size)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                chunk, results = await next_done
+                for (i, _, _), result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        yield i, result
+                    else:
+                        yield i, Cutout(result[1], image=result[0])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _cutout_and_store(self, key: str, content: bytes, tier: str):
+        output_img, png = await self._cutout_one(content, tier)
+        await asyncio.to_thread(self.cache.put, key, png)
+        return output_img, png
+
+    async def warmup(self, tier: Optional[str] = None) -> None:
+        """세션 로드(필요 시 모델 다운로드)를 워커 풀에서 미리 수행"""
+        await self._run(self._get_session, get_tier(tier).model)
+
+    async def warmup_inference(self, tier: Optional[str] = None) -> None:
+        """작은 더미 이미지로 디코딩 → 추론 → PNG 인코딩을 1회 실행 (ONNX 첫 실행 초기화 비용을 미리 지불)"""
+
+        def run():
+            from PIL import Image
+
+            buffer = io.BytesIO()
+            Image.new("RGB", (64, 64), (200, 180, 160)).save(buffer, format="JPEG")
+            self.cutout_sync(buffer.getvalue(), tier)
+
+        await self._run(run)
+
+    def stats(self) -> dict:
+        return {
+            "service": self.service.stats() if self.service is not None else None,
+            "admission": self.limiter.stats(),
+            "default_tier": REMBG_DEFAULT_TIER,
+            "tiers": {
+                t.name: {"model": t.model, "max_side": t.max_side, "loaded": t.model in self._sessions}
+                for t in TIERS.values()
+            },
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,199 @@
+"""
+내 옷장 코디 후보 로컬 순위 - LLM에는 상위 K개만 전달
+- 아이템마다 Lab 색 공간 히스토그램 (업로드 시 계산해서 저장, 없으면 요청 시 계산)
+- 점수 = 선택한 옷과의 색 조화 + 퍼스널 컬러 팔레트 적합도 (행렬 곱 한 번으로 전체 옷장 계산)
+- 옷 종류 조합 규칙은 프롬프트가 아니라 하드 필터로 적용
+- LLM 없이도 같은 순위로 코디를 만들 수 있음 (키 없음 / LLM 타임아웃 시 폴백)
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# LLM에 보낼 후보 수
+CLOSET_TOP_K = int(os.getenv("CLOSET_TOP_K", 8))
+# 최종 점수에서 색 조화 비중 (나머지는 퍼스널 컬러 적합도)
+CLOSET_HARMONY_WEIGHT = float(os.getenv("CLOSET_HARMONY_WEIGHT", 0.6))
+
+# Lab 히스토그램 구간: L 4칸 × a 5칸 × b 5칸 = 100차원
+_L_BINS, _AB_BINS = 4, 5
+_AB_RANGE = 60.0  # 옷 색은 대부분 |a|, |b| ≤ 60 → 밖은 끝 칸으로
+HIST_SIZE = _L_BINS * _AB_BINS * _AB_BINS
+_NEUTRAL_CHROMA = 15.0  # 이보다 채도가 낮으면 무채색 취급
+_NEUTRAL_LIGHTNESS = 25.0  # 네이비/다크브라운처럼 아주 어두운 색도 무채색처럼 취급
+
+# 선택한 옷 종류 → 함께 추천할 수 있는 옷장 아이템 종류
+COMPATIBLE_TYPES = {
+    "하의": {"이너", "아우터"},
+    "이너": {"하의", "아우터"},
+    "아우터": {"이너", "하의"},
+}
+
+# 퍼스널 컬러별 대표 팔레트 (main.PERSONAL_COLORS와 같은 키)
+PERSONAL_COLOR_PALETTES = {
+    "봄 웜": ["#ff7f50", "#ffdab9", "#ffd966", "#fff8e7", "#d2a679", "#9acd32", "#fa8072", "#40c9b5"],
+    "여름 쿨": ["#b8a9d9", "#b0c4de", "#e8a0bf", "#a9a9b3", "#aaf0d1", "#5b6c8f", "#f5f5fa", "#c7d3e8"],
+    "가을 웜": ["#c19a6b", "#708238", "#d4a017", "#b5523b", "#8f8552", "#6b4226", "#c8553d", "#d9c3a0"],
+    "겨울 쿨": ["#111111", "#ffffff", "#1f2a5a", "#800020", "#2346b8", "#c2185b", "#36454f", "#d8dde6"],
+}
+
+
+# =============================================================================
+# 색 공간 변환 / 히스토그램
+# =============================================================================
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(..., 3) uint8 sRGB → (..., 3) CIE Lab (D65)"""
+    c = rgb.astype(np.float32) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([
+        [0.4124, 0.2126, 0.0193],
+        [0.3576, 0.7152, 0.1192],
+        [0.1805, 0.0722, 0.9505],
+    ], dtype=np.float32)
+    xyz /= np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def _hex_to_rgb(value: str) -> tuple[int, int, int]:
+    value = value.lstrip("#")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+def _bin_index(lab: np.ndarray) -> np.ndarray:
+    li = np.clip((lab[..., 0] / 100.0 * _L_BINS).astype(int), 0, _L_BINS - 1)
+    ab = np.clip(((lab[..., 1:] + _AB_RANGE) / (2 * _AB_RANGE) * _AB_BINS).astype(int), 0, _AB_BINS - 1)
+    return (li * _AB_BINS + ab[..., 0]) * _AB_BINS + ab[..., 1]
+
+
+def color_histogram(img, sample: int = 64) -> list[float]:
+    """배경(투명) 제외 Lab 히스토그램 (합 1, 불투명 픽셀이 없으면 전부 0). JSON 저장용 list"""
+    thumb = img.convert("RGBA")
+    thumb.thumbnail((sample, sample))
+    px = np.asarray(thumb)
+    rgb = px[..., :3][px[..., 3] >= 128]
+    hist = np.zeros(HIST_SIZE, dtype=np.float32)
+    if len(rgb):
+        np.add.at(hist, _bin_index(rgb_to_lab(rgb)), 1.0)
+        hist /= len(rgb)
+    return [round(float(v), 4) for v in hist]
+
+
+# =============================================================================
+# 점수 행렬 (구간 중심 기준, 프로세스당 1회 계산)
+# =============================================================================
+
+@lru_cache(maxsize=1)
+def _bin_centers() -> np.ndarray:
+    l_step, ab_step = 100.0 / _L_BINS, 2 * _AB_RANGE / _AB_BINS
+    li, ai, bi = np.meshgrid(np.arange(_L_BINS), np.arange(_AB_BINS), np.arange(_AB_BINS), indexing="ij")
+    return np.stack([
+        (li + 0.5) * l_step,
+        (ai + 0.5) * ab_step - _AB_RANGE,
+        (bi + 0.5) * ab_step - _AB_RANGE,
+    ], axis=-1).reshape(-1, 3)
+
+
+@lru_cache(maxsize=1)
+def _harmony_matrix() -> np.ndarray:
+    """
+    구간 i 색과 구간 j 색의 조화도 (0~1).
+    무채색(및 아주 어두운 색)은 어디에나 무난, 유채색끼리는 유사색 > 보색 > 삼각 배색 순, 애매한 색상 차(≈60~100°)는 낮게.
+    밝기 대비가 있으면 약간 가산.
+    """
+    c = _bin_centers()
+    chroma = np.hypot(c[:, 1], c[:, 2])
+    hue = np.arctan2(c[:, 2], c[:, 1])
+    d = np.abs(hue[:, None] - hue[None, :])
+    d = np.minimum(d, 2 * np.pi - d)  # 0 ~ π
+
+    def bump(center_deg, width_deg):
+        return np.exp(-((np.degrees(d) - center_deg) / width_deg) ** 2)
+
+    chromatic = np.maximum.reduce([0.9 * bump(0, 25), 0.75 * bump(180, 35), 0.55 * bump(120, 15)])
+    chromatic = np.maximum(chromatic, 0.15)
+    neutral = (chroma < _NEUTRAL_CHROMA) | (c[:, 0] < _NEUTRAL_LIGHTNESS)
+    neutral = neutral[:, None] | neutral[None, :]
+    score = np.where(neutral, 0.8, chromatic)
+    contrast = np.minimum(np.abs(c[:, None, 0] - c[None, :, 0]) / 50.0, 1.0)
+    return np.clip(score + 0.1 * contrast, 0.0, 1.0).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _palette_affinity(personal_color: str) -> Optional[np.ndarray]:
+    """구간별 퍼스널 컬러 팔레트 적합도 (가장 가까운 팔레트 색과의 ΔE로 계산)"""
+    palette = PERSONAL_COLOR_PALETTES.get(personal_color)
+    if not palette:
+        return None
+    lab = rgb_to_lab(np.array([_hex_to_rgb(h) for h in palette], dtype=np.uint8))
+    delta = np.linalg.norm(_bin_centers()[:, None, :] - lab[None, :, :], axis=-1).min(axis=1)
+    return np.exp(-((delta / 25.0) ** 2)).astype(np.float32)
+
+
+# =============================================================================
+# 순위
+# =============================================================================
+
+@dataclass
+class RankedCandidate:
+    id: str
+    item_type: Optional[str]
+    score: float
+    harmony: float
+    palette: Optional[float]
+
+
+def rank_candidates(
+    selected_type: Optional[str],
+    selected_hist: Optional[list[float]],
+    items: list[tuple[str, Optional[str], Optional[list[float]]]],
+    personal_color: str,
+) -> list[RankedCandidate]:
+    """
+    items: (id, item_type, Lab 히스토그램). 조합 규칙에 맞지 않는 종류는 제외하고 점수 내림차순.
+    동점은 입력 순서 유지 → 같은 입력이면 항상 같은 결과.
+    """
+    allowed = COMPATIBLE_TYPES.get(selected_type or "")
+    pool = [it for it in items if allowed is None or it[1] is None or it[1] in allowed]
+    if not pool:
+        return []
+
+    zeros = [0.0] * HIST_SIZE
+    hists = np.array([h or zeros for _, _, h in pool], dtype=np.float32)  # (N, HIST_SIZE)
+    sel = np.array(selected_hist or zeros, dtype=np.float32)
+
+    harmony = hists @ (_harmony_matrix() @ sel)
+    affinity = _palette_affinity(personal_color)
+    if affinity is None:
+        palette, score = None, harmony
+    else:
+        palette = hists @ affinity
+        score = CLOSET_HARMONY_WEIGHT * harmony + (1 - CLOSET_HARMONY_WEIGHT) * palette
+
+    order = np.argsort(-score, kind="stable")
+    return [
+        RankedCandidate(
+            id=pool[i][0],
+            item_type=pool[i][1],
+            score=round(float(score[i]), 4),
+            harmony=round(float(harmony[i]), 4),
+            palette=None if palette is None else round(float(palette[i]), 4),
+        )
+        for i in order
+    ]
+
+
+def fallback_tip(candidate: RankedCandidate, personal_color: str) -> str:
+    """LLM 없이 만드는 스타일링 팁 (점수 근거를 그대로 설명)"""
+    tip = f"{candidate.item_type or '아이템'} 매칭 — 색 조화 {round(candidate.harmony * 100)}%"
+    if candidate.palette is not None:
+        tip += f", {personal_color} 팔레트 적합도 {round(candidate.palette * 100)}%"
+    return tip
@@ -0,0 +1,147 @@
+"""
+배경 제거 결과(컷아웃 PNG) 콘텐츠 주소 캐시
+- 키: SHA-256(업로드 원본 바이트 + rembg 설정)
+- 1차: 메모리 LRU (바이트 상한), 2차: 디스크 (바이트 상한, 오래 안 쓴 파일부터 삭제)
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+CUTOUT_CACHE_MEMORY_MB = float(os.getenv("CUTOUT_CACHE_MEMORY_MB", 64))
+CUTOUT_CACHE_DISK_MB = float(os.getenv("CUTOUT_CACHE_DISK_MB", 512))
+CUTOUT_CACHE_DIR = os.getenv(
+    "CUTOUT_CACHE_DIR", str(Path(__file__).resolve().parent / ".cache" / "cutouts")
+)
+
+
+def cutout_key(content: bytes, settings: str) -> str:
+    h = hashlib.sha256(content)
+    h.update(b"\0" + settings.encode("utf-8"))
+    return h.hexdigest()
+
+
+class CutoutCache:
+    """
+    스레드 안전 2단 캐시. 메서드는 모두 동기 → 디스크 접근이 있는 get/put은
+    호출 측에서 asyncio.to_thread로 실행.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = CUTOUT_CACHE_DIR,
+        memory_bytes: int = int(CUTOUT_CACHE_MEMORY_MB * 1024 * 1024),
+        disk_bytes: int = int(CUTOUT_CACHE_DISK_MB * 1024 * 1024),
+    ):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._dir = Path(directory) if directory and disk_bytes > 0 else None
+        # 디스크 인덱스: key -> 크기 (OrderedDict 순서 = 최근 사용 순)
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_used = 0
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            files = sorted(self._dir.glob("*.png"), key=lambda p: p.stat().st_mtime)
+            for path in files:
+                size = path.stat().st_size
+                self._disk[path.stem] = size
+                self._disk_used += size
+            self._evict_disk()
+
+    def contains(self, key: str) -> bool:
+        """읽지 않고 있는지만 확인 (적중/미스 통계에 넣지 않음)"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return png
+            on_disk = key in self._disk
+
+        if on_disk:
+            path = self._dir / f"{key}.png"
+            try:
+                png = path.read_bytes()
+                os.utime(path)  # 재시작 후에도 최근 사용 순서 유지
+            except OSError:
+                png = None
+            with self._lock:
+                if png is None:
+                    self._disk_used -= self._disk.pop(key, 0)
+                else:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.stats["disk_hits"] += 1
+                    self._put_memory(key, png)
+                    return png
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, png: bytes) -> None:
+        with self._lock:
+            self._put_memory(key, png)
+            if self._dir is None or key in self._disk or len(png) > self.disk_bytes:
+                return
+        # tmp 파일에 쓴 뒤 rename → 동시 읽기에서 잘린 파일이 보이지 않음
+        fd, tmp = tempfile.mkstemp(dir=self._dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(png)
+            os.replace(tmp, self._dir / f"{key}.png")
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+            return
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(png)
+                self._disk_used += len(png)
+            self._evict_disk()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+            }
+
+    # ---- 내부 (self._lock 보유 상태에서 호출) -----------------------------------
+
+    def _put_memory(self, key: str, png: bytes) -> None:
+        if len(png) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old)
+        self._memory[key] = png
+        self._memory_used += len(png)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self._disk_used > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            (self._dir / f"{key}.png").unlink(missing_ok=True)
+
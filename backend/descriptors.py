@@ -0,0 +1,141 @@
+"""
+옷장 아이템 속성(descriptor) - 업로드 시 1회 추출해 저장, 코디 요청에는 이미지 대신 텍스트로 전달
+- 대표 색: 컷아웃의 불투명 픽셀만 양자화해서 로컬 계산 (LLM 불필요)
+- 소재/패턴/격식/스타일 태그: 옷 종류 판별과 같은 Gemini 호출 1번에 함께 추출
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+import metrics
+
+_DESCRIPTOR_FIELDS = (
+    "- item_type: 아우터 (코트, 자켓, 패딩, 블레이저 등) / 이너 (티셔츠, 니트, 셔츠, 블라우스 등) / "
+    "하의 (청바지, 슬랙스, 스커트, 치마, 반바지 등) 중 하나\n"
+    "- material: 소재 (예: 데님, 니트, 면, 울, 가죽, 린넨, 나일론)\n"
+    "- pattern: 패턴 (예: 무지, 스트라이프, 체크, 플로럴, 도트, 그래픽)\n"
+    "- formality: 캐주얼 / 세미포멀 / 포멀 중 하나\n"
+    "- style_tags: 스타일 키워드 1~4개 (예: 미니멀, 스트릿, 빈티지, 러블리, 아웃도어)\n"
+    "- color_names: 주요 색 이름 1~3개 (한국어)\n\n"
+)
+_DESCRIPTOR_EXAMPLE = (
+    '{"item_type": "아우터", "material": "울", "pattern": "무지", "formality": "세미포멀", '
+    '"style_tags": ["미니멀"], "color_names": ["차콜"]}'
+)
+
+DESCRIPTOR_PROMPT = (
+    "이 옷 이미지를 보고 아래 항목을 판별해줘.\n"
+    + _DESCRIPTOR_FIELDS
+    + "반드시 다음 JSON 형식으로만 응답해. 다른 텍스트 금지.\n"
+    + _DESCRIPTOR_EXAMPLE
+)
+
+
+def batch_descriptor_prompt(count: int) -> str:
+    """이미지 여러 장을 Gemini 1번 호출로 판별 - 이미지 순서대로 JSON 배열"""
+    return (
+        f"첨부된 옷 이미지 {count}장을 순서대로 보고, 각 이미지마다 아래 항목을 판별해줘.\n"
+        + _DESCRIPTOR_FIELDS
+        + f"반드시 이미지 순서와 같은 순서, 길이 {count}의 JSON 배열로만 응답해. 다른 텍스트 금지.\n"
+        + f"[{_DESCRIPTOR_EXAMPLE}, ...]"
+    )
+
+
+class DominantColor(BaseModel):
+    hex: str
+    share: float  # 불투명 픽셀 중 비율 (0~1)
+
+
+class ItemDescriptor(BaseModel):
+    item_type: str
+    colors: list[DominantColor] = []
+    color_names: list[str] = []
+    material: Optional[str] = None
+    pattern: Optional[str] = None
+    formality: Optional[str] = None
+    style_tags: list[str] = []
+
+    @property
+    def dominant_color_hex(self) -> Optional[str]:
+        return self.colors[0].hex if self.colors else None
+
+    def to_prompt_line(self) -> str:
+        """코디 프롬프트용 한 줄 요약 (이미지 1장보다 훨씬 적은 토큰)"""
+        parts = [f"종류: {self.item_type}"]
+        if self.colors:
+            colors = ", ".join(f"{c.hex} {round(c.share * 100)}%" for c in self.colors)
+            names = f" ({', '.join(self.color_names)})" if self.color_names else ""
+            parts.append(f"색: {colors}{names}")
+        for label, value in (("소재", self.material), ("패턴", self.pattern), ("격식", self.formality)):
+            if value:
+                parts.append(f"{label}: {value}")
+        if self.style_tags:
+            parts.append(f"스타일: {', '.join(self.style_tags)}")
+        return " | ".join(parts)
+
+
+def dominant_colors(img, k: int = 3, sample: int = 96) -> list[DominantColor]:
+    """배경(투명) 제외 대표 색 k개. 작은 썸네일에서 계산 → 이미지 크기와 무관하게 수 ms"""
+    from PIL import Image
+
+    thumb = img.convert("RGBA")
+    thumb.thumbnail((sample, sample))
+    alpha = thumb.getchannel("A")
+    opaque = [p[:3] for p, a in zip(thumb.getdata(), alpha.getdata()) if a >= 128]
+    if not opaque:
+        return []
+    strip = Image.new("RGB", (len(opaque), 1))
+    strip.putdata(opaque)
+    quantized = strip.quantize(colors=k, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+    counts = sorted(quantized.getcolors(), reverse=True)
+    return [
+        DominantColor(
+            hex="#{:02x}{:02x}{:02x}".format(*palette[idx * 3: idx * 3 + 3]),
+            share=round(count / len(opaque), 3),
+        )
+        for count, idx in counts[:k]
+    ]
+
+
+def parse_descriptor(text: Optional[str], colors: list[DominantColor]) -> ItemDescriptor:
+    raw = (text or "{}").strip()
+    if "```" in raw:
+        s, e = raw.find("{"), raw.rfind("}") + 1
+        raw = raw[s:e] if s >= 0 and e > 0 else "{}"
+    return descriptor_from_dict(metrics.parse_json(raw, "descriptor"), colors)
+
+
+def parse_descriptor_batch(text: Optional[str], count: int) -> list[Optional[dict]]:
+    """배치 응답 → 이미지 순서대로 dict (응답이 짧거나 항목이 객체가 아니면 None)"""
+    raw = (text or "[]").strip()
+    if "```" in raw:
+        s, e = raw.find("["), raw.rfind("]") + 1
+        raw = raw[s:e] if s >= 0 and e > 0 else "[]"
+    data = metrics.parse_json(raw, "descriptor_batch")
+    if not isinstance(data, list):
+        raise ValueError("JSON 배열이 아닌 응답")
+    items = [d if isinstance(d, dict) else None for d in data[:count]]
+    return items + [None] * (count - len(items))
+
+
+def descriptor_from_dict(data: dict, colors: list[DominantColor]) -> ItemDescriptor:
+    item_type = data.get("item_type", "이너")
+    if item_type == "바지":  # 구버전 응답 대비 변환
+        item_type = "하의"
+
+    def as_list(v) -> list[str]:
+        if isinstance(v, str):
+            v = [v]
+        return [str(x) for x in v or [] if x][:4]
+
+    return ItemDescriptor(
+        item_type=item_type,
+        colors=colors,
+        color_names=as_list(data.get("color_names"))[:3],
+        material=data.get("material") or None,
+        pattern=data.get("pattern") or None,
+        formality=data.get("formality") or None,
+        style_tags=as_list(data.get("style_tags")),
+    )
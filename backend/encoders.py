@@ -0,0 +1,100 @@
+"""
+컷아웃(RGBA) 인코더 - 저장용 원본과 전달용 변환본을 한 곳에서 관리
+- 원본(master): PNG. 캐시/서버 옷장/Storage에 저장되고 SHA-256 콘텐츠 주소의 기준 (압축 레벨만 조정)
+- 변환본: GET /api/images/{sha}?format=&size= 요청 시 원본에서 만들어 캐시
+    png-fast / png-small: 압축 레벨 1 / 9 (인코딩 시간 ↔ 크기)
+    webp:      무손실 WebP (알파 포함)
+    webp-near: 색은 고품질 손실 WebP, 알파는 무손실 (Pillow가 libwebp near_lossless 옵션을 노출하지 않아 대신 사용)
+  size=thumb: 알파를 유지한 축소 미리보기 (긴 변 IMAGE_THUMB_SIDE)
+"""
+
+import io
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+# 원본 PNG 압축 레벨 (0-9). 낮을수록 인코딩이 빠르고 파일이 큼 (Pillow 기본 6)
+CUTOUT_PNG_COMPRESS_LEVEL = int(os.getenv("CUTOUT_PNG_COMPRESS_LEVEL", 6))
+CUTOUT_WEBP_METHOD = int(os.getenv("CUTOUT_WEBP_METHOD", 4))  # 0(빠름) - 6(작음)
+CUTOUT_WEBP_NEAR_QUALITY = int(os.getenv("CUTOUT_WEBP_NEAR_QUALITY", 90))
+IMAGE_THUMB_SIDE = int(os.getenv("IMAGE_THUMB_SIDE", 384))
+
+MASTER = "png"
+SIZES = ("original", "thumb")
+
+
+@dataclass
+class Encoder:
+    name: str
+    format: str
+    mime_type: str
+    lossless: bool
+    options: dict = field(default_factory=dict)
+
+    def encode(self, img) -> bytes:
+        buffer = io.BytesIO()
+        img.save(buffer, format=self.format, **self.options)
+        return buffer.getvalue()
+
+
+ENCODERS = {
+    e.name: e
+    for e in (
+        Encoder("png", "PNG", "image/png", True, {"compress_level": CUTOUT_PNG_COMPRESS_LEVEL}),
+        Encoder("png-fast", "PNG", "image/png", True, {"compress_level": 1}),
+        Encoder("png-small", "PNG", "image/png", True, {"compress_level": 9, "optimize": True}),
+        # exact=False: 완전 투명 픽셀의 색은 버려도 됨 → 더 작게
+        Encoder("webp", "WEBP", "image/webp", True, {"lossless": True, "method": CUTOUT_WEBP_METHOD, "exact": False}),
+        Encoder("webp-near", "WEBP", "image/webp", False, {
+            "quality": CUTOUT_WEBP_NEAR_QUALITY, "alpha_quality": 100, "method": CUTOUT_WEBP_METHOD, "exact": False,
+        }),
+    )
+}
+
+
+def validate(name: str, setting: str, extra: tuple[str, ...] = ()) -> str:
+    """
+    설정 값이 등록된 인코더 이름(또는 extra - 예: "auto")인지 기동 시 확인
+    (잘못된 값은 첫 사용 때 KeyError 대신 바로 ValueError)
+    """
+    choices = (*extra, *ENCODERS)
+    if name not in choices:
+        raise ValueError(f"{setting}={name!r}: 사용할 수 있는 값은 {', '.join(choices)}")
+    return name
+
+
+def encode(img, name: str = MASTER) -> bytes:
+    return ENCODERS[name].encode(img)
+
+
+def thumbnail(img, side: int = IMAGE_THUMB_SIDE):
+    """알파 유지 축소 (Pillow는 RGBA를 premultiplied로 리샘플링 → 가장자리 색 번짐 없음)"""
+    from PIL import Image
+
+    w, h = img.size
+    if max(w, h) <= side:
+        return img
+    ratio = side / max(w, h)
+    return img.resize((max(1, round(w * ratio)), max(1, round(h * ratio))), Image.Resampling.LANCZOS)
+
+
+def transcode(master: bytes, name: str, size: str = "original") -> bytes:
+    """원본 PNG → 다른 인코더/크기 (워커 스레드에서 호출)"""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(master))
+    img.load()
+    if size == "thumb":
+        img = thumbnail(img)
+    return encode(img, name)
+
+
+def negotiate(accept: Optional[str], requested: str, webp_encoder: Optional[str]) -> str:
+    """
+    requested가 인코더 이름이면 그대로, "auto"면 Accept 헤더에 image/webp가 있을 때 webp_encoder, 아니면 원본 PNG
+    """
+    if requested != "auto":
+        return requested
+    if webp_encoder and accept and "image/webp" in accept:
+        return webp_encoder
+    return MASTER
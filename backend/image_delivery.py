@@ -0,0 +1,134 @@
+"""
+처리된 이미지(컷아웃 PNG) 바이너리 전달 - JSON에 base64로 싣지 않고 URL로 반환
+- 저장: SHA-256(PNG) 이름으로 콘텐츠 주소 저장 (메모리 LRU + 디스크, cutout_cache.CutoutCache 재사용)
+- 캐시에서 밀려난 이미지는 서버 옷장(WardrobeStore.load_image)에서 다시 찾음
+- GET /api/images/{sha}: 강한 ETag + immutable Cache-Control, If-None-Match(304), Range(206)
+- ?format= / ?size= 변환본(WebP, 축소 미리보기 등, encoders.py)은 처음 요청 때 원본에서 만들어 같은 캐시에 보관
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+from starlette.responses import Response
+
+import encoders
+import metrics
+from cutout_cache import CutoutCache
+
+IMAGE_CACHE_MEMORY_MB = float(os.getenv("IMAGE_CACHE_MEMORY_MB", 32))
+IMAGE_CACHE_DISK_MB = float(os.getenv("IMAGE_CACHE_DISK_MB", 1024))
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR", str(Path(__file__).resolve().parent / ".cache" / "images")
+)
+# 콘텐츠 주소라 같은 URL의 내용은 절대 바뀌지 않음
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# format=auto 일 때 Accept에 image/webp가 있으면 쓸 인코더 (빈 값이면 항상 원본 PNG)
+IMAGE_AUTO_WEBP_ENCODER = os.getenv("IMAGE_AUTO_WEBP_ENCODER", "webp")
+if IMAGE_AUTO_WEBP_ENCODER:
+    encoders.validate(IMAGE_AUTO_WEBP_ENCODER, "IMAGE_AUTO_WEBP_ENCODER")
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def image_url(sha: str, format: str = "auto", size: str = "original") -> str:
+    query = {k: v for k, v in (("format", format), ("size", size)) if v not in ("auto", "original")}
+    return f"/api/images/{sha}" + (f"?{urlencode(query)}" if query else "")
+
+
+class ProcessedImages:
+    """메서드는 모두 동기 (디스크 접근) → 핸들러에서는 asyncio.to_thread로 호출"""
+
+    def __init__(
+        self,
+        cache: Optional[CutoutCache] = None,
+        fallback: Optional[Callable[[str], Optional[bytes]]] = None,
+    ):
+        self.cache = cache or CutoutCache(
+            directory=IMAGE_CACHE_DIR,
+            memory_bytes=int(IMAGE_CACHE_MEMORY_MB * 1024 * 1024),
+            disk_bytes=int(IMAGE_CACHE_DISK_MB * 1024 * 1024),
+        )
+        self.fallback = fallback
+
+    def put(self, png: bytes, sha: Optional[str] = None) -> str:
+        sha = sha or hashlib.sha256(png).hexdigest()
+        self.cache.put(sha, png)
+        return sha
+
+    def get(self, sha: str) -> Optional[bytes]:
+        if not _SHA256.match(sha):
+            return None
+        png = self.cache.get(sha)
+        if png is None and self.fallback is not None:
+            png = self.fallback(sha)
+            if png is not None:
+                self.cache.put(sha, png)
+        return png
+
+    def variant(self, sha: str, encoder: str, size: str = "original") -> Optional[bytes]:
+        """원본 PNG의 변환본 (encoders.ENCODERS 이름, encoders.SIZES). 원본이 없으면 None."""
+        if encoder == encoders.MASTER and size == "original":
+            return self.get(sha)
+        if not _SHA256.match(sha):
+            return None
+        key = f"{sha}-{encoder}-{size}"
+        data = self.cache.get(key)
+        if data is None:
+            master = self.get(sha)
+            if master is None:
+                return None
+            with metrics.stage("image_transcode"):
+                data = encoders.transcode(master, encoder, size)
+            self.cache.put(key, data)
+        return data
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+def image_response(
+    png: bytes, sha: str, headers, media_type: str = "image/png", vary: Optional[str] = None
+) -> Response:
+    """
+    조건부 GET / 단일 Range 요청 처리. sha는 ETag 값 (변환본은 "<sha>-<인코더>-<크기>").
+    여러 구간(multipart/byteranges)은 지원하지 않고 전체를 200으로 반환 (RFC 9110 허용).
+    """
+    etag = f'"{sha}"'
+    base = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if vary:
+        base["Vary"] = vary
+
+    if _etag_matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=base)
+
+    size = len(png)
+    range_header = headers.get("range")
+    if_range = headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        m = _RANGE.match(range_header.strip())
+        if m and (m.group(1) or m.group(2)):
+            first, last = m.group(1), m.group(2)
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:  # bytes=-N : 마지막 N바이트
+                start = max(size - int(last), 0)
+                end = size - 1
+            if start >= size or start > end:
+                return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{size}"})
+            return Response(
+                content=png[start:end + 1],
+                status_code=206,
+                media_type=media_type,
+                headers={**base, "Content-Range": f"bytes {start}-{end}/{size}"},
+            )
+
+    return Response(content=png, media_type=media_type, headers=base)
@@ -0,0 +1,210 @@
+"""
+이미지 정규화 - 추론/LLM 호출 전에 해상도와 전송 크기를 제한
+- EXIF 방향 적용, 용도(consumer)별 최대 변 길이로 축소, 용도에 맞는 포맷으로 재인코딩
+- rembg 입력 / LLM 입력 / 클라이언트 미리보기(컷아웃 PNG) 세 가지 용도
+- 디코딩 전에 헤더의 가로x세로로 픽셀 수 상한 검사 (decompression bomb 차단)
+- 디코딩된 이미지가 동시에 차지하는 메모리(추정치) 합을 예산으로 제한 (memory_budget)
+"""
+
+import io
+import os
+import threading
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+import metrics
+
+# 용도별 최대 변 길이 (px)
+MAX_SIDE = {
+    "rembg": int(os.getenv("IMAGE_MAX_SIDE_REMBG", 1600)),
+    "llm": int(os.getenv("IMAGE_MAX_SIDE_LLM", 1024)),
+    "preview": int(os.getenv("IMAGE_MAX_SIDE_PREVIEW", 1024)),
+}
+LLM_JPEG_QUALITY = int(os.getenv("IMAGE_LLM_JPEG_QUALITY", 85))
+# 헤더에 적힌 가로x세로가 이보다 크면 디코딩하지 않음 (48MP 휴대폰 원본은 통과)
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 50_000_000))
+# 동시에 디코딩/처리 중인 이미지의 추정 메모리 합 상한 (0이면 제한 없음) + 예산이 빌 때까지 기다리는 최대 시간
+MEMORY_BUDGET_MB = int(os.getenv("IMAGE_MEMORY_BUDGET_MB", 512))
+MEMORY_WAIT_SEC = float(os.getenv("IMAGE_MEMORY_WAIT_SEC", 30))
+
+# 용도별 처리 중 출력 픽셀당 바이트 추정 (디코딩 결과 외에 변환/축소/마스크 합성 중간 버퍼)
+_BYTES_PER_PIXEL = {"rembg": 16, "llm": 8, "preview": 8}
+# 크기를 먼저 줄인 뒤 모드를 바꿔도 결과가 같은 모드
+_RESIZE_FIRST_MODES = ("RGB", "RGBA", "L")
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+# 픽셀 수는 open_image에서 직접 검사 → PIL의 같은 내용 경고는 끔 (상한의 2배 초과는 PIL도 헤더 단계에서 거절)
+warnings.filterwarnings("ignore", message=r"Image size \(\d+ pixels\) exceeds limit")
+
+
+@dataclass
+class EncodedImage:
+    """재인코딩된 이미지. LLM 호출 시 그대로 바이트로 전송 (SDK의 PNG 재인코딩 생략)"""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+
+def settings_key() -> str:
+    """정규화 설정 문자열 - 결과물 캐시 키에 포함"""
+    return ",".join(f"{k}={v}" for k, v in sorted(MAX_SIDE.items()))
+
+
+def open_image(content: bytes):
+    """헤더만 읽은 PIL 이미지 (픽셀은 아직 디코딩 전). 픽셀 수가 MAX_PIXELS를 넘으면 ImageTooLarge."""
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        img = Image.open(io.BytesIO(content))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from e
+    w, h = img.size
+    if w * h > MAX_PIXELS:
+        raise ImageTooLarge(f"이미지 해상도가 너무 큽니다 ({w}x{h}, 최대 {MAX_PIXELS:,}픽셀)")
+    return img
+
+
+def decode(content: bytes, consumer: str, mode: Optional[str] = "RGBA", max_side: Optional[int] = None):
+    """
+    업로드 바이트 → 용도별 크기로 축소된 PIL 이미지.
+    JPEG는 draft()로 디코딩 단계에서 1/2~1/8 축소 → 12MP 원본을 통째로 메모리에 올리지 않음.
+    mode=None 이면 RGB/RGBA/L 은 원래 모드 유지 (알파 없는 사진을 RGBA로 복사하지 않음).
+    max_side: 용도별 기본값 대신 쓸 최대 변 길이 (배경 제거 품질 단계별 입력 해상도)
+    """
+    from PIL import ImageOps
+
+    max_side = max_side or MAX_SIDE[consumer]
+    img = open_image(content)
+    w, h = img.size
+    if img.format == "JPEG" and max(w, h) > max_side:
+        # draft는 요청 크기 이상을 유지하는 최대 축소 배율을 고르므로 비율을 맞춰 요청
+        ratio = max_side / max(w, h)
+        img.draft("RGB", (round(w * ratio), round(h * ratio)))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in _RESIZE_FIRST_MODES and mode in (None, "RGB", "RGBA"):
+        # 줄인 뒤 변환 → 원본 크기 변환 복사본을 만들지 않음
+        img = downscale(img, consumer, max_side)
+        return img if mode is None or img.mode == mode else img.convert(mode)
+    return downscale(img.convert(mode or "RGBA"), consumer, max_side)
+
+
+def downscale(img, consumer: str, max_side: Optional[int] = None):
+    """긴 변이 용도별 최대값을 넘으면 비율 유지 축소 (작은 이미지는 그대로)"""
+    from PIL import Image
+
+    max_side = max_side or MAX_SIDE[consumer]
+    w, h = img.size
+    if max(w, h) <= max_side:
+        return img
+    # 새 이미지를 반환 (캐시 등에서 공유 중인 원본을 건드리지 않음)
+    ratio = max_side / max(w, h)
+    size = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def for_llm(img) -> EncodedImage:
+    """LLM 입력용: 축소 + 투명 배경은 흰색으로 합성 + JPEG"""
+    from PIL import Image
+
+    img = downscale(img, "llm")
+    if img.mode in ("RGBA", "LA", "P"):
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        img = flat
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=LLM_JPEG_QUALITY, optimize=True)
+    return EncodedImage(buffer.getvalue(), "image/jpeg", img.width, img.height)
+
+
+def llm_input(content: bytes) -> EncodedImage:
+    """업로드/base64 디코딩 바이트 → LLM 입력"""
+    with budget(content, "llm"):
+        return for_llm(decode(content, "llm", mode=None))
+
+
+# =============================================================================
+# 메모리 예산
+# =============================================================================
+
+def working_set(img, consumer: str, max_side: Optional[int] = None) -> int:
+    """헤더만 읽은 이미지 → 처리 중 최대 메모리 추정 (바이트)"""
+    w, h = img.size
+    scale = min(1.0, (max_side or MAX_SIDE[consumer]) / max(w, h, 1))
+    # JPEG draft는 목표 변 길이의 최대 2배까지만 디코딩, 나머지 포맷은 원본 크기 전체
+    decoded = w * h * (min(1.0, (2 * scale) ** 2) if img.format == "JPEG" else 1.0)
+    return int(decoded * 4 + w * h * scale * scale * _BYTES_PER_PIXEL[consumer])
+
+
+class MemoryBudget:
+    """
+    동시에 처리 중인 이미지의 추정 메모리 합 제한 (워커 스레드에서 사용).
+    예산보다 큰 1건은 예산 전체를 잡고 혼자 실행. 대기가 MEMORY_WAIT_SEC를 넘으면 TimeoutError.
+    """
+
+    def __init__(self, limit_bytes: int, wait_timeout: float = MEMORY_WAIT_SEC):
+        self.limit = limit_bytes
+        self.wait_timeout = wait_timeout
+        self.reserved = 0
+        self.counters = {"reservations": 0, "waits": 0, "timeouts": 0, "peak_reserved": 0}
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        if self.limit > 0:
+            nbytes = min(nbytes, self.limit)
+        with self._cond:
+            if self.limit > 0 and self.reserved + nbytes > self.limit:
+                self.counters["waits"] += 1
+                if not self._cond.wait_for(lambda: self.reserved + nbytes <= self.limit, self.wait_timeout):
+                    self.counters["timeouts"] += 1
+                    raise TimeoutError("이미지 처리 메모리 예산 대기 시간 초과")
+            self.reserved += nbytes
+            self.counters["reservations"] += 1
+            self.counters["peak_reserved"] = max(self.counters["peak_reserved"], self.reserved)
+        metrics.track_memory(nbytes)
+        try:
+            yield
+        finally:
+            metrics.track_memory(-nbytes)
+            with self._cond:
+                self.reserved -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit_mb": round(self.limit / 2**20, 1),
+                "reserved_mb": round(self.reserved / 2**20, 1),
+                **{k: (round(v / 2**20, 1) if k == "peak_reserved" else v) for k, v in self.counters.items()},
+            }
+
+
+memory_budget = MemoryBudget(MEMORY_BUDGET_MB * 2**20)
+
+
+def budget(content: bytes, consumer: str, max_side: Optional[int] = None):
+    """with budget(content, "rembg"): 디코딩 ~ 인코딩 구간. 헤더를 읽을 수 없으면 0으로 잡음 (decode에서 오류)."""
+    return budget_many([content], consumer, max_side)
+
+
+def budget_many(contents: list[bytes], consumer: str, max_side: Optional[int] = None):
+    from PIL import UnidentifiedImageError
+
+    total = 0
+    for content in contents:
+        try:
+            total += working_set(open_image(content), consumer, max_side)
+        except (UnidentifiedImageError, ImageTooLarge, OSError):
+            pass
+    return memory_budget.reserve(total)
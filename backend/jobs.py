@@ -0,0 +1,386 @@
+"""
+비동기 작업(job) 큐 - 오래 걸리는 분석을 바로 job ID로 응답하고 뒤에서 처리
+- 우선순위 큐 (priority가 클수록 먼저) + 대기열 상한 (가득 차면 JobQueueFull)
+- 동시에 실행하는 작업 수(JOB_WORKERS)와 별개로, 작업 안의 스테이지 종류별 동시 실행 수 제한
+  (cpu: rembg/이미지 처리, io: LLM/스토리지 호출) → Pipeline.run(limits=...)에 그대로 전달
+- 진행 상황은 Job.progress에 쌓이고 events()로 구독 (SSE)
+- JOB_STORE=sqlite 이면 입력/상태/결과를 SQLite에 기록 → 재시작 시 끝나지 않은 작업을 다시 대기열에 넣음
+  여러 프로세스(uvicorn 워커)가 같은 DB를 쓰면 작업마다 소유 프로세스(owner)를 두고, 소유자가 하트비트를 멈춘
+  작업만 원자적으로 넘겨받음 (같은 작업을 두 프로세스가 실행하지 않음)
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger("core-d.jobs")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))  # 동시에 실행하는 작업 수
+JOB_CPU_WORKERS = int(os.getenv("JOB_CPU_WORKERS", 2))  # 작업들이 동시에 돌리는 CPU 스테이지 수
+JOB_IO_WORKERS = int(os.getenv("JOB_IO_WORKERS", 8))  # 작업들이 동시에 돌리는 LLM/스토리지 호출 수
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", 100))
+JOB_RESULT_TTL_SEC = float(os.getenv("JOB_RESULT_TTL_SEC", 3600))  # 끝난 작업 보관 시간
+JOB_STORE = os.getenv("JOB_STORE", "memory")  # memory | sqlite
+JOB_DB_PATH = os.getenv(
+    "JOB_DB_PATH", str(Path(__file__).resolve().parent / ".data" / "jobs.sqlite3")
+)
+# 소유 프로세스 하트비트 주기 / 이 시간 동안 하트비트가 없으면 그 프로세스의 끝나지 않은 작업을 넘겨받음
+JOB_HEARTBEAT_SEC = float(os.getenv("JOB_HEARTBEAT_SEC", 5))
+JOB_OWNER_TIMEOUT_SEC = float(os.getenv("JOB_OWNER_TIMEOUT_SEC", 30))
+# 다른 프로세스가 실행 중인 작업의 이벤트(SSE)는 저장소를 이 주기로 다시 읽어 전달
+JOB_EVENTS_POLL_SEC = float(os.getenv("JOB_EVENTS_POLL_SEC", 1))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: dict
+    payload: Optional[bytes] = None  # 업로드 이미지 등 (끝나면 비움)
+    priority: int = 0
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: list[dict] = field(default_factory=list)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    owner: Optional[str] = None  # 실행을 맡은 프로세스 (JobManager.owner)
+    # 상태가 바뀔 때마다 교체되는 이벤트 (구독자는 교체 전 이벤트를 기다림)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def public(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class JobContext:
+    """핸들러에 전달: 진행 상황 기록 + 스테이지 종류별 동시 실행 제한"""
+
+    def __init__(self, job: Job, limits: dict[str, asyncio.Semaphore]):
+        self.job = job
+        self.limits = limits
+
+    def progress(self, stage: str, **data) -> None:
+        started = self.job.started_at or time.time()
+        self.job.progress.append({"stage": stage, "elapsed_ms": round((time.time() - started) * 1000, 1), **data})
+        self.job.notify()
+
+
+Handler = Callable[[Job, JobContext], Awaitable[Any]]
+
+
+def _result_error(result: Any) -> Optional[str]:
+    """핸들러가 실패 응답(success=False - Gemini 파싱/배경 제거 실패 등)을 돌려줬으면 오류 메시지, 성공이면 None"""
+    fields = result if isinstance(result, dict) else getattr(result, "__dict__", {})
+    if fields.get("success", True):
+        return None
+    return fields.get("error") or fields.get("message") or "작업 실패"
+
+
+class SQLiteJobStore:
+    """메서드는 모두 동기 → JobManager가 asyncio.to_thread로 호출"""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                payload BLOB,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                progress TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                owner TEXT
+            )
+            """
+        )
+        # 이전 스키마(owner 없음) DB
+        if "owner" not in {r[1] for r in self._db.execute("PRAGMA table_info(jobs)")}:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._db.execute("CREATE TABLE IF NOT EXISTS job_owners (owner TEXT PRIMARY KEY, heartbeat REAL NOT NULL)")
+        self._db.commit()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, json.dumps(job.params, ensure_ascii=False), job.payload,
+                 job.priority, job.status, job.created_at, job.started_at, job.finished_at,
+                 json.dumps(job.progress, ensure_ascii=False),
+                 None if job.result is None else json.dumps(job.result, ensure_ascii=False), job.error, job.owner),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def heartbeat(self, owner: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO job_owners VALUES (?, ?)", (owner, time.time()))
+            self._db.commit()
+
+    def release(self, owner: str) -> None:
+        """종료 - 남은 작업은 다른 프로세스가 바로 넘겨받을 수 있게 소유자 등록 해제"""
+        with self._lock:
+            self._db.execute("DELETE FROM job_owners WHERE owner = ?", (owner,))
+            self._db.commit()
+
+    def claim_orphans(self, owner: str, stale_before: float) -> list[Job]:
+        """
+        소유자가 없거나 하트비트가 끊긴 끝나지 않은 작업을 owner 소유 + queued로 넘겨받음.
+        UPDATE 한 문장이라 여러 프로세스가 동시에 호출해도 작업마다 한 프로세스만 가져감.
+        """
+        claim = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("DELETE FROM job_owners WHERE heartbeat < ?", (stale_before,))
+            # 이번 호출이 넘겨받은 행을 구분하도록 임시 소유자로 표시한 뒤 owner로 바꿈
+            self._db.execute(
+                "UPDATE jobs SET owner = ?, status = ?, started_at = NULL, progress = '[]' "
+                "WHERE status IN (?, ?) AND (owner IS NULL OR owner NOT IN (SELECT owner FROM job_owners))",
+                (claim, QUEUED, QUEUED, RUNNING),
+            )
+            rows = self._db.execute("SELECT * FROM jobs WHERE owner = ? ORDER BY created_at", (claim,)).fetchall()
+            self._db.execute("UPDATE jobs SET owner = ? WHERE owner = ?", (owner, claim))
+            self._db.commit()
+        jobs = [self._to_job(r) for r in rows]
+        for job in jobs:
+            job.owner = owner
+        return jobs
+
+    def purge(self, finished_before: float) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,))
+            self._db.commit()
+
+    @staticmethod
+    def _to_job(r) -> Job:
+        return Job(
+            id=r[0], kind=r[1], params=json.loads(r[2]), payload=r[3], priority=r[4], status=r[5],
+            created_at=r[6], started_at=r[7], finished_at=r[8], progress=json.loads(r[9] or "[]"),
+            result=None if r[10] is None else json.loads(r[10]), error=r[11], owner=r[12],
+        )
+
+
+def create_job_store() -> Optional[SQLiteJobStore]:
+    return SQLiteJobStore() if JOB_STORE == "sqlite" else None
+
+
+class JobManager:
+    """이벤트 루프 스레드에서만 사용. start()/stop()은 lifespan에서 호출."""
+
+    def __init__(
+        self,
+        store: Optional[SQLiteJobStore] = None,
+        workers: int = JOB_WORKERS,
+        stage_workers: Optional[dict[str, int]] = None,
+        max_queue: int = JOB_QUEUE_MAX,
+        ttl: float = JOB_RESULT_TTL_SEC,
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.stage_workers = stage_workers or {"cpu": JOB_CPU_WORKERS, "io": JOB_IO_WORKERS}
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.limits: dict[str, asyncio.Semaphore] = {}
+        self._handlers: dict[str, Handler] = {}
+        self._jobs: dict[str, Job] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        # 이 프로세스(같은 PID로 재시작해도 다른 값)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.counters = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "recovered": 0}
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self.limits = {kind: asyncio.Semaphore(max(1, n)) for kind, n in self.stage_workers.items()}
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.store is not None:
+            # 재시작 전(또는 멈춘 다른 프로세스)에 실행 중이던 작업도 처음부터 다시 실행
+            await self._adopt()
+            self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        # 남은 작업은 SQLite에 queued/running으로 남아 다른 프로세스 또는 다음 시작 때 복구됨
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            await asyncio.to_thread(self.store.release, self.owner)
+
+    async def submit(self, kind: str, params: dict, payload: Optional[bytes] = None, priority: int = 0) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"알 수 없는 작업 종류: {kind}")
+        if self._queue is None:
+            raise RuntimeError("JobManager.start()가 호출되지 않았습니다.")
+        if self._queue.qsize() >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise JobQueueFull()
+        self._purge()
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params, payload=payload, priority=priority, owner=self.owner)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, job)
+        self._enqueue(job)
+        self.counters["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = await asyncio.to_thread(self.store.get, job_id)
+        return job
+
+    async def events(self, job: Job) -> AsyncIterator[tuple[str, dict]]:
+        """
+        ("status" | "progress" | "done", data) 를 상태가 바뀔 때마다 전송, 끝나면 종료.
+        다른 프로세스가 실행 중인 작업은 저장소를 JOB_EVENTS_POLL_SEC마다 다시 읽음 (저장소에서 사라졌으면 종료).
+        """
+        sent_progress, sent_status = 0, None
+        while True:
+            local = self._jobs.get(job.id)
+            if local is not None:
+                job = local
+            changed = job._changed
+            while sent_progress < len(job.progress):
+                yield "progress", job.progress[sent_progress]
+                sent_progress += 1
+            if job.status != sent_status:
+                sent_status = job.status
+                yield "status", {"job_id": job.id, "status": job.status}
+            if job.status in FINISHED:
+                yield "done", job.public()
+                return
+            if local is not None:
+                await changed.wait()
+                continue
+            await asyncio.sleep(JOB_EVENTS_POLL_SEC)
+            latest = await asyncio.to_thread(self.store.get, job.id) if self.store is not None else None
+            if latest is None:
+                yield "done", job.public()
+                return
+            job = latest
+
+    def stats(self) -> dict:
+        running = sum(1 for j in self._jobs.values() if j.status == RUNNING)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "running": running,
+            "workers": self.workers,
+            "stage_workers": self.stage_workers,
+            **self.counters,
+        }
+
+    # ---- 내부 ----------------------------------------------------------------
+
+    def _enqueue(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        # priority가 클수록 먼저, 같으면 먼저 들어온 순
+        self._queue.put_nowait((-job.priority, next(self._seq), job.id))
+
+    async def _adopt(self) -> None:
+        """하트비트 등록 후 주인 없는 작업을 넘겨받아 대기열에 넣음"""
+        await asyncio.to_thread(self.store.heartbeat, self.owner)
+        stale_before = time.time() - JOB_OWNER_TIMEOUT_SEC
+        for job in await asyncio.to_thread(self.store.claim_orphans, self.owner, stale_before):
+            self._enqueue(job)
+            self.counters["recovered"] += 1
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SEC)
+            try:
+                await self._adopt()
+            except Exception:
+                logger.exception("작업 하트비트 실패")
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+        if self.store is not None:
+            asyncio.get_running_loop().run_in_executor(None, self.store.purge, cutoff)
+
+    async def _persist(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            await asyncio.to_thread(self.store.save, job)
+        except Exception:
+            logger.exception("작업 상태 저장 실패: %s", job.id)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            job.status, job.started_at = RUNNING, time.time()
+            job.notify()
+            await self._persist(job)
+            try:
+                job.result = await self._handlers[job.kind](job, JobContext(job, self.limits))
+                error = _result_error(job.result)
+                if error is None:
+                    job.status = SUCCEEDED
+                    self.counters["succeeded"] += 1
+                else:
+                    job.status, job.error = FAILED, error
+                    self.counters["failed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("작업 실패: %s (%s)", job.id, job.kind)
+                job.status, job.error = FAILED, str(e)
+                self.counters["failed"] += 1
+            job.finished_at = time.time()
+            job.payload = None
+            job.notify()
+            await self._persist(job)
@@ -0,0 +1,122 @@
+"""
+앱 수명 동안 공유하는 Gemini 클라이언트
+- lifespan에서 1회 생성, 커넥션 풀(httpx.AsyncClient)을 모든 요청이 재사용
+- 핸들러는 client.aio 로 await → LLM 왕복 동안 이벤트 루프를 막지 않음
+"""
+
+import asyncio
+import os
+from typing import Callable, Optional
+
+import metrics
+from imaging import EncodedImage
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# 워커 1개가 동시에 유지할 수 있는 Gemini 연결 수
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", 64))
+GEMINI_KEEPALIVE_CONNECTIONS = int(os.getenv("GEMINI_KEEPALIVE_CONNECTIONS", 32))
+
+
+def _to_parts(contents):
+    """imaging.EncodedImage는 인코딩된 바이트 그대로 Part로 전달"""
+    if not isinstance(contents, list):
+        return contents
+    from google.genai import types
+
+    return [
+        types.Part.from_bytes(data=c.data, mime_type=c.mime_type) if isinstance(c, EncodedImage) else c
+        for c in contents
+    ]
+
+
+class GeminiClient:
+    """
+    genai.Client 1개 + 풀링된 비동기 HTTP 클라이언트 보관.
+    키가 아직 없으면(.env 나중에 추가 등) 첫 사용 시점에 생성.
+    """
+
+    def __init__(self, key_provider: Callable[[], Optional[str]]):
+        self._key_provider = key_provider
+        self._api_key: Optional[str] = None
+        self._client = None
+        self._http = None
+        # 키 교체로 버려진 커넥션 풀 (닫는 중인 태스크 / 이벤트 루프 밖이라 aclose()까지 미룬 것)
+        self._closing: set[asyncio.Task] = set()
+        self._retired: list = []
+
+    @property
+    def client(self):
+        """genai.Client (키 없으면 None). 동기 호출은 워커 스레드에서만 사용."""
+        key = self._key_provider()
+        if not key:
+            return None
+        if self._client is None or key != self._api_key:
+            import httpx
+            from google import genai
+            from google.genai import types
+
+            if self._client is not None:
+                self._client.close()
+            if self._http is not None:
+                self._retire(self._http)
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=GEMINI_MAX_CONNECTIONS,
+                    max_keepalive_connections=GEMINI_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+            self._client = genai.Client(
+                api_key=key,
+                http_options=types.HttpOptions(httpx_async_client=self._http),
+            )
+            self._api_key = key
+        return self._client
+
+    def open(self) -> bool:
+        return self.client is not None
+
+    async def generate_content(self, contents, model: str = GEMINI_MODEL):
+        client = self.client
+        if client is None:
+            raise RuntimeError("GEMINI_API_KEY가 설정되지 않았습니다.")
+        with metrics.stage("gemini"):
+            try:
+                return await client.aio.models.generate_content(model=model, contents=_to_parts(contents))
+            except Exception as e:
+                metrics.LLM_FAILURES.inc(error=type(e).__name__)
+                raise
+
+    async def generate_content_stream(self, contents, model: str = GEMINI_MODEL):
+        """응답을 토큰 묶음(chunk) 단위로 yield"""
+        client = self.client
+        if client is None:
+            raise RuntimeError("GEMINI_API_KEY가 설정되지 않았습니다.")
+        with metrics.stage("gemini_stream"):
+            try:
+                stream = await client.aio.models.generate_content_stream(model=model, contents=_to_parts(contents))
+                async for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                metrics.LLM_FAILURES.inc(error=type(e).__name__)
+                raise
+
+    def _retire(self, http) -> None:
+        """이전 키의 커넥션 풀 닫기 예약 (이벤트 루프가 없으면 aclose()에서 닫음)"""
+        try:
+            task = asyncio.get_running_loop().create_task(http.aclose())
+        except RuntimeError:
+            self._retired.append(http)
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        while self._retired:
+            await self._retired.pop().aclose()
@@ -0,0 +1,327 @@
+"""
+LLM 게이트웨이 - 모든 Gemini 호출이 거쳐 가는 단일 진입점
+- 같은 프롬프트(텍스트 + 이미지 바이트 + 모델)가 동시에 들어오면 호출 1번으로 합침 (singleflight)
+- 호출 1건의 전체 데드라인 (대기/재시도 포함), 동시 호출 수 + 초당 호출 수(토큰 버킷) 제한
+- 429/5xx/연결 오류는 지수 백오프(+지터)로 재시도, 선택적으로 느린 호출에 헤지 요청 1개 추가
+- 호출 위치(site)별 지연/결과를 /metrics 와 stats()로 보고
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+import admission
+import metrics
+from imaging import EncodedImage
+from llm import GEMINI_MODEL
+
+logger = logging.getLogger("core-d.llm")
+
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", 30))  # 호출 1건의 전체 데드라인 (대기/재시도 포함)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))  # 동시에 진행 중인 Gemini 요청 수
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", 0))  # 초당 요청 수 (0이면 제한 없음)
+LLM_BURST = int(os.getenv("LLM_BURST", 10))  # 토큰 버킷 크기
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", 2))
+LLM_RETRY_BASE_SEC = float(os.getenv("LLM_RETRY_BASE_SEC", 0.5))
+LLM_HEDGE_AFTER_SEC = float(os.getenv("LLM_HEDGE_AFTER_SEC", 0))  # 이 시간 안에 응답이 없으면 같은 요청 1개 추가 (0이면 끔)
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
+
+# 재시도할 HTTP 상태 (google.genai.errors.APIError.code)
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+CALL_SECONDS = metrics.REGISTRY.histogram(
+    "core_d_llm_call_seconds", "LLM 게이트웨이 호출 시간 (초, 대기/재시도 포함)", ["site", "result"]
+)
+GATEWAY_EVENTS = metrics.REGISTRY.counter(
+    "core_d_llm_gateway_events_total", "LLM 게이트웨이 이벤트 (coalesced/retry/hedge/throttled)", ["site", "event"]
+)
+
+
+def is_retryable(err: BaseException) -> bool:
+    code = getattr(err, "code", None) or getattr(err, "status_code", None)
+    if isinstance(code, int):
+        return code in _RETRYABLE_CODES
+    if isinstance(err, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(err, httpx.TransportError)
+
+
+def prompt_key(contents, model: str) -> Optional[str]:
+    """singleflight 키. 텍스트/EncodedImage 외의 입력이 섞이면 None (합치지 않음)"""
+    parts = contents if isinstance(contents, list) else [contents]
+    h = hashlib.sha256(model.encode())
+    for part in parts:
+        if isinstance(part, str):
+            h.update(b"\x00t" + part.encode())
+        elif isinstance(part, EncodedImage):
+            h.update(b"\x00i" + part.mime_type.encode() + b"\x00" + part.data)
+        else:
+            return None
+    return h.hexdigest()
+
+
+class TokenBucket:
+    """초당 rate개, 최대 burst개까지 모아 두는 토큰 버킷 (rate <= 0 이면 통과)"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, deadline: float) -> float:
+        """토큰 1개를 얻을 때까지 대기, 기다린 시간(초) 반환. 데드라인 안에 못 얻으면 TimeoutError."""
+        if self.rate <= 0:
+            return 0.0
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                raise TimeoutError("LLM 호출 한도 대기 중 데드라인 초과")
+            if wait:
+                # 락을 잡은 채로 기다림 → 먼저 온 호출부터 순서대로 토큰을 받음
+                await asyncio.sleep(wait)
+                self._tokens, self._updated = 1.0, time.monotonic()
+            self._tokens -= 1
+            return wait
+
+
+class LLMGateway:
+    """
+    llm.GeminiClient를 감싸는 게이트웨이. 핸들러는 site(호출 위치 이름)를 붙여 호출.
+    start()는 lifespan에서 호출 (워커 스레드에서 쓰는 generate_content_threadsafe 용 루프 기록).
+    """
+
+    def __init__(
+        self,
+        client,
+        timeout: float = LLM_TIMEOUT_SEC,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_sec: float = LLM_RATE_PER_SEC,
+        burst: int = LLM_BURST,
+        retries: int = LLM_RETRIES,
+        retry_base: float = LLM_RETRY_BASE_SEC,
+        hedge_after: float = LLM_HEDGE_AFTER_SEC,
+        coalesce: bool = LLM_COALESCE,
+    ):
+        self.client = client
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = max(0, retries)
+        self.retry_base = retry_base
+        self.hedge_after = hedge_after
+        self.coalesce = coalesce
+        # 동시 호출 슬롯 + 대기열 상한 (가득 차면 admission.Overloaded, 재시도하지 않음)
+        self.limiter = admission.StageLimiter.from_env("llm", self.max_concurrency)
+        self._bucket = TokenBucket(rate_per_sec, burst)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._active = 0
+        self._latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=512))
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    # ---- 공개 API -------------------------------------------------------------
+
+    async def generate_content(
+        self, contents, site: str, model: str = GEMINI_MODEL, timeout: Optional[float] = None
+    ):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        t0 = time.perf_counter()
+        result = "error"
+        try:
+            key = prompt_key(contents, model) if self.coalesce else None
+            if key is None:
+                response = await self._call(contents, site, model, deadline)
+            else:
+                fut = self._inflight.get(key)
+                if fut is None:
+                    fut = asyncio.ensure_future(self._call(contents, site, model, deadline))
+                    self._inflight[key] = fut
+                    fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+                else:
+                    self._event(site, "coalesced")
+                # 먼저 온 호출의 데드라인으로 진행 중인 호출을 내 데드라인까지만 기다림
+                response = await asyncio.wait_for(asyncio.shield(fut), max(0.0, deadline - time.monotonic()))
+            result = "ok"
+            return response
+        except (asyncio.TimeoutError, TimeoutError):
+            result = "timeout"
+            raise
+        except admission.Overloaded:
+            result = "shed"
+            raise
+        finally:
+            self._observe(site, result, time.perf_counter() - t0)
+
+    async def generate_content_stream(
+        self, contents, site: str, model: str = GEMINI_MODEL, timeout: Optional[float] = None
+    ):
+        """
+        청크 단위 yield. 합치기/헤지는 하지 않고, 첫 청크가 오기 전 실패만 재시도.
+        동시 호출 슬롯은 스트림이 끝날 때까지 점유.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        t0 = time.perf_counter()
+        result = "error"
+        try:
+            for attempt in range(self.retries + 1):
+                received = False
+                try:
+                    started = await self._acquire(site, deadline)
+                    try:
+                        stream = self.client.generate_content_stream(contents, model=model).__aiter__()
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(stream.__anext__(), self._remaining(deadline))
+                            except StopAsyncIteration:
+                                break
+                            received = True
+                            yield chunk
+                    finally:
+                        self._release(started)
+                    result = "ok"
+                    return
+                except Exception as e:
+                    if received or not await self._backoff(e, attempt, site, deadline):
+                        raise
+        except (asyncio.TimeoutError, TimeoutError):
+            result = "timeout"
+            raise
+        except admission.Overloaded:
+            result = "shed"
+            raise
+        finally:
+            self._observe(site, result, time.perf_counter() - t0)
+
+    def generate_content_threadsafe(
+        self, contents, site: str, model: str = GEMINI_MODEL, timeout: Optional[float] = None
+    ):
+        """워커 스레드(트렌드 수집 등)에서 호출 - 이벤트 루프의 게이트웨이를 거쳐 결과를 기다림"""
+        if self._loop is None:
+            raise RuntimeError("LLMGateway.start()가 호출되지 않았습니다.")
+        fut = asyncio.run_coroutine_threadsafe(
+            self.generate_content(contents, site, model=model, timeout=timeout), self._loop
+        )
+        # 루프가 먼저 멈춰도 스레드가 영원히 기다리지 않도록 데드라인 + 여유분까지만
+        return fut.result((timeout or self.timeout) + 1)
+
+    def stats(self) -> dict:
+        sites = {}
+        for site, counts in self._counts.items():
+            latencies = sorted(self._latencies[site])
+
+            def pct(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+            sites[site] = {**counts, "ms_p50": pct(0.5), "ms_p95": pct(0.95)}
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "admission": self.limiter.stats(),
+            "coalescing": len(self._inflight),
+            "sites": sites,
+        }
+
+    # ---- 내부 ----------------------------------------------------------------
+
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("LLM 호출 데드라인 초과")
+        return remaining
+
+    def _event(self, site: str, event: str) -> None:
+        GATEWAY_EVENTS.inc(site=site, event=event)
+        self._counts[site][event] += 1
+
+    def _observe(self, site: str, result: str, seconds: float) -> None:
+        CALL_SECONDS.observe(seconds, site=site, result=result)
+        self._counts[site][result] += 1
+        if result == "ok":
+            self._latencies[site].append(seconds)
+
+    async def _acquire(self, site: str, deadline: float) -> float:
+        """슬롯 + 토큰을 잡고 시작 시각 반환 (_release에 전달)"""
+        started = await self.limiter.acquire(self._remaining(deadline))
+        try:
+            if await self._bucket.acquire(deadline):
+                self._event(site, "throttled")
+        except BaseException:
+            self.limiter.release(started)
+            raise
+        self._active += 1
+        return started
+
+    def _release(self, started: float) -> None:
+        self._active -= 1
+        self.limiter.release(started)
+
+    async def _backoff(self, err: Exception, attempt: int, site: str, deadline: float) -> bool:
+        """재시도할 수 있으면 백오프만큼 기다리고 True"""
+        if attempt >= self.retries or not is_retryable(err):
+            return False
+        delay = self.retry_base * (2 ** attempt) * (0.5 + random.random())
+        if time.monotonic() + delay >= deadline:
+            return False
+        self._event(site, "retry")
+        logger.warning("LLM 재시도 %s #%d (%s: %s)", site, attempt + 1, type(err).__name__, err)
+        await asyncio.sleep(delay)
+        return True
+
+    async def _attempt(self, contents, site: str, model: str, deadline: float):
+        started = await self._acquire(site, deadline)
+        try:
+            return await asyncio.wait_for(
+                self.client.generate_content(contents, model=model), self._remaining(deadline)
+            )
+        finally:
+            self._release(started)
+
+    async def _hedged(self, contents, site: str, model: str, deadline: float):
+        """hedge_after 안에 끝나지 않으면 같은 요청을 하나 더 보내고 먼저 성공한 응답 사용"""
+        first = asyncio.ensure_future(self._attempt(contents, site, model, deadline))
+        if self.hedge_after <= 0:
+            return await first
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self._event(site, "hedge")
+                tasks.append(asyncio.ensure_future(self._attempt(contents, site, model, deadline)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call(self, contents, site: str, model: str, deadline: float):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._hedged(contents, site, model, deadline)
+            except Exception as e:
+                if not await self._backoff(e, attempt, site, deadline):
+                    raise
@@ -13,24 +13,136 @@ from dotenv import dotenv_values, load_dotenv
 _backend_dir = Path(__file__).resolve().parent
 load_dotenv(_backend_dir.parent / ".env", encoding="utf-8-sig")
 load_dotenv(_backend_dir / ".env", encoding="utf-8-sig")
-import base64
+import functools
 import io
 import json
+import logging
 import os
-import uuid
-from datetime import datetime
 
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
+
+import admission
+import encoders
+import imaging
+import metrics
+from bg_removal import REMBG_WARM_TIERS, BackgroundRemover, Cutout, UnknownTier, get_tier
+from image_delivery import IMAGE_AUTO_WEBP_ENCODER, ProcessedImages, image_response, image_url
+from jobs import Job, JobContext, JobManager, JobQueueFull, create_job_store
+from descriptors import (
+    DESCRIPTOR_PROMPT,
+    ItemDescriptor,
+    batch_descriptor_prompt,
+    descriptor_from_dict,
+    dominant_colors,
+    parse_descriptor,
+    parse_descriptor_batch,
+)
+from closet_ranking import CLOSET_TOP_K, RankedCandidate, color_histogram, fallback_tip, rank_candidates
+from cutout_cache import CutoutCache
+from llm import GeminiClient
+from llm_gateway import LLMGateway
+from pipeline import Pipeline, Stage, StageError
+from rembg_service import REMBG_SERVICE_SOCKET, REMBG_SERVICE_WAIT_SEC, RembgServiceClient
+from shop_cache import ShopRecommendationCache, perceptual_hash
+from storage import UploadQueue, create_storage
+from uploads import (
+    WARDROBE_BATCH_MAX_FILES,
+    BodySizeLimitMiddleware,
+    UploadTooLarge,
+    b64decode_limited,
+    read_upload,
+)
+from streaming import JSONFieldStream, OrderedEvents, sse_event
+from wardrobe_store import LLMImageCache, WardrobeRecord, WardrobeStore, create_store
+from trends import TrendCache, TrendFetcher, TrendKey, collect_trend_summary
+from warmup import Warmup
+
+logger = logging.getLogger("core-d")
+
+# rembg 엔진 - 웜 세션 유지, 추론은 전용 워커 풀에서 실행, 같은 업로드는 캐시에서 반환
+# REMBG_SERVICE_SOCKET이 있으면 추론은 공유 배경 제거 서비스로 (워커 여러 개가 모델 1벌을 공유), 안 되면 프로세스 안에서
+cutout_cache = CutoutCache()
+bg_remover = BackgroundRemover(
+    cache=cutout_cache,
+    service=RembgServiceClient(REMBG_SERVICE_SOCKET) if REMBG_SERVICE_SOCKET else None,
+)
+# 엔드포인트별 배경 제거 품질 단계 (fast / balanced / high, 비우면 REMBG_DEFAULT_TIER). 요청마다 ?quality= 로 변경 가능
+REMBG_TIER = {
+    "analyze": get_tier(os.getenv("REMBG_TIER_ANALYZE")).name,
+    "wardrobe": get_tier(os.getenv("REMBG_TIER_WARDROBE")).name,
+}
+
+# 서버 측 옷장 (lifespan에서 생성) + LLM 입력으로 변환된 옷장 이미지 캐시
+wardrobe_store: Optional[WardrobeStore] = None
+wardrobe_images = LLMImageCache()
+
+# 처리된 이미지(컷아웃) 바이너리 전달 - 캐시에서 밀려나면 서버 옷장에서 찾음
+processed_images = ProcessedImages(
+    fallback=lambda sha: wardrobe_store.load_image(sha) if wardrobe_store is not None else None
+)
+
+# 처리된 이미지 스토리지 업로드 (lifespan에서 생성) - 응답은 콘텐츠 주소 URL을 바로 반환하고 업로드는 백그라운드
+upload_queue: Optional[UploadQueue] = None
+
+
+async def _storage_upload_failed(path: str, data: bytes) -> None:
+    """
+    업로드 큐가 재시도 끝에 포기한 이미지 - 서버 옷장이 같은 버킷을 쓰면 옷장 행이 가리키는 객체가 없어지므로
+    옷장 저장소 클라이언트로 한 번 더 올림 (실패하면 로그만)
+    """
+    if wardrobe_store is None or not upload_queue.writes_to(wardrobe_store.bucket):
+        return
+    sha = path.rsplit("/", 1)[-1].split(".", 1)[0]
+    await asyncio.to_thread(wardrobe_store.upload_image, sha, data)
+
+# 비동기 작업 큐 (lifespan에서 시작/종료, 핸들러는 "F. 비동기 작업" 섹션에서 등록)
+job_manager = JobManager(create_job_store())
+
+# 기동 워밍업 (단계는 "Health Check / Readiness" 섹션에서 등록, WARMUP_MODE로 방식 선택)
+startup_warmup = Warmup()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global wardrobe_store, upload_queue
+    wardrobe_store = await asyncio.to_thread(create_store)
+    upload_queue = UploadQueue(create_storage(), on_failed=_storage_upload_failed)
+    upload_queue.start()
+    llm.start()
+    # 트렌드 요약은 백그라운드에서 주기적으로 갱신 (요청 경로에서 수집하지 않음)
+    trend_cache.start()
+    await job_manager.start()
+    # 모델/클라이언트 미리 로드 (blocking이면 끝날 때까지 요청을 받지 않음)
+    await startup_warmup.start()
+    try:
+        yield
+    finally:
+        await startup_warmup.stop()
+        await job_manager.stop()
+        await trend_cache.stop()
+        # 남은 업로드는 STORAGE_DRAIN_TIMEOUT_SEC 동안 마저 처리
+        await upload_queue.stop()
+        bg_remover.shutdown()
+        await gemini.aclose()
+
 
 app = FastAPI(
     title="Core-D API",
     description="퍼스널 컬러 & 추구미 기반 패션 스타일 추천 API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# 요청 본문 크기 상한 (REQUEST_MAX_BYTES) - multipart 파싱/스풀링 전에 차단
+# CORS보다 먼저 등록 → CORS가 바깥에서 감싸 413 응답에도 Access-Control-Allow-Origin 헤더
+app.add_middleware(BodySizeLimitMiddleware)
+
 # CORS - Frontend 연동
 app.add_middleware(
     CORSMiddleware,
@@ -38,8 +150,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
+# 구간별 소요 시간 → Server-Timing 헤더 + /metrics 히스토그램 (+ SLOW_REQUEST_MS 초과 시 로그)
+app.add_middleware(metrics.TimingMiddleware)
+
+
+@app.exception_handler(admission.Overloaded)
+async def overloaded_handler(request: Request, exc: admission.Overloaded):
+    """단계 대기열 포화 → 429 + Retry-After (요청 입구 또는 처리 중 대기열에서 거절)"""
+    return JSONResponse(
+        {"detail": str(exc), "stage": exc.stage},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 # =============================================================================
 # Schemas
@@ -80,84 +206,106 @@ class StyleRecommendationResponse(BaseModel):
 
 
 # =============================================================================
-# YouTube 트렌드 분석
+# 공통 유틸 - Gemini 키 로드 / 공유 클라이언트
 # =============================================================================
 
-DEFAULT_TREND_SUMMARY = (
-    "올해의 핵심 패션 트렌드: 미니멀 스타일, 넓은 핏 실루엣, "
-    "뉴트럴 톤 및 파스텔 컬러가 인기. 편안한 캐주얼과 유니크한 포인트 아이템 조합."
-)
+def _get_gemini_key() -> Optional[str]:
+    """os.environ에서 GEMINI_API_KEY 가져오기. 없으면 .env 재탐색."""
+    key = os.getenv("GEMINI_API_KEY")
+    if key:
+        return key
+    _dir = Path(__file__).resolve().parent
+    for env_path in [_dir / ".env", _dir.parent / ".env"]:
+        if env_path.exists():
+            vals = dotenv_values(env_path, encoding="utf-8-sig")
+            for k, v in vals.items():
+                if k.lstrip("\ufeff") == "GEMINI_API_KEY" and v:
+                    os.environ["GEMINI_API_KEY"] = v
+                    return v
+    return None
 
 
-def get_youtube_trends(client) -> str:
-    """
-    유튜브 패션 영상 자막을 수집해 Gemini로 트렌드 요약 생성.
-    실패 시 기본 트렌드 데이터 반환.
-    """
-    from youtubesearchpython import VideosSearch
-    from youtube_transcript_api import YouTubeTranscriptApi
+# 앱 전체에서 1개만 사용 (lifespan에서 열고 닫음)
+gemini = GeminiClient(_get_gemini_key)
+# 모든 Gemini 호출은 게이트웨이를 거침 (중복 호출 합치기, 데드라인, 동시 호출/초당 호출 제한, 재시도)
+llm = LLMGateway(gemini)
 
-    now = datetime.now()
-    year, month = now.year, now.month
-    season = "봄" if 3 <= month <= 5 else "여름" if 6 <= month <= 8 else "가을" if 9 <= month <= 11 else "겨울"
 
-    search_queries = [
-        f"{year}년 {month}월 패션 트렌드",
-        f"{year} {season} 코디 추천",
-        f"Fashion trends {year} Korea",
-    ]
+# =============================================================================
+# 공통 유틸 - 처리된 이미지 전달 (JSON에는 URL, base64는 include_base64=true 일 때만)
+# =============================================================================
 
-    video_ids = []
-    for query in search_queries:
-        try:
-            videos_search = VideosSearch(query, limit=5)
-            result = videos_search.result()
-            for item in result.get("result", [])[:5]:
-                vid = item.get("id")
-                if vid and vid not in video_ids:
-                    video_ids.append(vid)
-            if len(video_ids) >= 5:
-                break
-        except Exception:
-            continue
+async def _publish_cutout(cutout: Cutout) -> None:
+    """GET /api/images/{sha} 로 받을 수 있게 저장"""
+    # sha256 계산(cached_property)도 워커 스레드에서
+    with metrics.stage("image_publish"):
+        await asyncio.to_thread(lambda: processed_images.put(cutout.png, cutout.sha256))
 
-    video_ids = video_ids[:5]
-    if not video_ids:
-        return DEFAULT_TREND_SUMMARY
 
-    transcripts_text = []
-    for video_id in video_ids:
-        try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(
-                video_id, languages=["ko", "en"]
-            )
-            text = " ".join(t["text"] for t in transcript_list).strip()
-            if len(text) > 2000:
-                text = text[:2000] + "..."
-            if text:
-                transcripts_text.append(f"[영상 {video_id}]\n{text}")
-        except Exception:
-            continue
+# 엔드포인트별 컷아웃 전달 형식 (encoders.ENCODERS 이름, auto면 브라우저 Accept 헤더로 PNG/WebP 결정)
+CUTOUT_FORMAT = {
+    "analyze": encoders.validate(os.getenv("CUTOUT_FORMAT_ANALYZE", "auto"), "CUTOUT_FORMAT_ANALYZE", ("auto",)),
+    "wardrobe": encoders.validate(os.getenv("CUTOUT_FORMAT_WARDROBE", "auto"), "CUTOUT_FORMAT_WARDROBE", ("auto",)),
+}
 
-    if not transcripts_text:
-        return DEFAULT_TREND_SUMMARY
 
-    combined = "\n\n".join(transcripts_text)
-    prompt = (
-        "다음은 최신 패션 유튜버들의 영상 자막이다. "
-        "여기서 언급되는 **핵심 아이템, 컬러, 스타일 트렌드**를 3줄로 요약해줘."
-        "\n\n---\n\n" + combined
-    )
+# 단계 종류별 입장 제어 (동시 실행 수 + 대기열 상한, admission.py). storage는 업로드 큐 포화 여부로 판단
+ADMISSION_LIMITERS = {"cpu": bg_remover.limiter, "llm": llm.limiter}
+STORAGE_RETRY_AFTER_SEC = 5
 
+
+def _admit(*stages: str) -> None:
+    """요청 입구 부하 차단 - 거쳐 갈 단계 중 하나라도 대기열이 가득 찼으면 업로드를 읽기 전에 429"""
+    for stage in stages:
+        if stage == "storage":
+            if upload_queue is not None and upload_queue.saturated:
+                raise admission.shed("storage", STORAGE_RETRY_AFTER_SEC)
+        else:
+            ADMISSION_LIMITERS[stage].check()
+
+
+async def _admit_cutout(contents: list[bytes], tier: str) -> None:
+    """배경 제거 캐시에 없는 이미지가 있을 때만 cpu 단계 입장 확인 (캐시 적중은 추론하지 않으므로 거절하지 않음)"""
+    for content in contents:
+        if not await bg_remover.is_cached(content, tier):
+            _admit("cpu")
+            return
+
+
+def _rembg_tier(quality: Optional[str], endpoint: str) -> str:
+    """요청의 quality 파라미터 → 품질 단계 이름 (없으면 엔드포인트 기본값, 모르는 이름이면 400)"""
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-        )
-        summary = (response.text or "").strip()
-        return summary if summary else DEFAULT_TREND_SUMMARY
-    except Exception:
-        return DEFAULT_TREND_SUMMARY
+        return get_tier(quality or REMBG_TIER[endpoint]).name
+    except UnknownTier as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _image_fields(cutout: Cutout, include_base64: bool, endpoint: str) -> dict:
+    fmt = CUTOUT_FORMAT[endpoint]
+    fields = {
+        "processed_image_url": image_url(cutout.sha256, fmt),
+        "processed_preview_url": image_url(cutout.sha256, fmt, "thumb"),
+    }
+    if include_base64:
+        fields["processed_image_base64"] = cutout.b64
+    return fields
+
+
+# =============================================================================
+# YouTube 트렌드 분석 (trends.py) - lifespan에서 주기 갱신, 요청 경로는 캐시만 조회
+# =============================================================================
+
+def _fetch_trend_summary(key: TrendKey) -> Optional[str]:
+    # 워커 스레드에서 실행 → 요약 호출은 이벤트 루프의 게이트웨이로 넘김
+    if not _get_gemini_key():
+        return None
+    return collect_trend_summary(
+        lambda prompt: llm.generate_content_threadsafe(prompt, site="trend_summary"), key, trend_fetcher
+    )
+
+
+trend_fetcher = TrendFetcher()
+trend_cache = TrendCache(_fetch_trend_summary)
 
 
 # =============================================================================
@@ -171,23 +319,144 @@ PERSONAL_COLORS = ["봄 웜", "여름 쿨", "가을 웜", "겨울 쿨"]
 class AnalyzeResponse(BaseModel):
     """분석 결과 응답"""
     success: bool
-    processed_image_base64: Optional[str] = None
+    processed_image_url: Optional[str] = None  # GET /api/images/{sha}
+    processed_preview_url: Optional[str] = None  # 알파 유지 축소 미리보기 (size=thumb)
+    processed_image_base64: Optional[str] = None  # include_base64=true 일 때만 (구버전 클라이언트)
     item_type: Optional[str] = None  # 판별된 옷 종류: "아우터" | "이너" | "하의"
     recommendations: Optional[dict] = None  # Gemini JSON 응답 (옷 종류에 따라 동적 구성)
     error: Optional[str] = None
 
 
-@app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze_outfit(
-    file: UploadFile = File(...),
-    aesthetic: str = Form(...),
-    personal_color: str = Form(...),
-):
+# 스테이지별 타임아웃 (초)
+ANALYZE_STAGE_TIMEOUTS = {
+    "cutout": float(os.getenv("ANALYZE_CUTOUT_TIMEOUT_SEC", 60)),
+    "preview": float(os.getenv("ANALYZE_PREVIEW_TIMEOUT_SEC", 10)),
+    "classify": float(os.getenv("ANALYZE_CLASSIFY_TIMEOUT_SEC", 30)),
+    "recommend": float(os.getenv("ANALYZE_RECOMMEND_TIMEOUT_SEC", 60)),
+}
+# Gemini 입력 이미지: 기본은 축소한 원본 → LLM 단계가 rembg를 기다리지 않음
+# (1로 설정 시 기존처럼 배경 제거 결과를 보고 판별/추천)
+ANALYZE_LLM_ON_CUTOUT = os.getenv("ANALYZE_LLM_ON_CUTOUT", "0") == "1"
+
+ANALYZE_CLASSIFY_PROMPT = (
+    "이 옷 이미지를 보고 다음 세 가지 중 하나로만 분류해줘.\n"
+    "- 아우터 (코트, 자켓, 패딩, 블레이저 등 겉에 입는 옷)\n"
+    "- 이너 (티셔츠, 니트, 셔츠, 블라우스 등 안에 입는 상의)\n"
+    "- 하의 (청바지, 슬랙스, 트레이닝 팬츠, 스커트, 치마, 반바지 등)\n\n"
+    "반드시 다음 JSON 형식으로만 응답해. 다른 텍스트는 포함하지 마.\n"
+    '{"item_type": "아우터"}'
+)
+
+
+def _parse_item_type(text: Optional[str]) -> str:
+    classify_text = (text or "{}").strip()
+    if "```" in classify_text:
+        start = classify_text.find("{")
+        end = classify_text.rfind("}") + 1
+        classify_text = classify_text[start:end] if start >= 0 and end > 0 else "{}"
+
+    try:
+        classify_result = metrics.parse_json(classify_text, "classify")
+        item_type = classify_result.get("item_type", "이너")
+        if item_type == "바지":  # 구버전 응답 대비 변환
+            item_type = "하의"
+    except json.JSONDecodeError:
+        item_type = "이너"  # 파싱 실패 시 기본값
+    return item_type
+
+
+def _build_recommend_prompt(item_type: str, trend_context: str, aesthetic: str, personal_color: str) -> str:
+    # 옷 종류에 따라 추천 항목 동적 구성
+    if item_type == "아우터":
+        recommend_format = '{"inner": "이너 추천 (구체적으로)", "bottom": "하의 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
+        recommend_desc = "이너(상의), 하의, 신발"
+    elif item_type == "하의":
+        recommend_format = '{"outer": "아우터 추천 (구체적으로)", "inner": "이너 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
+        recommend_desc = "아우터, 이너(상의), 신발"
+    else:  # 이너
+        recommend_format = '{"outer": "아우터 추천 (구체적으로)", "bottom": "하의 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
+        recommend_desc = "아우터, 하의, 신발"
+
+    return (
+        f"[최신 패션 트렌드 Context]\n{trend_context}\n\n"
+        f"---\n\n"
+        f"업로드된 옷은 **{item_type}**입니다.\n"
+        f"이 옷의 특징(색상, 스타일, 소재 등)을 파악하고, "
+        f"사용자가 선택한 추구미 '{aesthetic}'와 퍼스널 컬러 '{personal_color}'를 고려해서, "
+        f"위 [최신 패션 트렌드]를 반영하여 이 {item_type}과 함께 입으면 좋을 "
+        f"**{recommend_desc}**을 구체적으로 추천해줘.\n\n"
+        f"반드시 다음 JSON 형식으로만 응답해. 다른 텍스트는 포함하지 마.\n\n"
+        f"{recommend_format}"
+    )
+
+
+def _parse_recommendations(text: Optional[str]) -> dict:
+    raw_text = (text or "{}").strip()
+    # JSON 블록 추출 (```json ... ``` 감싸진 경우 대비)
+    if "```" in raw_text:
+        start = raw_text.find("{")
+        end = raw_text.rfind("}") + 1
+        raw_text = raw_text[start:end] if start >= 0 and end > 0 else "{}"
+    return metrics.parse_json(raw_text, "recommend")
+
+
+def _analyze_pipeline(
+    content: bytes,
+    aesthetic: str,
+    personal_color: str,
+    on_field: Optional[Callable[[str, str], None]] = None,
+    tier: Optional[str] = None,
+) -> Pipeline:
     """
-    1. rembg로 배경 제거
-    2. Gemini Vision으로 옷 분석 + 추구미/퍼스널 컬러 기반 코디 추천 (상의/하의/신발 3가지)
-    3. JSON 형식 응답
+    cutout ─────────────────────────────┐
+    preview ─→ classify ─→ recommend ──→ (응답)
+    trends ──────────────↗
+    트렌드는 이미지와 무관, 판별/추천은 LLM용으로 축소한 원본으로 rembg와 동시에 진행.
+    on_field가 있으면 추천은 스트리밍으로 받아 필드가 완성될 때마다 on_field(key, value) 호출.
     """
+
+    async def cutout():
+        cutout = await bg_remover.cutout(content, tier)
+        await _publish_cutout(cutout)
+        return cutout
+
+    async def preview(cutout=None):
+        if cutout is not None:
+            return await asyncio.to_thread(imaging.for_llm, cutout.pil())
+        return await asyncio.to_thread(imaging.llm_input, content)
+
+    async def trends():
+        # 캐시 조회만, 오래된 요약이면 백그라운드 재수집
+        return trend_cache.get()
+
+    async def classify(preview):
+        response = await llm.generate_content([ANALYZE_CLASSIFY_PROMPT, preview], site="classify")
+        return _parse_item_type(response.text)
+
+    async def recommend(classify, trends, preview):
+        prompt = _build_recommend_prompt(classify, trends, aesthetic, personal_color)
+        if on_field is None:
+            response = await llm.generate_content([prompt, preview], site="recommend")
+            return _parse_recommendations(response.text)
+        fields, text = JSONFieldStream(), []
+        async for chunk in llm.generate_content_stream([prompt, preview], site="recommend_stream"):
+            piece = chunk.text or ""
+            text.append(piece)
+            for key, value in fields.feed(piece):
+                on_field(key, value)
+        return _parse_recommendations("".join(text))
+
+    t = ANALYZE_STAGE_TIMEOUTS
+    return Pipeline([
+        Stage("cutout", cutout, timeout=t["cutout"], kind="cpu"),
+        Stage("preview", preview, deps=("cutout",) if ANALYZE_LLM_ON_CUTOUT else (), timeout=t["preview"], kind="cpu"),
+        Stage("trends", trends),
+        Stage("classify", classify, deps=("preview",), timeout=t["classify"], kind="io"),
+        Stage("recommend", recommend, deps=("classify", "trends", "preview"), timeout=t["recommend"], kind="io"),
+    ])
+
+
+def _validate_analyze_input(file: UploadFile, aesthetic: str, personal_color: str) -> None:
     if aesthetic not in AESTHETICS:
         raise HTTPException(status_code=400, detail=f"추구미는 {AESTHETICS} 중 하나여야 합니다.")
     if personal_color not in PERSONAL_COLORS:
@@ -197,142 +466,211 @@ async def analyze_outfit(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="이미지 파일(jpeg, png 등)을 업로드해주세요.")
 
-    processed_base64 = None
-    try:
-        content = await file.read()
-        input_image = io.BytesIO(content)
-
-        # 1. rembg로 배경 제거
-        from PIL import Image
-        from rembg import remove
 
-        img = Image.open(input_image).convert("RGBA")
-        output_img = remove(img)
+async def _read_image_upload(file: UploadFile, check_pixels: bool = True) -> bytes:
+    """바이트 상한(UPLOAD_MAX_BYTES)까지만 읽고, 헤더의 해상도가 IMAGE_MAX_PIXELS를 넘으면 디코딩 전에 413"""
+    from PIL import UnidentifiedImageError
 
-        # PNG로 인코딩 → base64
-        buffer = io.BytesIO()
-        output_img.save(buffer, format="PNG")
-        processed_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-        # 2. Gemini API 키 가져오기
-        gemini_key = _get_gemini_key()
-        if not gemini_key:
-            return AnalyzeResponse(
-                success=False,
-                processed_image_base64=processed_base64,
-                recommendations=None,
-                error="GEMINI_API_KEY가 설정되지 않았습니다. .env에 GEMINI_API_KEY를 추가하세요.",
-            )
+    try:
+        content = await read_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if check_pixels:
+        try:
+            imaging.open_image(content)
+        except imaging.ImageTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except (UnidentifiedImageError, OSError):
+            pass  # 이미지가 아닌 파일은 기존처럼 처리 단계에서 오류 응답
+    return content
 
-        # 3. google.genai 클라이언트 초기화 (신규 패키지)
-        from google import genai
 
-        client = genai.Client(api_key=gemini_key)
+def _analyze_error_message(err: StageError) -> str:
+    """recommend 스테이지까지 전파된 실패 → 사용자 메시지 (최초 실패 스테이지 기준)"""
+    if isinstance(err.cause, json.JSONDecodeError):
+        return f"Gemini 응답 파싱 실패: {str(err.cause)}"
+    if err.stage == "recommend":
+        return f"Gemini 이미지 분석 실패: {err.cause}"
+    if err.stage == "classify":
+        return f"옷 종류 판별 실패: {err.cause}"
+    return str(err.cause)
 
-        # 유튜브 트렌드 수집
-        trend_context = await asyncio.to_thread(get_youtube_trends, client)
 
-        # 4-1. STEP 1: 업로드된 옷 종류 판별 (아우터 / 이너 / 하의)
-        classify_prompt = (
-            "이 옷 이미지를 보고 다음 세 가지 중 하나로만 분류해줘.\n"
-            "- 아우터 (코트, 자켓, 패딩, 블레이저 등 겉에 입는 옷)\n"
-            "- 이너 (티셔츠, 니트, 셔츠, 블라우스 등 안에 입는 상의)\n"
-            "- 하의 (청바지, 슬랙스, 트레이닝 팬츠, 스커트, 치마, 반바지 등)\n\n"
-            "반드시 다음 JSON 형식으로만 응답해. 다른 텍스트는 포함하지 마.\n"
-            '{"item_type": "아우터"}'
+@app.post("/api/analyze", response_model=AnalyzeResponse)
+async def analyze_outfit(
+    response: Response,
+    file: UploadFile = File(...),
+    aesthetic: str = Form(...),
+    personal_color: str = Form(...),
+    include_base64: bool = False,
+    quality: Optional[str] = None,
+):
+    """
+    1. rembg로 배경 제거 (quality: 배경 제거 품질 단계 fast / balanced / high)
+    2. Gemini Vision으로 옷 분석 + 추구미/퍼스널 컬러 기반 코디 추천 (상의/하의/신발 3가지)
+    3. JSON 형식 응답
+    (1과 2는 스테이지 그래프로 동시에 진행 - _analyze_pipeline 참고)
+    """
+    _validate_analyze_input(file, aesthetic, personal_color)
+    tier = _rembg_tier(quality, "analyze")
+    _admit("llm")
+    content = await _read_image_upload(file)
+    await _admit_cutout([content], tier)
+    result, summary = await _analyze(content, aesthetic, personal_color, include_base64, tier=tier)
+    if summary is not None:
+        response.headers["X-Critical-Path"] = (
+            f"{'>'.join(summary['critical_path'])};dur={summary['critical_path_ms']}"
         )
-
-        try:
-            classify_response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[classify_prompt, output_img],
-            )
-        except Exception as e:
+    return result
+
+
+async def _analyze(
+    content: bytes,
+    aesthetic: str,
+    personal_color: str,
+    include_base64: bool,
+    on_done: Optional[Callable[[str, object, Optional[StageError]], None]] = None,
+    limits: Optional[dict[str, asyncio.Semaphore]] = None,
+    tier: Optional[str] = None,
+) -> tuple[AnalyzeResponse, Optional[dict]]:
+    """/api/analyze 본체 (동기 응답 / 비동기 작업 공통). 반환: (응답, 스테이지 타이밍 요약)"""
+    try:
+        # Gemini 키가 없으면 배경 제거만 수행
+        if not _get_gemini_key():
+            cutout = await bg_remover.cutout(content, tier)
+            await _publish_cutout(cutout)
             return AnalyzeResponse(
                 success=False,
-                processed_image_base64=processed_base64,
-                error=f"옷 종류 판별 실패: {e}",
-            )
+                **_image_fields(cutout, include_base64, "analyze"),
+                recommendations=None,
+                error="GEMINI_API_KEY가 설정되지 않았습니다. .env에 GEMINI_API_KEY를 추가하세요.",
+            ), None
 
-        classify_text = (classify_response.text or "{}").strip()
-        if "```" in classify_text:
-            start = classify_text.find("{")
-            end = classify_text.rfind("}") + 1
-            classify_text = classify_text[start:end] if start >= 0 and end > 0 else "{}"
+        run = await _analyze_pipeline(content, aesthetic, personal_color, tier=tier).run(on_done, limits)
+        summary = run.summary()
+        logger.info("analyze pipeline: %s", summary)
 
-        try:
-            classify_result = json.loads(classify_text)
-            item_type = classify_result.get("item_type", "이너")
-            if item_type == "바지":  # 구버전 응답 대비 변환
-                item_type = "하의"
-        except json.JSONDecodeError:
-            item_type = "이너"  # 파싱 실패 시 기본값
-
-        # 4-2. STEP 2: 옷 종류에 따라 추천 항목 동적 구성
-        if item_type == "아우터":
-            recommend_format = '{"inner": "이너 추천 (구체적으로)", "bottom": "하의 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
-            recommend_desc = "이너(상의), 하의, 신발"
-        elif item_type == "하의":
-            recommend_format = '{"outer": "아우터 추천 (구체적으로)", "inner": "이너 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
-            recommend_desc = "아우터, 이너(상의), 신발"
-        else:  # 이너
-            recommend_format = '{"outer": "아우터 추천 (구체적으로)", "bottom": "하의 추천 (구체적으로)", "shoes": "신발 추천 (구체적으로)"}'
-            recommend_desc = "아우터, 하의, 신발"
+        if "cutout" in run.errors:
+            raise run.errors["cutout"].cause
+        image_fields = _image_fields(run.results["cutout"], include_base64, "analyze")
 
-        prompt = (
-            f"[최신 패션 트렌드 Context]\n{trend_context}\n\n"
-            f"---\n\n"
-            f"업로드된 옷은 **{item_type}**입니다.\n"
-            f"이 옷의 특징(색상, 스타일, 소재 등)을 파악하고, "
-            f"사용자가 선택한 추구미 '{aesthetic}'와 퍼스널 컬러 '{personal_color}'를 고려해서, "
-            f"위 [최신 패션 트렌드]를 반영하여 이 {item_type}과 함께 입으면 좋을 "
-            f"**{recommend_desc}**을 구체적으로 추천해줘.\n\n"
-            f"반드시 다음 JSON 형식으로만 응답해. 다른 텍스트는 포함하지 마.\n\n"
-            f"{recommend_format}"
-        )
-
-        try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[prompt, output_img],
-            )
-        except Exception as e:
+        err = run.errors.get("recommend")
+        if err is not None:
+            if isinstance(err.cause, admission.Overloaded):
+                raise err.cause
             return AnalyzeResponse(
                 success=False,
-                processed_image_base64=processed_base64,
-                error=f"Gemini 이미지 분석 실패: {e}",
-            )
-
-        raw_text = (response.text or "{}").strip()
-        # JSON 블록 추출 (```json ... ``` 감싸진 경우 대비)
-        if "```" in raw_text:
-            start = raw_text.find("{")
-            end = raw_text.rfind("}") + 1
-            raw_text = raw_text[start:end] if start >= 0 and end > 0 else "{}"
-
-        recommendations = json.loads(raw_text)
+                **image_fields,
+                recommendations=None,
+                error=_analyze_error_message(err),
+            ), summary
 
         return AnalyzeResponse(
             success=True,
-            processed_image_base64=processed_base64,
-            item_type=item_type,
-            recommendations=recommendations,
-        )
+            **image_fields,
+            item_type=run.results["classify"],
+            recommendations=run.results["recommend"],
+        ), summary
 
-    except json.JSONDecodeError as e:
-        return AnalyzeResponse(
-            success=False,
-            processed_image_base64=processed_base64,
-            recommendations=None,
-            error=f"Gemini 응답 파싱 실패: {str(e)}",
-        )
+    except admission.Overloaded:
+        raise
     except Exception as e:
         return AnalyzeResponse(
             success=False,
-            processed_image_base64=None,
             recommendations=None,
             error=str(e),
-        )
+        ), None
+
+
+async def _analyze_events(
+    content: bytes, aesthetic: str, personal_color: str, include_base64: bool, tier: Optional[str] = None
+):
+    """
+    /api/analyze/stream 이벤트 생성기. 스테이지는 /api/analyze와 같은 그래프로 동시에 진행하고,
+    이벤트는 image → item_type → recommendation(필드별) → done 순서로 전송.
+    """
+    events = OrderedEvents(["image", "item_type", "recommendation", "done"])
+    done = AnalyzeResponse(success=False)
+
+    if not _get_gemini_key():
+        try:
+            cutout = await bg_remover.cutout(content, tier)
+            await _publish_cutout(cutout)
+            yield sse_event("image", _image_fields(cutout, include_base64, "analyze"))
+            done.error = "GEMINI_API_KEY가 설정되지 않았습니다. .env에 GEMINI_API_KEY를 추가하세요."
+        except Exception as e:
+            done.error = str(e)
+        yield sse_event("done", done.model_dump(exclude={"processed_image_base64"}))
+        return
+
+    def on_done(stage: str, result, err: Optional[StageError]) -> None:
+        if stage == "cutout":
+            if err is None:
+                events.push("image", sse_event("image", _image_fields(result, include_base64, "analyze")))
+            else:
+                events.push("image", sse_event("error", {"stage": "cutout", "error": str(err.cause)}))
+            events.close("image")
+        elif stage == "classify":
+            if err is None:
+                events.push("item_type", sse_event("item_type", {"item_type": result}))
+            events.close("item_type")
+        elif stage == "recommend":
+            events.close("recommendation")
+
+    def on_field(key: str, value: str) -> None:
+        events.push("recommendation", sse_event("recommendation", {"field": key, "value": value}))
+
+    async def run_pipeline():
+        try:
+            run = await _analyze_pipeline(content, aesthetic, personal_color, on_field, tier).run(on_done)
+            logger.info("analyze pipeline (stream): %s", run.summary())
+            err = run.errors.get("recommend")
+            if "cutout" in run.errors:
+                done.error = str(run.errors["cutout"].cause)
+            elif err is not None:
+                done.error = _analyze_error_message(err)
+            else:
+                done.success = True
+                done.item_type = run.results["classify"]
+                done.recommendations = run.results["recommend"]
+            payload = done.model_dump(exclude={"processed_image_base64"})
+            payload["timings"] = run.summary()
+        except Exception as e:
+            payload = AnalyzeResponse(success=False, error=str(e)).model_dump(exclude={"processed_image_base64"})
+        events.push("done", sse_event("done", payload))
+        events.close_all()
+
+    task = asyncio.create_task(run_pipeline())
+    try:
+        async for event in events:
+            yield event
+    finally:
+        # 클라이언트가 끊으면 남은 스테이지(LLM 호출 등)도 취소
+        task.cancel()
+
+
+@app.post("/api/analyze/stream")
+async def analyze_outfit_stream(
+    file: UploadFile = File(...),
+    aesthetic: str = Form(...),
+    personal_color: str = Form(...),
+    include_base64: bool = False,
+    quality: Optional[str] = None,
+):
+    """
+    /api/analyze 의 SSE 버전. 배경 제거 이미지가 준비되는 즉시 보내고,
+    옷 종류 → 추천 필드(Gemini 스트리밍 응답에서 완성되는 대로) → done(최종 AnalyzeResponse) 순서.
+    """
+    _validate_analyze_input(file, aesthetic, personal_color)
+    tier = _rembg_tier(quality, "analyze")
+    _admit("llm")
+    content = await _read_image_upload(file)
+    await _admit_cutout([content], tier)
+    return StreamingResponse(
+        _analyze_events(content, aesthetic, personal_color, include_base64, tier),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # =============================================================================
@@ -341,102 +679,221 @@ async def analyze_outfit(
 
 class WardrobeProcessResponse(BaseModel):
     success: bool
-    processed_image_base64: Optional[str] = None
-    image_url: Optional[str] = None
+    processed_image_url: Optional[str] = None  # GET /api/images/{sha}
+    processed_preview_url: Optional[str] = None  # 알파 유지 축소 미리보기 (size=thumb)
+    processed_image_base64: Optional[str] = None  # include_base64=true 일 때만 (구버전 클라이언트)
+    image_url: Optional[str] = None  # Supabase Storage URL
     item_type: Optional[str] = None
+    item_id: Optional[str] = None  # 서버 옷장 ID (코디 요청 시 이미지 대신 전송)
+    dominant_color_hex: Optional[str] = None
+    descriptor: Optional[ItemDescriptor] = None
     error: Optional[str] = None
 
 
-def _upload_to_supabase(image_bytes: bytes) -> Optional[str]:
-    """
-    처리된 이미지를 Supabase Storage에 업로드하고 public URL을 반환.
-    환경 변수가 없거나 업로드 실패 시 None 반환.
-    """
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    bucket = os.getenv("SUPABASE_STORAGE_BUCKET", "wardrobe-images")
-
-    if not supabase_url or not supabase_key:
-        return None
-
-    try:
-        from supabase import create_client
-
-        client = create_client(supabase_url, supabase_key)
-        file_name = f"{uuid.uuid4()}.png"
-        client.storage.from_(bucket).upload(
-            file_name,
-            image_bytes,
-            {"content-type": "image/png"},
-        )
-        public_url = client.storage.from_(bucket).get_public_url(file_name)
-        return public_url
-    except Exception:
-        return None
-
-
 @app.post("/api/wardrobe/process", response_model=WardrobeProcessResponse)
-async def process_wardrobe_item(file: UploadFile = File(...)):
-    """rembg 배경 제거 + Gemini로 item_type 판별 + Supabase Storage 업로드"""
+async def process_wardrobe_item(
+    file: UploadFile = File(...), include_base64: bool = False, quality: Optional[str] = None
+):
+    """rembg 배경 제거(quality 품질 단계) + Gemini로 item_type 판별 + Supabase Storage 업로드 예약"""
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="이미지 파일을 업로드해주세요.")
+    tier = _rembg_tier(quality, "wardrobe")
+    _admit("llm", "storage")
 
+    content = await _read_image_upload(file)
+    await _admit_cutout([content], tier)
     try:
-        content = await file.read()
-        from PIL import Image
-        from rembg import remove
-
-        img = Image.open(io.BytesIO(content)).convert("RGBA")
-        output_img = remove(img)
-
-        buffer = io.BytesIO()
-        output_img.save(buffer, format="PNG")
-        image_bytes = buffer.getvalue()
-        processed_base64 = base64.b64encode(image_bytes).decode("utf-8")
+        cutout = await bg_remover.cutout(content, tier)
+        await _publish_cutout(cutout)
+        image_fields = _image_fields(cutout, include_base64, "wardrobe")
 
         gemini_key = _get_gemini_key()
         if not gemini_key:
             return WardrobeProcessResponse(
                 success=False,
-                processed_image_base64=processed_base64,
+                **image_fields,
                 error="GEMINI_API_KEY가 설정되지 않았습니다.",
             )
 
-        from google import genai
+        # 옷 종류 판별 + 속성(소재/패턴/격식/스타일) 추출을 Gemini 1번 호출로, 대표 색은 로컬 계산
+        def prepare():
+            img = cutout.pil()
+            return imaging.for_llm(img), dominant_colors(img), color_histogram(img)
 
-        client = genai.Client(api_key=gemini_key)
-        classify_prompt = (
-            "이 옷 이미지를 보고 다음 세 가지 중 하나로만 분류해줘.\n"
-            "- 아우터 (코트, 자켓, 패딩, 블레이저 등)\n"
-            "- 이너 (티셔츠, 니트, 셔츠, 블라우스 등)\n"
-            "- 하의 (청바지, 슬랙스, 스커트, 치마, 반바지 등)\n\n"
-            "반드시 다음 JSON 형식으로만 응답해. 다른 텍스트 금지.\n"
-            '{"item_type": "아우터"}'
-        )
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[classify_prompt, output_img],
-        )
-        raw = (response.text or "{}").strip()
-        if "```" in raw:
-            s, e = raw.find("{"), raw.rfind("}") + 1
-            raw = raw[s:e] if s >= 0 and e > 0 else "{}"
-        item_type = json.loads(raw).get("item_type", "이너")
-        if item_type == "바지":  # 구버전 응답 대비 변환
-            item_type = "하의"
+        with metrics.stage("descriptor_prepare"):
+            llm_img, colors, lab_hist = await asyncio.to_thread(prepare)
+        response = await llm.generate_content([DESCRIPTOR_PROMPT, llm_img], site="descriptor")
+        descriptor = parse_descriptor(response.text, colors)
+        return await _save_wardrobe_item(cutout, descriptor, lab_hist, image_fields)
 
-        # Supabase Storage 업로드 (실패해도 base64 폴백으로 동작)
-        image_url = await asyncio.to_thread(_upload_to_supabase, image_bytes)
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        return WardrobeProcessResponse(success=False, error=str(e))
 
-        return WardrobeProcessResponse(
-            success=True,
-            processed_image_base64=processed_base64,
-            image_url=image_url,
-            item_type=item_type,
+
+async def _save_wardrobe_item(
+    cutout: Cutout, descriptor: ItemDescriptor, lab_hist: list[float], image_fields: dict
+) -> WardrobeProcessResponse:
+    """Supabase 업로드 예약 + 서버 옷장 저장 → 응답 (단건/배치 공통)"""
+    image_bytes = cutout.png
+    item_type = descriptor.item_type
+
+    # Storage 업로드는 write-behind 큐로 (URL은 콘텐츠 주소라 업로드 전에 확정, 미설정/큐 포화 시 None)
+    supabase_url = upload_queue.submit(image_bytes, cutout.sha256) if upload_queue is not None else None
+
+    # 서버 옷장에 저장 (실패해도 기존처럼 클라이언트가 이미지를 보관)
+    # 업로드 큐가 옷장과 같은 버킷의 같은 경로로 올리는 중이면 옷장은 행만 추가 (이미지 업로드는 큐 1곳에서만)
+    item_id = None
+    if wardrobe_store is not None:
+        image_queued = supabase_url is not None and upload_queue.writes_to(wardrobe_store.bucket)
+        try:
+            with metrics.stage("wardrobe_store"):
+                record = await asyncio.to_thread(
+                    wardrobe_store.put, image_bytes, item_type, supabase_url,
+                    {"descriptor": descriptor.model_dump(), "lab_hist": lab_hist}, image_queued,
+                )
+            item_id = record.id
+        except Exception:
+            logger.exception("옷장 저장 실패")
+
+    return WardrobeProcessResponse(
+        success=True,
+        **image_fields,
+        image_url=supabase_url,
+        item_type=item_type,
+        item_id=item_id,
+        dominant_color_hex=descriptor.dominant_color_hex,
+        descriptor=descriptor,
+    )
+
+
+# =============================================================================
+# C-2. 옷장 일괄 처리 - POST /api/wardrobe/process-batch (SSE)
+# =============================================================================
+
+class WardrobeBatchItem(WardrobeProcessResponse):
+    index: int  # 업로드 순서
+    filename: Optional[str] = None
+
+
+async def _wardrobe_batch_events(
+    contents: list[bytes], filenames: list[Optional[str]], include_base64: bool, tier: Optional[str] = None
+):
+    """
+    rembg: REMBG_BATCH_SIZE장씩 배치 추론 (bg_remover.cutout_many)
+    판별: 축소한 원본 전체를 Gemini 1번 호출로 (rembg와 동시에 진행, JSON 배열 응답)
+    업로드/저장: 아이템마다 별도 태스크로 동시에
+    → 아이템이 끝나는 순서대로 item 이벤트, 마지막에 done.
+    """
+    total = len(contents)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks: list[asyncio.Task] = []
+
+    async def classify() -> dict[int, dict]:
+        def prepare():
+            images = []
+            for i, content in enumerate(contents):
+                try:
+                    images.append((i, imaging.llm_input(content)))
+                except Exception:
+                    pass  # 디코딩 실패 파일은 rembg 쪽에서 에러로 보고됨
+            return images
+
+        with metrics.stage("llm_input"):
+            images = await asyncio.to_thread(prepare)
+        if not images:
+            return {}
+        response = await llm.generate_content(
+            [batch_descriptor_prompt(len(images))] + [img for _, img in images], site="descriptor_batch"
         )
+        parsed = parse_descriptor_batch(response.text, len(images))
+        return {i: data for (i, _), data in zip(images, parsed) if data is not None}
 
-    except Exception as e:
-        return WardrobeProcessResponse(success=False, error=str(e))
+    classify_task = asyncio.create_task(classify()) if _get_gemini_key() else None
+
+    async def finish(i: int, cutout) -> WardrobeProcessResponse:
+        if isinstance(cutout, Exception):
+            return WardrobeProcessResponse(success=False, error=str(cutout))
+        await _publish_cutout(cutout)
+        image_fields = _image_fields(cutout, include_base64, "wardrobe")
+        if classify_task is None:
+            return WardrobeProcessResponse(
+                success=False, **image_fields, error="GEMINI_API_KEY가 설정되지 않았습니다."
+            )
+        try:
+            descriptors = await asyncio.shield(classify_task)
+        except Exception as e:
+            return WardrobeProcessResponse(success=False, **image_fields, error=f"옷 종류 판별 실패: {e}")
+        if i not in descriptors:
+            return WardrobeProcessResponse(
+                success=False, **image_fields, error="옷 종류 판별 실패: 응답에 해당 이미지 결과 없음"
+            )
+
+        def prepare():
+            img = cutout.pil()
+            return dominant_colors(img), color_histogram(img)
+
+        with metrics.stage("descriptor_prepare"):
+            colors, lab_hist = await asyncio.to_thread(prepare)
+        descriptor = descriptor_from_dict(descriptors[i], colors)
+        return await _save_wardrobe_item(cutout, descriptor, lab_hist, image_fields)
+
+    async def finish_into_queue(i: int, cutout) -> None:
+        try:
+            result = await finish(i, cutout)
+        except Exception as e:
+            result = WardrobeProcessResponse(success=False, error=str(e))
+        await results.put(WardrobeBatchItem(index=i, filename=filenames[i], **result.model_dump()))
+
+    async def produce() -> None:
+        seen: set[int] = set()
+        try:
+            async for i, cutout in bg_remover.cutout_many(contents, tier):
+                seen.add(i)
+                tasks.append(asyncio.create_task(finish_into_queue(i, cutout)))
+        except Exception as e:
+            for i in range(total):
+                if i not in seen:
+                    await results.put(WardrobeBatchItem(index=i, filename=filenames[i], success=False, error=str(e)))
+
+    producer = asyncio.create_task(produce())
+    succeeded = 0
+    try:
+        for _ in range(total):
+            item: WardrobeBatchItem = await results.get()
+            succeeded += item.success
+            yield sse_event("item", item.model_dump())
+        yield sse_event("done", {"total": total, "succeeded": succeeded})
+    finally:
+        # 클라이언트가 끊으면 남은 추론/LLM/업로드 태스크 취소
+        for task in [producer, *tasks] + ([classify_task] if classify_task else []):
+            task.cancel()
+
+
+@app.post("/api/wardrobe/process-batch")
+async def process_wardrobe_batch(
+    files: list[UploadFile] = File(...), include_base64: bool = False, quality: Optional[str] = None
+):
+    """
+    여러 장을 한 번에 처리. 응답은 SSE:
+    item (WardrobeProcessResponse + index, filename, 끝나는 순서대로) → done ({total, succeeded})
+    """
+    if len(files) > WARDROBE_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {WARDROBE_BATCH_MAX_FILES}장까지 업로드할 수 있습니다.")
+    if any(not f.content_type or not f.content_type.startswith("image/") for f in files):
+        raise HTTPException(status_code=400, detail="이미지 파일을 업로드해주세요.")
+    tier = _rembg_tier(quality, "wardrobe")
+    _admit("llm", "storage")
+
+    # 해상도 초과는 파일별 item 오류로 보고 (배치 전체를 거절하지 않음)
+    contents = [await _read_image_upload(f, check_pixels=False) for f in files]
+    await _admit_cutout(contents, tier)
+    return StreamingResponse(
+        _wardrobe_batch_events(contents, [f.filename for f in files], include_base64, tier),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # =============================================================================
@@ -445,20 +902,31 @@ async def process_wardrobe_item(file: UploadFile = File(...)):
 
 class WardrobeItemInput(BaseModel):
     id: str
-    image_base64: str
-    item_type: str
+    image_base64: Optional[str] = None  # 없으면 서버 옷장에서 id로 조회
+    item_type: Optional[str] = None
 
 
 class SelectedItemInput(BaseModel):
-    image_base64: str
-    item_type: str
+    id: Optional[str] = None  # 서버 옷장 ID (image_base64 대신)
+    image_base64: Optional[str] = None
+    item_type: Optional[str] = None
+
+
+# Gemini 응답 대기 상한 - 넘으면 로컬 순위로 응답
+CLOSET_LLM_TIMEOUT_SEC = float(os.getenv("CLOSET_LLM_TIMEOUT_SEC", 20))
 
 
 class ClosetCoordinateRequest(BaseModel):
+    """
+    옷장 아이템은 ID만 보내는 방식(wardrobe_item_ids, selected_item.id) 권장.
+    image_base64를 직접 보내는 기존 방식도 그대로 지원.
+    """
     selected_item: SelectedItemInput
-    wardrobe_items: list[WardrobeItemInput]
+    wardrobe_items: list[WardrobeItemInput] = []
+    wardrobe_item_ids: list[str] = []
     aesthetic: str
     personal_color: str
+    include_images: bool = False  # True면 descriptor가 있어도 이미지를 함께 전송
 
 
 class Coordination(BaseModel):
@@ -469,41 +937,138 @@ class Coordination(BaseModel):
 class ClosetCoordinateResponse(BaseModel):
     success: bool
     coordinations: list[Coordination] = []
+    missing_item_ids: list[str] = []  # 서버 옷장에 없는 ID (클라이언트는 base64로 재요청)
+    source: str = "llm"  # "local": LLM 없이 로컬 색 점수 순위로 생성
     error: Optional[str] = None
 
 
+class _ClosetItem(NamedTuple):
+    id: Optional[str]
+    item_type: Optional[str]
+    descriptor: Optional[ItemDescriptor]  # 있으면 프롬프트에 텍스트로
+    lab_hist: Optional[list[float]]  # 로컬 순위용 색 히스토그램
+    record: Optional[WardrobeRecord] = None  # 서버 옷장 아이템
+    content: Optional[bytes] = None  # base64로 직접 받은 이미지
+
+
+def _resolve_closet_items(request: ClosetCoordinateRequest):
+    """
+    선택한 옷 + 옷장 아이템 → _ClosetItem.
+    ID만 온 아이템은 서버 옷장의 descriptor / 색 히스토그램을 쓰고, 없을 때만 이미지를 디코딩.
+    이미지(LLM 입력)는 순위 상위 후보에 대해서만 _closet_llm_images에서 준비. (워커 스레드에서 호출)
+    """
+    items = list(request.wardrobe_items) + [WardrobeItemInput(id=i) for i in request.wardrobe_item_ids]
+    sel = request.selected_item
+    if not sel.image_base64 and not sel.id:
+        raise ValueError("선택한 옷의 image_base64 또는 id가 필요합니다.")
+    lookup = [i.id for i in items if not i.image_base64]
+    if sel.id and not sel.image_base64:
+        lookup.append(sel.id)
+    records = wardrobe_store.get_many(lookup) if (lookup and wardrobe_store) else {}
+    missing = [i for i in lookup if i not in records]
+    if missing:
+        return None, [], missing
+
+    def resolve(item_id, b64, item_type):
+        if b64:
+            content = b64decode_limited(b64)
+            hist = color_histogram(imaging.decode(content, "llm"))
+            return _ClosetItem(item_id, item_type, None, hist, content=content)
+        record = records[item_id]
+        raw = record.metadata.get("descriptor")
+        descriptor = ItemDescriptor.model_validate(raw) if raw else None
+        hist = record.metadata.get("lab_hist")
+        if hist is None:  # 히스토그램 저장 이전에 올린 아이템
+            hist = color_histogram(imaging.decode(wardrobe_store.load_png(record), "llm"))
+        return _ClosetItem(item_id, item_type or record.item_type, descriptor, hist, record=record)
+
+    selected = resolve(sel.id, sel.image_base64, sel.item_type)
+    return selected, [resolve(i.id, i.image_base64, i.item_type) for i in items], []
+
+
+def _closet_llm_images(items: list[_ClosetItem], include_images: bool) -> list[Optional[imaging.EncodedImage]]:
+    """descriptor가 없는(또는 include_images) 아이템만 LLM 입력 이미지 준비 (워커 스레드에서 호출)"""
+    images = []
+    for item in items:
+        if item.descriptor is not None and not include_images:
+            images.append(None)
+        elif item.record is not None:
+            images.append(wardrobe_images.resolve(wardrobe_store, item.record))
+        else:
+            images.append(imaging.llm_input(item.content))
+    return images
+
+
+def _local_coordinations(ranked: list[RankedCandidate], personal_color: str) -> ClosetCoordinateResponse:
+    """LLM 없이 로컬 순위 상위 3개로 코디 구성"""
+    return ClosetCoordinateResponse(
+        success=True,
+        source="local",
+        coordinations=[
+            Coordination(recommended_item_ids=[c.id], styling_tip=fallback_tip(c, personal_color))
+            for c in ranked[:3]
+        ],
+    )
+
+
 @app.post("/api/closet-coordinate", response_model=ClosetCoordinateResponse)
 async def closet_coordinate(request: ClosetCoordinateRequest):
-    """선택한 옷 + 옷장 전체 → Gemini로 최대 3개 코디 조합 추천"""
-    gemini_key = _get_gemini_key()
-    if not gemini_key:
-        return ClosetCoordinateResponse(
-            success=False, error="GEMINI_API_KEY가 설정되지 않았습니다."
-        )
-
+    """
+    선택한 옷 + 옷장 전체 → 로컬 색 점수로 후보 순위 → 상위 K개만 Gemini로 최대 3개 코디 조합 추천.
+    키가 없거나 Gemini 호출이 실패/타임아웃이면 로컬 순위로 바로 응답 (source="local").
+    """
     try:
-        from PIL import Image
-        from google import genai
+        # 디코딩 + 히스토그램은 워커 스레드에서 (옷장 전체를 원본 크기로 보내지 않음)
+        with metrics.stage("closet_resolve"):
+            selected, items, missing = await asyncio.to_thread(_resolve_closet_items, request)
+        if missing:
+            return ClosetCoordinateResponse(
+                success=False,
+                missing_item_ids=missing,
+                error=f"옷장에서 아이템을 찾을 수 없습니다: {', '.join(missing)}",
+            )
+
+        selected_type = selected.item_type or (selected.descriptor.item_type if selected.descriptor else None)
+        with metrics.stage("closet_rank"):
+            ranked = rank_candidates(
+                selected_type,
+                selected.lab_hist,
+                [(item.id, item.item_type, item.lab_hist) for item in items],
+                request.personal_color,
+            )
+        if not ranked or not _get_gemini_key():
+            return _local_coordinations(ranked, request.personal_color)
+
+        by_id = {item.id: item for item in items}
+        top = ranked[:CLOSET_TOP_K]
+        candidates = [by_id[c.id] for c in top]
+        images = await asyncio.to_thread(
+            _closet_llm_images, [selected] + candidates, request.include_images
+        )
 
-        client = genai.Client(api_key=gemini_key)
+        # descriptor가 있는 아이템은 텍스트 한 줄, 없는 아이템만 이미지 첨부
+        attached: list[imaging.EncodedImage] = []
 
-        def b64_to_pil(b64: str) -> Image.Image:
-            return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGBA")
+        def describe(item: _ClosetItem, image: Optional[imaging.EncodedImage]) -> str:
+            line = item.descriptor.to_prompt_line() if item.descriptor else f"종류: {item.item_type}"
+            if image is not None:
+                attached.append(image)
+                line += f" (첨부 이미지 {len(attached)}번)"
+            return line
 
+        selected_line = describe(selected, images[0])
         wardrobe_summary = "\n".join(
-            f"- ID: {item.id}, 종류: {item.item_type}"
-            for item in request.wardrobe_items
+            f"- ID: {item.id}, {describe(item, image)}, 색 점수: {c.score}"
+            for item, image, c in zip(candidates, images[1:], top)
         )
-        id_list = [item.id for item in request.wardrobe_items]
-        wardrobe_images = [b64_to_pil(item.image_base64) for item in request.wardrobe_items]
+        id_list = [item.id for item in candidates]
 
-        item_type = request.selected_item.item_type
         prompt = (
-            f"선택한 옷: {item_type} (ID: \"selected\")\n"
+            f"선택한 옷 (ID: \"selected\"): {selected_line}\n"
             f"추구미: {request.aesthetic}, 퍼스널 컬러: {request.personal_color}\n"
-            f"옷장 아이템:\n{wardrobe_summary}\n\n"
-            f"첨부된 이미지들 — 첫 번째: 선택한 옷, 이후: 옷장 아이템 (목록 순서와 동일)\n\n"
-            f"규칙:\n"
+            f"옷장 아이템 (종류 조합 규칙에 맞는 후보만, 색 조화 점수 높은 순):\n{wardrobe_summary}\n\n"
+            + ("첨부된 이미지 번호는 위 목록에 표시된 번호와 같음\n\n" if attached else "")
+            + f"규칙:\n"
             f"- recommended_item_ids에는 반드시 옷장 아이템 ID 1개만 넣어 (\"selected\" 절대 금지)\n"
             f"- 선택한 옷이 하의면 → 이너 또는 아우터 중 1개만 추천\n"
             f"- 선택한 옷이 이너면 → 하의 또는 아우터 중 1개만 추천\n"
@@ -518,25 +1083,32 @@ async def closet_coordinate(request: ClosetCoordinateRequest):
             ']}}'
         )
 
-        selected_img = b64_to_pil(request.selected_item.image_base64)
-        contents = [prompt, selected_img] + wardrobe_images
+        contents = [prompt] + attached
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=contents,
+        try:
+            response = await llm.generate_content(contents, site="closet", timeout=CLOSET_LLM_TIMEOUT_SEC)
+            raw = (response.text or "{}").strip()
+            if "```" in raw:
+                s, e = raw.find("{"), raw.rfind("}") + 1
+                raw = raw[s:e] if s >= 0 and e > 0 else "{}"
+            result = metrics.parse_json(raw, "closet")
+        except Exception as e:
+            # 타임아웃 / 호출 실패 / 파싱 실패 → 같은 후보 순위로 로컬 응답
+            logger.warning("closet-coordinate: Gemini 실패, 로컬 순위로 응답 (%s: %s)", type(e).__name__, e)
+            return _local_coordinations(ranked, request.personal_color)
+
+        usage = getattr(response, "usage_metadata", None)
+        logger.info(
+            "closet-coordinate: items=%d candidates=%d images=%d prompt_tokens=%s",
+            len(items), len(candidates), len(attached), getattr(usage, "prompt_token_count", None),
         )
-        raw = (response.text or "{}").strip()
-        if "```" in raw:
-            s, e = raw.find("{"), raw.rfind("}") + 1
-            raw = raw[s:e] if s >= 0 and e > 0 else "{}"
-        result = json.loads(raw)
 
         # 중복 ID 방지 — 코드 레벨에서 2차 방어
         used_ids: set[str] = set()
         coordinations: list[Coordination] = []
         for c in result.get("coordinations", [])[:3]:
             raw_ids: list[str] = c.get("recommended_item_ids", [])
-            # selected 제외 + 실제 옷장 ID만 + 이미 사용된 ID 제외 + 첫 번째 1개만
+            # selected 제외 + 실제 후보 ID만 + 이미 사용된 ID 제외 + 첫 번째 1개만
             valid = [
                 i for i in raw_ids
                 if i in id_list and i not in used_ids and i != "selected"
@@ -553,8 +1125,6 @@ async def closet_coordinate(request: ClosetCoordinateRequest):
 
         return ClosetCoordinateResponse(success=True, coordinations=coordinations)
 
-    except json.JSONDecodeError as e:
-        return ClosetCoordinateResponse(success=False, error=f"응답 파싱 실패: {e}")
     except Exception as e:
         return ClosetCoordinateResponse(success=False, error=str(e))
 
@@ -595,23 +1165,48 @@ class ShopSearchResponse(BaseModel):
     error: Optional[str] = None
 
 
+# 같은 옷(지각 해시) + 같은 스타일 조건이면 Gemini 호출 없이 이전 추천 반환
+shop_cache = ShopRecommendationCache()
+
+
+def _shop_image_key(content: bytes):
+    """
+    업로드 바이트 → (지각 해시, 디코딩된 이미지 또는 None). (워커 스레드에서 호출)
+    같은 바이트를 이미 본 적 있으면 디코딩하지 않음.
+    """
+    content_key = shop_cache.content_key(content)
+    phash = shop_cache.phash_for(content_key)
+    if phash is not None:
+        return phash, None
+    img = imaging.decode(content, "llm")
+    phash = perceptual_hash(img)
+    shop_cache.remember(content_key, phash)
+    return phash, img
+
+
 @app.post("/api/shop-search", response_model=ShopSearchResponse)
 async def shop_search(request: ShopSearchRequest):
-    """Gemini로 추천 아이템 키워드 3개 생성 → 플랫폼별 검색 링크 반환"""
+    """Gemini로 추천 아이템 키워드 3개 생성 → 플랫폼별 검색 링크 반환 (결과는 shop_cache에 보관)"""
     gemini_key = _get_gemini_key()
     if not gemini_key:
         return ShopSearchResponse(
             success=False, error="GEMINI_API_KEY가 설정되지 않았습니다."
         )
+    _admit("llm")
 
     try:
-        from PIL import Image
-        from google import genai
-
-        client = genai.Client(api_key=gemini_key)
-        item_img = Image.open(
-            io.BytesIO(base64.b64decode(request.selected_item_base64))
-        ).convert("RGBA")
+        content = b64decode_limited(request.selected_item_base64)
+        params = (request.item_type, request.aesthetic, request.personal_color)
+        with metrics.stage("shop_image_key"):
+            phash, img = await asyncio.to_thread(_shop_image_key, content)
+        cached = shop_cache.get(phash, params)
+        if cached is not None:
+            return ShopSearchResponse(success=True, recommendations=cached)
+
+        if img is None:
+            item_img = await asyncio.to_thread(imaging.llm_input, content)
+        else:
+            item_img = await asyncio.to_thread(imaging.for_llm, img)
 
         prompt = (
             f"이 {request.item_type} 사진을 보고, "
@@ -625,17 +1220,14 @@ async def shop_search(request: ShopSearchRequest):
             '{"keyword": "검색 키워드", "description": "추천 이유"}]'
         )
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[prompt, item_img],
-        )
+        response = await llm.generate_content([prompt, item_img], site="shop")
         raw = (response.text or "[]").strip()
         # ```json ... ``` 감싸진 경우 추출
         if "```" in raw:
             s, e = raw.find("["), raw.rfind("]") + 1
             raw = raw[s:e] if s >= 0 and e > 0 else "[]"
 
-        items: list[dict] = json.loads(raw)
+        items: list[dict] = metrics.parse_json(raw, "shop")
         recommendations = [
             ShopRecommendation(
                 keyword=item.get("keyword", ""),
@@ -646,43 +1238,290 @@ async def shop_search(request: ShopSearchRequest):
             if item.get("keyword")
         ]
 
+        if recommendations:
+            shop_cache.put(phash, params, recommendations)
         return ShopSearchResponse(success=True, recommendations=recommendations)
 
     except json.JSONDecodeError as e:
         return ShopSearchResponse(success=False, error=f"응답 파싱 실패: {e}")
+    except admission.Overloaded:
+        raise
     except Exception as e:
         return ShopSearchResponse(success=False, error=f"추천 생성 실패: {e}")
 
 
 # =============================================================================
-# 공통 유틸 - Gemini 키 로드
+# F. 비동기 작업 - POST /api/jobs/* → 202 + job ID, GET /api/jobs/{id}, GET /api/jobs/{id}/events (SSE)
+# 긴 분석 요청이 연결을 붙잡지 않도록 (프록시 타임아웃 회피). 처리는 jobs.JobManager 워커가 담당
 # =============================================================================
 
-def _get_gemini_key() -> Optional[str]:
-    """os.environ에서 GEMINI_API_KEY 가져오기. 없으면 .env 재탐색."""
-    key = os.getenv("GEMINI_API_KEY")
-    if key:
-        return key
-    _dir = Path(__file__).resolve().parent
-    for env_path in [_dir / ".env", _dir.parent / ".env"]:
-        if env_path.exists():
-            vals = dotenv_values(env_path, encoding="utf-8-sig")
-            for k, v in vals.items():
-                if k.lstrip("\ufeff") == "GEMINI_API_KEY" and v:
-                    os.environ["GEMINI_API_KEY"] = v
-                    return v
-    return None
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+
+async def _analyze_job(job: Job, ctx: JobContext) -> dict:
+    p = job.params
+
+    def on_done(stage: str, result, err: Optional[StageError]) -> None:
+        ctx.progress(stage, ok=err is None)
+
+    # 작업은 이미 대기열(JOB_QUEUE_MAX)을 거쳐 왔으므로 단계 대기열에서는 거절하지 않고 기다림
+    with admission.patient():
+        result, summary = await _analyze(
+            job.payload, p["aesthetic"], p["personal_color"], p["include_base64"], on_done, ctx.limits, p.get("tier")
+        )
+    payload = result.model_dump()
+    payload["timings"] = summary
+    return payload
+
+
+async def _closet_coordinate_job(job: Job, ctx: JobContext) -> dict:
+    # 옷장 조회 + Gemini 1회 호출 → io 스테이지 1개로 취급
+    async with ctx.limits["io"]:
+        result = await closet_coordinate(ClosetCoordinateRequest(**job.params))
+    ctx.progress("coordinate", ok=result.success)
+    return result.model_dump()
+
+
+job_manager.register("analyze", _analyze_job)
+job_manager.register("closet-coordinate", _closet_coordinate_job)
+
+
+async def _submit_job(kind: str, params: dict, payload: Optional[bytes], priority: int) -> JobAccepted:
+    try:
+        job = await job_manager.submit(kind, params, payload, priority)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="작업 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "5"},
+        )
+    return JobAccepted(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/jobs/{job.id}",
+        events_url=f"/api/jobs/{job.id}/events",
+    )
+
+
+@app.post("/api/jobs/analyze", response_model=JobAccepted, status_code=202)
+async def submit_analyze_job(
+    file: UploadFile = File(...),
+    aesthetic: str = Form(...),
+    personal_color: str = Form(...),
+    include_base64: bool = False,
+    quality: Optional[str] = None,
+    priority: int = 0,
+):
+    """/api/analyze 와 같은 입력. 결과(result)는 AnalyzeResponse + timings"""
+    _validate_analyze_input(file, aesthetic, personal_color)
+    tier = _rembg_tier(quality, "analyze")
+    content = await _read_image_upload(file)
+    params = {
+        "aesthetic": aesthetic, "personal_color": personal_color, "include_base64": include_base64, "tier": tier,
+    }
+    return await _submit_job("analyze", params, content, priority)
+
+
+@app.post("/api/jobs/closet-coordinate", response_model=JobAccepted, status_code=202)
+async def submit_closet_coordinate_job(request: ClosetCoordinateRequest, priority: int = 0):
+    """/api/closet-coordinate 와 같은 입력. 결과(result)는 ClosetCoordinateResponse"""
+    return await _submit_job("closet-coordinate", request.model_dump(), None, priority)
+
+
+async def _get_job_or_404(job_id: str) -> Job:
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """status: queued | running | succeeded | failed. 끝나면 result 포함"""
+    return (await _get_job_or_404(job_id)).public()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """SSE: status → progress(스테이지 완료마다) → done(최종 상태 + result)"""
+    job = await _get_job_or_404(job_id)
+
+    async def stream():
+        async for event, data in job_manager.events(job):
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # =============================================================================
-# Health Check
+# 처리된 이미지 - GET /api/images/{sha}
 # =============================================================================
 
+@app.api_route("/api/images/{sha}", methods=["GET", "HEAD"])
+async def get_image(sha: str, request: Request, format: str = "auto", size: str = "original"):
+    """
+    콘텐츠 주소 이미지. 강한 ETag + immutable 캐시, If-None-Match / Range 지원.
+    format: auto(Accept 헤더로 PNG/WebP) | encoders.ENCODERS 이름, size: original | thumb
+    """
+    if format != "auto" and format not in encoders.ENCODERS:
+        raise HTTPException(status_code=400, detail=f"format은 auto 또는 {list(encoders.ENCODERS)} 중 하나여야 합니다.")
+    if size not in encoders.SIZES:
+        raise HTTPException(status_code=400, detail=f"size는 {list(encoders.SIZES)} 중 하나여야 합니다.")
+    name = encoders.negotiate(request.headers.get("accept"), format, IMAGE_AUTO_WEBP_ENCODER)
+    data = await asyncio.to_thread(processed_images.variant, sha, name, size)
+    if data is None:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+    etag = sha if (name, size) == (encoders.MASTER, "original") else f"{sha}-{name}-{size}"
+    return image_response(
+        data, etag, request.headers,
+        media_type=encoders.ENCODERS[name].mime_type,
+        vary="Accept" if format == "auto" else None,
+    )
+
+
+# =============================================================================
+# Health Check / Readiness
+# =============================================================================
+
+# 워밍업에서 미리 import할 모듈 (첫 요청 경로의 lazy import)
+_WARMUP_IMPORTS = ("numpy", "PIL.Image", "rembg", "httpx", "google.genai", "yt_dlp", "youtube_transcript_api")
+
+
+async def _warmup_imports() -> None:
+    import importlib
+
+    def run():
+        missing = []
+        for name in _WARMUP_IMPORTS:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                missing.append(name)
+        if missing:
+            raise ImportError(f"설치되지 않은 모듈: {', '.join(missing)}")
+
+    await asyncio.to_thread(run)
+
+
+async def _warmup_gemini() -> None:
+    # 키가 없으면 클라이언트 없이 진행 (키가 나중에 생기면 첫 사용 시점에 생성)
+    if not gemini.open():
+        logger.warning("GEMINI_API_KEY 없음 - Gemini 클라이언트 워밍업 생략")
+
+
+async def _warmup_storage() -> None:
+    if upload_queue is not None and upload_queue.backend is not None:
+        await asyncio.to_thread(upload_queue.backend.warmup)
+
+
+async def _warmup_rembg_service() -> None:
+    # 서비스가 뜨지 않으면 엔드포인트 기본 단계 세션을 이 프로세스에 로드 (프로세스 안 추론으로 대체)
+    if await bg_remover.service.wait_ready(REMBG_SERVICE_WAIT_SEC):
+        return
+    logger.warning("배경 제거 서비스(%s)에 연결할 수 없음 - 프로세스 안 추론용 세션 로드", REMBG_SERVICE_SOCKET)
+    for tier in dict.fromkeys(REMBG_TIER.values()):
+        await bg_remover.warmup(tier)
+        await bg_remover.warmup_inference(tier)
+
+
+startup_warmup.step("imports", _warmup_imports, required=False)
+if bg_remover.service is not None:
+    # 모델은 서비스 프로세스가 로드 (REMBG_WARM_TIERS는 서비스 쪽에서 적용)
+    startup_warmup.step("rembg_service", _warmup_rembg_service)
+else:
+    for _tier in REMBG_WARM_TIERS:
+        # 엔드포인트 기본 단계가 아닌 세션은 실패해도 준비 완료 (첫 요청 때 로드)
+        _required = _tier in REMBG_TIER.values()
+        startup_warmup.step(f"rembg_session_{_tier}", functools.partial(bg_remover.warmup, _tier), required=_required)
+        startup_warmup.step(
+            f"rembg_inference_{_tier}", functools.partial(bg_remover.warmup_inference, _tier), required=_required
+        )
+startup_warmup.step("gemini_client", _warmup_gemini, required=False)
+startup_warmup.step("storage_client", _warmup_storage, required=False)
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "Core-D API"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """워밍업(모델 로드 + 더미 추론)이 끝나야 200, 그 전에는 503 + 단계별 진행 상황/소요 시간"""
+    report = startup_warmup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """배경 제거 / 쇼핑 추천 캐시 적중/미스 카운터 + 트렌드 수집 소스별 지연/실패 + 업로드/작업 큐 길이 + LLM 호출 위치별 지연"""
+    return {
+        "cutout": cutout_cache.snapshot(),
+        "shop": shop_cache.snapshot(),
+        "images": processed_images.cache.snapshot(),
+        "trend_sources": trend_fetcher.stats.snapshot(),
+        "storage_uploads": upload_queue.stats() if upload_queue is not None else None,
+        "jobs": job_manager.stats(),
+        "llm": llm.stats(),
+        "image_memory": imaging.memory_budget.stats(),
+        "rembg": {**bg_remover.stats(), "endpoints": REMBG_TIER},
+        "admission": {stage: limiter.stats() for stage, limiter in ADMISSION_LIMITERS.items()},
+    }
+
+
+# =============================================================================
+# Prometheus - GET /metrics (구간 히스토그램/실패 카운터는 metrics.py, 캐시·큐는 여기서 수집)
+# =============================================================================
+
+def _collect_app_metrics():
+    caches = {
+        "cutout": cutout_cache.snapshot(),
+        "images": processed_images.cache.snapshot(),
+        "shop": shop_cache.snapshot(),
+        "wardrobe_llm_images": dict(wardrobe_images.stats),
+    }
+    events = [
+        ({"cache": name, "result": key}, value)
+        for name, snap in caches.items()
+        for key, value in snap.items()
+        if key.endswith("hits") or key in ("misses", "expired")
+    ]
+    depths = [({"queue": "jobs"}, job_manager.stats()["queue_depth"])]
+    if upload_queue is not None:
+        depths.append(({"queue": "storage_uploads"}, upload_queue.stats()["queue_depth"]))
+    admission_active = [({"stage": s}, limiter.active) for s, limiter in ADMISSION_LIMITERS.items()]
+    admission_waiting = [({"stage": s}, limiter.waiting) for s, limiter in ADMISSION_LIMITERS.items()]
+    warmup_steps = [
+        ({"step": step.name}, step.elapsed_ms / 1000)
+        for step in startup_warmup.steps
+        if step.elapsed_ms is not None
+    ]
+    return [
+        ("core_d_cache_events_total", "counter", "캐시 적중/미스 수", events),
+        ("core_d_queue_depth", "gauge", "대기 중인 항목 수", depths),
+        ("core_d_admission_active", "gauge", "단계별 실행 중인 작업 수", admission_active),
+        ("core_d_admission_waiting", "gauge", "단계별 대기열 길이", admission_waiting),
+        ("core_d_warmup_step_seconds", "gauge", "기동 워밍업 단계별 소요 시간 (초)", warmup_steps),
+        ("core_d_ready", "gauge", "워밍업 완료 여부 (1이면 준비됨)", [({}, int(startup_warmup.ready))]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_collect_app_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,282 @@
+"""
+지연/카운터 계측 - Prometheus 텍스트 형식(GET /metrics) + 응답별 Server-Timing 헤더
+- stage("rembg"): 구간 시간을 히스토그램(core_d_stage_seconds{stage})과 현재 요청 기록에 함께 남김
+- 요청 기록(RequestTrace)은 contextvars로 전달 → to_thread / create_task / 워커 풀 안에서도 같은 요청에 기록
+- TimingMiddleware: Server-Timing 헤더, 요청 히스토그램, SLOW_REQUEST_MS 초과 요청의 단계별 로그
+- 캐시 적중 등 이미 다른 곳에서 세는 값은 register_collector로 /metrics 시점에 읽어 옴
+- 요청별 이미지 처리 메모리 최대치(추정)와 프로세스 RSS도 함께 노출
+- 외부 의존성 없이 구현 (text exposition format 0.0.4)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Optional
+
+logger = logging.getLogger("core-d.metrics")
+
+# 이 시간(ms)을 넘긴 요청은 단계별 소요 시간을 경고 로그로 남김 (0이면 끔)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 0))
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 라벨 → [버킷별 개수..., 합, 개수]
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_fmt_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_fmt_labels({**labels, 'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_fmt_labels(labels)} {series[-1]}")
+        return lines
+
+
+# collector: () -> [(이름, 타입, 설명, [(라벨 dict, 값), ...]), ...]
+Collector = Callable[[], list[tuple[str, str, str, list[tuple[dict, float]]]]]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception:
+                logger.exception("metrics collector 실패")
+                continue
+            for name, kind, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_fmt_labels(labels)} {float(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("core_d_stage_seconds", "구간별 처리 시간 (초)", ["stage"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "core_d_request_seconds", "요청 처리 시간 (초, 응답 본문 전송 완료까지)", ["method", "route", "status"]
+)
+LLM_FAILURES = REGISTRY.counter("core_d_llm_failures_total", "Gemini 호출 실패 수", ["error"])
+JSON_PARSE_FAILURES = REGISTRY.counter("core_d_json_parse_failures_total", "LLM 응답 JSON 파싱 실패 수", ["site"])
+REQUEST_IMAGE_MEMORY = REGISTRY.histogram(
+    "core_d_request_image_memory_bytes",
+    "요청 1건이 동시에 잡은 이미지 처리 메모리 최대치 (추정, 바이트)",
+    ["route"],
+    buckets=tuple(mb * 2**20 for mb in (1, 4, 16, 32, 64, 128, 256, 512, 1024)),
+)
+
+
+def _process_memory():
+    """프로세스 RSS / 최대 RSS (Linux /proc, 그 외에는 빈 값)"""
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line[:5]] = int(line.split()[1]) * 1024
+    except OSError:
+        return []
+    return [
+        ("process_resident_memory_bytes", "gauge", "프로세스 RSS", [({}, values.get("VmRSS", 0))]),
+        ("core_d_process_peak_resident_memory_bytes", "gauge", "프로세스 최대 RSS (VmHWM)", [({}, values.get("VmHWM", 0))]),
+    ]
+
+
+REGISTRY.register_collector(_process_memory)
+
+
+# =============================================================================
+# 요청별 구간 기록
+# =============================================================================
+
+class RequestTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: list[tuple[str, float]] = []
+        # 이미지 메모리 예산(imaging.memory_budget)에서 이 요청이 잡고 있는 양 / 최대치
+        self.memory = 0
+        self.memory_peak = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def track_memory(self, delta: int) -> None:
+        with self._lock:
+            self.memory += delta
+            self.memory_peak = max(self.memory_peak, self.memory)
+
+    def totals(self) -> dict[str, float]:
+        """같은 이름 구간은 합산 (ms), 기록된 순서 유지"""
+        out: dict[str, float] = {}
+        with self._lock:
+            for name, seconds in self.stages:
+                out[name] = out.get(name, 0.0) + seconds * 1000
+        return out
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.totals().items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("core_d_request_trace", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def track_memory(delta: int) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.track_memory(delta)
+
+
+@contextmanager
+def stage(name: str):
+    """with stage("rembg"): ...  (async 함수 안에서 await를 감싸도 됨)"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def parse_json(text: str, site: str) -> Any:
+    """json.loads + 실패 카운터 (예외는 그대로 전달)"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        JSON_PARSE_FAILURES.inc(site=site)
+        raise
+
+
+class TimingMiddleware:
+    """
+    순수 ASGI 미들웨어 (StreamingResponse 본문을 버퍼링하지 않음).
+    Server-Timing에는 응답 헤더를 보내는 시점까지 끝난 구간만 들어감 → 스트리밍 응답의 뒷 단계는
+    /metrics 히스토그램과 느린 요청 로그에서 확인.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - trace.started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route, status=status)
+            if trace.memory_peak:
+                REQUEST_IMAGE_MEMORY.observe(trace.memory_peak, route=route)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(
+                    "느린 요청 %s %s %d %.0fms image_mem=%.1fMB stages=%s",
+                    scope["method"], route, status, elapsed * 1000, trace.memory_peak / 2**20,
+                    {k: round(v, 1) for k, v in trace.totals().items()},
+                )
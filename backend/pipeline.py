@@ -0,0 +1,147 @@
+"""
+의존 그래프 기반 스테이지 실행기
+- 각 스테이지는 입력(의존 스테이지 결과)이 준비되는 즉시 시작
+- 스테이지별 타임아웃, 시작/종료 시각 기록 (metrics 히스토그램/Server-Timing에도), 크리티컬 패스 계산
+- 스테이지 종류(kind)별 동시 실행 제한 (limits, 비동기 작업 큐에서 사용)
+"""
+
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+import metrics
+
+
+@dataclass
+class Stage:
+    """fn은 의존 스테이지 결과를 같은 이름의 키워드 인자로 받음"""
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    kind: Optional[str] = None  # "cpu" | "io" - run(limits=...)에서 같은 종류끼리 동시 실행 수 제한
+
+
+class StageError(Exception):
+    """스테이지 실패. 의존하는 스테이지로 그대로 전파됨 (stage = 최초 실패 지점)"""
+
+    def __init__(self, stage: str, cause: BaseException):
+        self.stage = stage
+        self.cause = cause
+        super().__init__(f"{stage}: {cause}")
+
+
+@dataclass
+class StageTiming:
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class PipelineRun:
+    results: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, StageError] = field(default_factory=dict)
+    timings: dict[str, StageTiming] = field(default_factory=dict)
+    deps: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    @property
+    def critical_path(self) -> list[str]:
+        """가장 늦게 끝난 스테이지부터, 가장 늦게 끝난 의존 스테이지를 거슬러 올라감"""
+        if not self.timings:
+            return []
+        node = max(self.timings, key=lambda n: self.timings[n].end)
+        path = [node]
+        while True:
+            parents = [d for d in self.deps.get(node, ()) if d in self.timings]
+            if not parents:
+                break
+            node = max(parents, key=lambda n: self.timings[n].end)
+            path.append(node)
+        return path[::-1]
+
+    @property
+    def critical_path_ms(self) -> float:
+        if not self.timings:
+            return 0.0
+        return max(t.end for t in self.timings.values()) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "critical_path": self.critical_path,
+            "critical_path_ms": round(self.critical_path_ms, 1),
+            "stages": {
+                name: {
+                    "start_ms": round(t.start * 1000, 1),
+                    "duration_ms": round(t.duration * 1000, 1),
+                }
+                for name, t in self.timings.items()
+            },
+        }
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        self.stages = {s.name: s for s in stages}
+        for s in stages:
+            missing = [d for d in s.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"{s.name}: 알 수 없는 의존 스테이지 {missing}")
+
+    async def run(
+        self,
+        on_done: Optional[Callable[[str, Any, Optional[StageError]], None]] = None,
+        limits: Optional[dict[str, asyncio.Semaphore]] = None,
+    ) -> PipelineRun:
+        """
+        on_done(stage, result, error): 스테이지가 끝날 때마다 호출 (스트리밍 응답용)
+        limits: kind → 세마포어. 기다리는 시간은 스테이지 타임아웃/소요 시간에 포함하지 않음.
+        """
+        run = PipelineRun(deps={n: s.deps for n, s in self.stages.items()})
+
+        def finish(name: str, result: Any, err: Optional[StageError]) -> None:
+            if on_done is not None:
+                on_done(name, result, err)
+
+        t0 = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def execute(stage: Stage):
+            inputs = {}
+            for dep in stage.deps:
+                try:
+                    inputs[dep] = await tasks[dep]
+                except StageError as e:
+                    run.errors[stage.name] = e
+                    finish(stage.name, None, e)
+                    raise
+            limit = (limits or {}).get(stage.kind) or contextlib.nullcontext()
+            async with limit:
+                start = time.perf_counter() - t0
+                try:
+                    result = await asyncio.wait_for(stage.fn(**inputs), stage.timeout)
+                except asyncio.TimeoutError:
+                    err = StageError(stage.name, TimeoutError(f"{stage.timeout}s 초과"))
+                except Exception as e:
+                    err = StageError(stage.name, e)
+                else:
+                    run.timings[stage.name] = StageTiming(start, time.perf_counter() - t0)
+                    metrics.record(stage.name, run.timings[stage.name].duration)
+                    run.results[stage.name] = result
+                    finish(stage.name, result, None)
+                    return result
+                run.timings[stage.name] = StageTiming(start, time.perf_counter() - t0)
+                metrics.record(stage.name, run.timings[stage.name].duration)
+            run.errors[stage.name] = err
+            finish(stage.name, None, err)
+            raise err
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(execute(stage))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return run
@@ -0,0 +1,370 @@
+"""
+공유 배경 제거 서비스 - uvicorn 워커가 여러 개일 때 rembg 모델을 프로세스 1개에만 올림
+- 서버: `python -m rembg_service` (backend 디렉터리에서). Unix 소켓으로 요청을 받아 BackgroundRemover로 추론
+- 모든 워커의 요청을 품질 단계별로 모아 REMBG_BATCH_SIZE장까지 한 번에 추론 (동적 마이크로 배치,
+  첫 요청 후 최대 REMBG_SERVICE_BATCH_WAIT_MS 대기, 워커 풀이 바쁜 동안 들어온 요청도 같은 배치로)
+- 이미지 바이트는 공유 메모리로 전달: 클라이언트가 입력 + 결과 PNG가 들어갈 크기의 세그먼트를 만들고
+  서버가 같은 세그먼트에 결과를 써서 돌려줌 (소켓으로는 작은 JSON 헤더만). 세그먼트 생성/삭제는 클라이언트만.
+- 클라이언트(RembgServiceClient): 연결 실패/시간 초과면 None을 돌려줘 호출 측이 프로세스 안 추론으로 대체,
+  REMBG_SERVICE_RETRY_SEC 동안은 서비스에 다시 붙지 않음
+
+메시지 형식: 4바이트 길이(big-endian) + JSON 헤더, 헤더의 inline 바이트만큼 본문이 뒤따름
+    요청  {"op": "cutout", "tier": ..., "size": n, "shm": 이름 | null, "capacity": 세그먼트 크기, "inline": n}
+          {"op": "ping"}
+    응답  {"ok": true, "size": n, "shm": true | false, "inline": n}  /  {"ok": false, "kind": 예외 이름, "error": ...}
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import struct
+import time
+from typing import Optional
+
+import imaging
+import metrics
+from bg_removal import REMBG_BATCH_SIZE, REMBG_WARM_TIERS, REMBG_WORKERS, BackgroundRemover, get_tier
+from uploads import UPLOAD_MAX_BYTES
+
+logger = logging.getLogger("core-d.rembg_service")
+
+# 비우면 서비스를 쓰지 않음 (워커마다 프로세스 안에서 추론). 서버와 API 워커가 같은 값을 써야 함
+REMBG_SERVICE_SOCKET = os.getenv("REMBG_SERVICE_SOCKET", "")
+REMBG_SERVICE_BATCH_WAIT_MS = float(os.getenv("REMBG_SERVICE_BATCH_WAIT_MS", 5))
+REMBG_SERVICE_TIMEOUT_SEC = float(os.getenv("REMBG_SERVICE_TIMEOUT_SEC", 60))  # 요청 1건 (대기 + 추론)
+REMBG_SERVICE_CONNECT_TIMEOUT_SEC = float(os.getenv("REMBG_SERVICE_CONNECT_TIMEOUT_SEC", 1))
+REMBG_SERVICE_RETRY_SEC = float(os.getenv("REMBG_SERVICE_RETRY_SEC", 5))  # 연결 실패 후 서비스를 건너뛰는 시간
+# 기동 워밍업에서 서비스가 뜨기를 기다리는 시간 (넘으면 프로세스 안 추론용 세션을 로드)
+REMBG_SERVICE_WAIT_SEC = float(os.getenv("REMBG_SERVICE_WAIT_SEC", 30))
+# 이보다 작은 업로드는 공유 메모리 대신 소켓으로 (세그먼트 생성 비용이 복사보다 큼)
+REMBG_SERVICE_SHM_MIN_BYTES = int(os.getenv("REMBG_SERVICE_SHM_MIN_BYTES", 64 * 1024))
+
+_HEADER = struct.Struct(">I")
+_MAX_HEADER_BYTES = 64 * 1024
+
+SERVICE_REQUESTS = metrics.REGISTRY.counter(
+    "core_d_rembg_service_requests_total", "배경 제거 서비스 요청 수 (ok/error/fallback)", ["result"]
+)
+
+
+class RemoteCutoutError(RuntimeError):
+    """서비스가 처리했지만 실패한 요청 (입력 이미지 문제 등 - 프로세스 안에서 다시 해도 같은 결과)"""
+
+
+def result_capacity() -> int:
+    """결과 PNG 최대 크기 추정 - 미리보기 크기 RGBA 무압축 + 여유"""
+    side = imaging.MAX_SIDE["preview"]
+    return side * side * 4 + side * 4 + 64 * 1024
+
+
+async def _send(writer: asyncio.StreamWriter, header: dict, body: bytes = b"") -> None:
+    data = json.dumps({**header, "inline": len(body)}).encode()
+    writer.write(_HEADER.pack(len(data)) + data)
+    if body:
+        writer.write(body)
+    await writer.drain()
+
+
+async def _recv(reader: asyncio.StreamReader, max_body: int) -> tuple[dict, bytes]:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > _MAX_HEADER_BYTES:
+        raise ValueError("헤더가 너무 큽니다")
+    header = json.loads(await reader.readexactly(length))
+    inline = int(header.get("inline", 0))
+    if inline > max_body:
+        raise ValueError("본문이 너무 큽니다")
+    return header, await reader.readexactly(inline) if inline else b""
+
+
+def _attach(name: str):
+    """클라이언트가 만든 세그먼트 열기 - 서버 쪽 resource_tracker가 종료 시 지우지 않게 등록 해제"""
+    from multiprocessing import resource_tracker, shared_memory
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+# =============================================================================
+# 서버
+# =============================================================================
+
+class RembgService:
+    """이벤트 루프 1개에서 실행. 추론은 BackgroundRemover 워커 풀에서 배치로."""
+
+    def __init__(
+        self,
+        engine: BackgroundRemover,
+        batch_size: int = REMBG_BATCH_SIZE,
+        batch_wait: float = REMBG_SERVICE_BATCH_WAIT_MS / 1000,
+    ):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._batchers: list[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(engine.workers)
+        self.counters = {"requests": 0, "errors": 0, "batches": 0, "batched_items": 0, "max_batch": 0}
+
+    async def cutout(self, content: bytes, tier: str) -> bytes:
+        queue = self._queues.get(tier)
+        if queue is None:
+            queue = self._queues[tier] = asyncio.Queue()
+            self._batchers.append(asyncio.create_task(self._batcher(tier, queue)))
+        fut = asyncio.get_running_loop().create_future()
+        await queue.put((content, fut))
+        return await fut
+
+    async def _batcher(self, tier: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            # 빈 워커를 기다리는 동안 들어온 요청은 같은 배치로
+            await self._slots.acquire()
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+            batch = [(content, fut) for content, fut in batch if not fut.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            asyncio.create_task(self._run_batch(tier, batch))
+
+    async def _run_batch(self, tier: str, batch: list) -> None:
+        try:
+            self.counters["batches"] += 1
+            self.counters["batched_items"] += len(batch)
+            self.counters["max_batch"] = max(self.counters["max_batch"], len(batch))
+            try:
+                results = await self.engine._run(self.engine.cutout_batch_sync, [c for c, _ in batch], tier)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, fut), result in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(result, Exception):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result[1])
+        finally:
+            self._slots.release()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header, body = await _recv(reader, UPLOAD_MAX_BYTES)
+                except asyncio.IncompleteReadError:
+                    break
+                if header.get("op") == "ping":
+                    await _send(writer, {"ok": True, **self.stats()})
+                    continue
+                await self._handle_cutout(writer, header, body)
+        except (ConnectionError, ValueError) as e:
+            logger.debug("연결 종료: %s", e)
+        finally:
+            writer.close()
+
+    async def _handle_cutout(self, writer: asyncio.StreamWriter, header: dict, body: bytes) -> None:
+        self.counters["requests"] += 1
+        shm = None
+        try:
+            size = int(header["size"])
+            if size > UPLOAD_MAX_BYTES:
+                raise ValueError("업로드 크기가 너무 큽니다")
+            if header.get("shm"):
+                shm = _attach(header["shm"])
+                content = bytes(shm.buf[:size])
+            else:
+                content = body
+            png = await self.cutout(content, get_tier(header.get("tier")).name)
+            if shm is not None and len(png) <= int(header.get("capacity", 0)):
+                shm.buf[: len(png)] = png
+                await _send(writer, {"ok": True, "size": len(png), "shm": True})
+            else:
+                await _send(writer, {"ok": True, "size": len(png), "shm": False}, png)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self.counters["errors"] += 1
+            await _send(writer, {"ok": False, "kind": type(e).__name__, "error": str(e)})
+        finally:
+            if shm is not None:
+                shm.close()
+
+    def stats(self) -> dict:
+        batches = self.counters["batches"]
+        return {
+            "pid": os.getpid(),
+            **self.counters,
+            "mean_batch": round(self.counters["batched_items"] / batches, 2) if batches else None,
+            "queued": {tier: q.qsize() for tier, q in self._queues.items()},
+            "rembg": self.engine.stats(),
+        }
+
+    async def serve(self, path: str, warm_tiers: list[str]) -> None:
+        for tier in warm_tiers:
+            t0 = time.perf_counter()
+            await self.engine.warmup(tier)
+            await self.engine.warmup_inference(tier)
+            logger.info("%s 단계 세션 준비 (%.0f ms)", tier, (time.perf_counter() - t0) * 1000)
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        os.chmod(path, 0o660)
+        # SIGTERM(배포 종료)에도 소켓 파일을 지우고 끝냄
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        logger.info("배경 제거 서비스 시작: %s (pid %d)", path, os.getpid())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in self._batchers:
+                task.cancel()
+            self.engine.shutdown()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+# =============================================================================
+# 클라이언트 (API 워커)
+# =============================================================================
+
+class RembgServiceClient:
+    """요청마다 Unix 소켓 연결 1개. cutout()이 None이면 서비스를 쓸 수 없음 → 호출 측이 프로세스 안에서 추론."""
+
+    def __init__(self, path: str = REMBG_SERVICE_SOCKET, timeout: float = REMBG_SERVICE_TIMEOUT_SEC):
+        self.path = path
+        self.timeout = timeout
+        self._down_until = 0.0
+        self.counters = {"ok": 0, "errors": 0, "fallbacks": 0, "shm_requests": 0, "inline_requests": 0}
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    async def _connect(self):
+        return await asyncio.wait_for(
+            asyncio.open_unix_connection(self.path, limit=2**20), REMBG_SERVICE_CONNECT_TIMEOUT_SEC
+        )
+
+    def _mark_down(self, err: BaseException) -> None:
+        if self.available:
+            logger.warning("배경 제거 서비스 사용 불가 (%s) - %.0f초 동안 프로세스 안에서 추론", err, REMBG_SERVICE_RETRY_SEC)
+        self._down_until = time.monotonic() + REMBG_SERVICE_RETRY_SEC
+
+    async def ping(self) -> Optional[dict]:
+        try:
+            reader, writer = await self._connect()
+            try:
+                await _send(writer, {"op": "ping"})
+                header, _ = await asyncio.wait_for(_recv(reader, 0), REMBG_SERVICE_CONNECT_TIMEOUT_SEC)
+            finally:
+                writer.close()
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            return None
+        self._down_until = 0.0
+        return header
+
+    async def wait_ready(self, timeout: float = REMBG_SERVICE_WAIT_SEC) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if await self.ping() is not None:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.2)
+
+    async def cutout(self, content: bytes, tier: str) -> Optional[bytes]:
+        """컷아웃 PNG. 서비스 연결 실패/시간 초과면 None, 서비스가 보고한 처리 오류는 예외."""
+        if not self.available:
+            self.counters["fallbacks"] += 1
+            SERVICE_REQUESTS.inc(result="fallback")
+            return None
+        try:
+            with metrics.stage("rembg_service"):
+                header, png = await asyncio.wait_for(self._request(content, tier), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            self._mark_down(e)
+            self.counters["fallbacks"] += 1
+            SERVICE_REQUESTS.inc(result="fallback")
+            return None
+        if not header.get("ok"):
+            self.counters["errors"] += 1
+            SERVICE_REQUESTS.inc(result="error")
+            kind, message = header.get("kind"), header.get("error", "")
+            if kind == "ImageTooLarge":
+                raise imaging.ImageTooLarge(message)
+            if kind == "TimeoutError":
+                raise TimeoutError(message)
+            raise RemoteCutoutError(message)
+        self.counters["ok"] += 1
+        SERVICE_REQUESTS.inc(result="ok")
+        return png
+
+    async def _request(self, content: bytes, tier: str) -> tuple[dict, bytes]:
+        shm = None
+        if len(content) >= REMBG_SERVICE_SHM_MIN_BYTES:
+            from multiprocessing import shared_memory
+
+            shm = shared_memory.SharedMemory(create=True, size=max(len(content), result_capacity()))
+            shm.buf[: len(content)] = content
+        reader, writer = None, None
+        try:
+            reader, writer = await self._connect()
+            request = {"op": "cutout", "tier": tier, "size": len(content)}
+            if shm is not None:
+                self.counters["shm_requests"] += 1
+                await _send(writer, {**request, "shm": shm.name, "capacity": shm.size})
+            else:
+                self.counters["inline_requests"] += 1
+                await _send(writer, {**request, "shm": None}, content)
+            header, body = await _recv(reader, result_capacity() * 2)
+            if header.get("ok") and header.get("shm"):
+                body = bytes(shm.buf[: int(header["size"])])
+            return header, body
+        finally:
+            if writer is not None:
+                writer.close()
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def stats(self) -> dict:
+        return {"socket": self.path, "available": self.available, **self.counters}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="공유 배경 제거 서비스 (Unix 소켓)")
+    parser.add_argument("--socket", default=REMBG_SERVICE_SOCKET or "/tmp/core-d-rembg.sock")
+    parser.add_argument("--workers", type=int, default=REMBG_WORKERS, help="동시에 실행하는 배치 추론 수")
+    parser.add_argument("--batch-size", type=int, default=REMBG_BATCH_SIZE)
+    parser.add_argument("--batch-wait-ms", type=float, default=REMBG_SERVICE_BATCH_WAIT_MS)
+    parser.add_argument("--tiers", nargs="*", default=REMBG_WARM_TIERS, help="기동 시 로드할 품질 단계")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    service = RembgService(BackgroundRemover(workers=args.workers), args.batch_size, args.batch_wait_ms / 1000)
+    try:
+        asyncio.run(service.serve(args.socket, [get_tier(t).name for t in args.tiers]))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+/api/shop-search 추천 결과 캐시
+- 키: 이미지 지각 해시(dHash 64bit) + item_type + 추구미 + 퍼스널 컬러
+- 같은 컷아웃을 다시 인코딩한 이미지(해시 거리 ≤ SHOP_CACHE_MAX_DISTANCE)도 적중
+- TTL + 항목 수 상한 LRU
+- 같은 base64를 다시 보내면 디코딩 없이 SHA-256 → 지각 해시 매핑으로 바로 조회
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+SHOP_CACHE_TTL_SEC = float(os.getenv("SHOP_CACHE_TTL_SEC", 24 * 3600))
+SHOP_CACHE_MAX_ENTRIES = int(os.getenv("SHOP_CACHE_MAX_ENTRIES", 1024))
+# 지각 해시 해밍 거리 허용치 (0 = 완전히 같은 해시만)
+SHOP_CACHE_MAX_DISTANCE = int(os.getenv("SHOP_CACHE_MAX_DISTANCE", 4))
+
+
+def perceptual_hash(img) -> int:
+    """
+    dHash: 흰 배경에 합성 → 9x8 흑백 축소 → 가로 인접 픽셀 밝기 비교 64bit.
+    재인코딩/약한 압축/리사이즈에는 거의 변하지 않음.
+    """
+    from PIL import Image
+
+    if img.mode in ("RGBA", "LA", "P"):
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        img = flat
+    small = img.convert("L").resize((9, 8), Image.Resampling.BOX, reducing_gap=2.0)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return bits
+
+
+class ShopRecommendationCache:
+    """스레드 안전. 값은 그대로 보관 (ShopRecommendation 리스트)"""
+
+    def __init__(
+        self,
+        ttl: float = SHOP_CACHE_TTL_SEC,
+        max_entries: int = SHOP_CACHE_MAX_ENTRIES,
+        max_distance: int = SHOP_CACHE_MAX_DISTANCE,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # (params, 지각 해시) -> (저장 시각, 값). 순서 = 최근 사용 순
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        # 업로드 바이트 SHA-256 -> 지각 해시 (같은 바이트 재요청 시 디코딩 생략)
+        self._aliases: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def content_key(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def phash_for(self, content_key: str) -> Optional[int]:
+        with self._lock:
+            phash = self._aliases.get(content_key)
+            if phash is not None:
+                self._aliases.move_to_end(content_key)
+            return phash
+
+    def remember(self, content_key: str, phash: int) -> None:
+        with self._lock:
+            self._aliases[content_key] = phash
+            self._aliases.move_to_end(content_key)
+            while len(self._aliases) > self.max_entries * 4:
+                self._aliases.popitem(last=False)
+
+    def get(self, phash: int, params: tuple) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            key = (params, phash)
+            hit = self._lookup(key, now)
+            if hit is not None:
+                self.stats["exact_hits"] += 1
+                return hit
+            if self.max_distance > 0:
+                for (p, h) in list(self._entries):
+                    if p == params and bin(h ^ phash).count("1") <= self.max_distance:
+                        hit = self._lookup((p, h), now)
+                        if hit is not None:
+                            self.stats["near_hits"] += 1
+                            return hit
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, phash: int, params: tuple, value: Any) -> None:
+        with self._lock:
+            key = (params, phash)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["near_hits"]
+            total = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    # ---- 내부 (self._lock 보유 상태에서 호출) -----------------------------------
+
+    def _lookup(self, key: tuple, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if now - stored_at > self.ttl:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
@@ -0,0 +1,262 @@
+"""
+이미지 스토리지 업로드 - 앱 수명 동안 클라이언트 1개 + 백그라운드 write-behind 큐
+- 경로는 콘텐츠 주소(wardrobe/<sha256>.png) → URL을 업로드 전에 바로 계산해서 응답
+- 같은 이미지는 1번만 업로드 (대기/진행 중/완료 경로 중복 제거)
+- 실패 시 지수 백오프로 재시도, 큐 길이/업로드 지연은 stats()로 노출
+- 백엔드: Supabase Storage 또는 로컬 디렉터리(개발/테스트용 대역)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import admission
+import metrics
+
+logger = logging.getLogger("core-d.storage")
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")  # supabase | local
+LOCAL_STORAGE_DIR = os.getenv(
+    "LOCAL_STORAGE_DIR", str(Path(__file__).resolve().parent / ".data" / "storage")
+)
+STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", 4))
+STORAGE_UPLOAD_QUEUE_MAX = int(os.getenv("STORAGE_UPLOAD_QUEUE_MAX", 1000))
+STORAGE_UPLOAD_RETRIES = int(os.getenv("STORAGE_UPLOAD_RETRIES", 3))
+STORAGE_RETRY_BASE_SEC = float(os.getenv("STORAGE_RETRY_BASE_SEC", 0.5))
+# 종료 시 남은 업로드를 기다리는 최대 시간
+STORAGE_DRAIN_TIMEOUT_SEC = float(os.getenv("STORAGE_DRAIN_TIMEOUT_SEC", 10))
+
+
+def content_path(sha: str, prefix: str = "wardrobe", ext: str = "png") -> str:
+    # 업로드 큐와 SupabaseWardrobeStore가 함께 쓰는 경로 규칙 (같은 이미지는 버킷에 1벌만)
+    return f"{prefix}/{sha}.{ext}"
+
+
+class StorageBackend:
+    """동기 인터페이스 (업로드 워커가 스레드에서 호출)"""
+
+    def upload(self, path: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    def public_url(self, path: str) -> str:
+        raise NotImplementedError
+
+    def warmup(self) -> None:
+        """클라이언트 생성 등 첫 업로드 전에 미리 할 일 (기본은 없음)"""
+
+
+class SupabaseStorage(StorageBackend):
+    def __init__(self, url: str, key: str, bucket: str):
+        self._url = url
+        self._key = key
+        self.bucket = bucket
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+
+                    self._client = create_client(self._url, self._key)
+        return self._client
+
+    def warmup(self):
+        _ = self.client
+
+    def upload(self, path, data, content_type):
+        # 콘텐츠 주소 경로라 덮어써도 같은 내용 (upsert) + CDN 장기 캐시
+        self.client.storage.from_(self.bucket).upload(
+            path, data, {"content-type": content_type, "upsert": "true", "cache-control": "31536000"}
+        )
+
+    def public_url(self, path):
+        # 네트워크 호출 없이 URL 문자열만 생성
+        return self.client.storage.from_(self.bucket).get_public_url(path)
+
+
+class LocalStorage(StorageBackend):
+    """디렉터리에 저장하는 대역 (STORAGE_BACKEND=local)"""
+
+    def __init__(self, directory: str = LOCAL_STORAGE_DIR):
+        self.directory = Path(directory)
+
+    def upload(self, path, data, content_type):
+        target = self.directory / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    def public_url(self, path):
+        return (self.directory / path).resolve().as_uri()
+
+
+def create_storage() -> Optional[StorageBackend]:
+    """환경 변수가 없으면 None (업로드 생략, 기존처럼 URL 없이 동작)"""
+    if STORAGE_BACKEND == "local":
+        return LocalStorage()
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        return None
+    return SupabaseStorage(url, key, os.getenv("SUPABASE_STORAGE_BUCKET", "wardrobe-images"))
+
+
+class UploadQueue:
+    """
+    write-behind 업로드 큐. submit()은 URL을 즉시 반환하고 업로드는 워커 태스크가 처리.
+    이벤트 루프 스레드에서만 사용.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StorageBackend],
+        workers: int = STORAGE_UPLOAD_WORKERS,
+        max_queue: int = STORAGE_UPLOAD_QUEUE_MAX,
+        retries: int = STORAGE_UPLOAD_RETRIES,
+        retry_base: float = STORAGE_RETRY_BASE_SEC,
+        on_failed: Optional[Callable[[str, bytes], Awaitable[None]]] = None,
+    ):
+        self.backend = backend
+        # 재시도까지 모두 실패한 업로드 (경로, 데이터) → 다른 경로로 다시 올리는 등 후처리
+        self.on_failed = on_failed
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.retry_base = retry_base
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: list[asyncio.Task] = []
+        # 경로 → "pending" | "done" (최근 것만 보관)
+        self._known: OrderedDict[str, str] = OrderedDict()
+        self._latencies: deque = deque(maxlen=512)
+        self._in_flight = 0
+        self.counters = {"submitted": 0, "deduped": 0, "uploaded": 0, "retries": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def writes_to(self, bucket: Optional[str]) -> bool:
+        """이 큐가 해당 Supabase 버킷에 업로드하는지 (같은 콘텐츠 주소 경로를 쓰는 다른 저장소가 업로드를 생략해도 되는지)"""
+        return bucket is not None and isinstance(self.backend, SupabaseStorage) and self.backend.bucket == bucket
+
+    @property
+    def saturated(self) -> bool:
+        """대기열이 가득 참 - 새 업로드는 거절됨 (요청 입구의 부하 차단 기준)"""
+        return self.backend is not None and self._queue.full()
+
+    def start(self) -> None:
+        if self.backend is None or self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = STORAGE_DRAIN_TIMEOUT_SEC) -> None:
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("업로드 큐 종료: %d건 미완료", self._queue.qsize() + self._in_flight)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def flush(self) -> None:
+        """대기 중인 업로드가 모두 끝날 때까지 대기 (테스트/벤치용)"""
+        await self._queue.join()
+
+    def submit(
+        self, data: bytes, sha: Optional[str] = None, content_type: str = "image/png"
+    ) -> Optional[str]:
+        """업로드를 예약하고 최종 public URL을 반환. 스토리지 미설정/큐 포화 시 None."""
+        if self.backend is None:
+            return None
+        path = content_path(sha or hashlib.sha256(data).hexdigest())
+        url = self.backend.public_url(path)
+        state = self._known.get(path)
+        if state is not None:
+            self._known.move_to_end(path)
+            self.counters["deduped"] += 1
+            return url
+        try:
+            self._queue.put_nowait((path, data, content_type, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return None
+        self._remember(path, "pending")
+        self.counters["submitted"] += 1
+        return url
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "queue_depth": self._queue.qsize(),
+            "in_flight": self._in_flight,
+            **self.counters,
+            # 예약 → 업로드 완료까지 (큐 대기 + 재시도 포함)
+            "upload_ms_p50": pct(0.5),
+            "upload_ms_p95": pct(0.95),
+        }
+
+    # ---- 내부 ----------------------------------------------------------------
+
+    def _remember(self, path: str, state: str) -> None:
+        self._known[path] = state
+        self._known.move_to_end(path)
+        while len(self._known) > 10000:
+            self._known.popitem(last=False)
+
+    async def _worker(self) -> None:
+        while True:
+            path, data, content_type, queued_at = await self._queue.get()
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                await self._upload_with_retry(path, data, content_type)
+                admission.observe("storage", started - queued_at, time.perf_counter() - started)
+                self._latencies.append(time.perf_counter() - queued_at)
+                self._remember(path, "done")
+                self.counters["uploaded"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 실패한 경로는 잊어서 다음 submit 때 다시 시도
+                self._known.pop(path, None)
+                self.counters["failed"] += 1
+                logger.warning("스토리지 업로드 실패 %s: %s", path, e)
+                if self.on_failed is not None:
+                    try:
+                        await self.on_failed(path, data)
+                    except Exception:
+                        logger.exception("업로드 실패 후처리 실패: %s", path)
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    async def _upload_with_retry(self, path: str, data: bytes, content_type: str) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.stage("storage_upload"):
+                    await asyncio.to_thread(self.backend.upload, path, data, content_type)
+                return
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(self.retry_base * (2 ** attempt))
@@ -0,0 +1,80 @@
+"""
+Server-Sent Events 응답 도우미
+- sse_event: 이벤트 1개를 text/event-stream 형식으로 직렬화
+- JSONFieldStream: LLM이 토큰 단위로 내보내는 JSON 객체에서 완성된 문자열 필드를 순서대로 꺼냄
+- OrderedEvents: 스테이지가 끝나는 순서와 상관없이 단계(phase) 순서대로 이벤트 전송
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, AsyncIterator
+
+_FIELD = re.compile(r'"([^"\\]+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JSONFieldStream:
+    """
+    {"inner": "...", "bottom": "...", ...} 형태의 평평한 JSON을 조각으로 받아
+    닫는 따옴표까지 도착한 "key": "value" 쌍만 반환 (같은 key는 1번만).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._seen: set[str] = set()
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        self._buffer += chunk
+        fields = []
+        for m in _FIELD.finditer(self._buffer, self._pos):
+            self._pos = m.end()
+            key = m.group(1)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            fields.append((key, json.loads(f'"{m.group(2)}"')))
+        return fields
+
+
+class OrderedEvents:
+    """
+    phase 목록 순서대로 이벤트를 내보냄.
+    앞 phase가 close되기 전까지 뒤 phase 이벤트는 버퍼에 보관 (예: 이미지 → item_type → 추천 필드).
+    push/close는 이벤트 루프 스레드에서만 호출.
+    """
+
+    def __init__(self, phases: list[str]):
+        self._phases = phases
+        self._buffers: dict[str, list[str]] = {p: [] for p in phases}
+        self._closed: set[str] = set()
+        self._changed = asyncio.Event()
+
+    def push(self, phase: str, event: str) -> None:
+        self._buffers[phase].append(event)
+        self._changed.set()
+
+    def close(self, phase: str) -> None:
+        self._closed.add(phase)
+        self._changed.set()
+
+    def close_all(self) -> None:
+        self._closed.update(self._phases)
+        self._changed.set()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        index = 0
+        while index < len(self._phases):
+            phase = self._phases[index]
+            buffer = self._buffers[phase]
+            while buffer:
+                yield buffer.pop(0)
+            if phase in self._closed:
+                index += 1
+                continue
+            self._changed.clear()
+            await self._changed.wait()
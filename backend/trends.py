@@ -0,0 +1,327 @@
+"""
+YouTube 패션 트렌드 수집 + (year, month, season) 단위 요약 캐시
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TREND_SUMMARY = (
+    "올해의 핵심 패션 트렌드: 미니멀 스타일, 넓은 핏 실루엣, "
+    "뉴트럴 톤 및 파스텔 컬러가 인기. 편안한 캐주얼과 유니크한 포인트 아이템 조합."
+)
+
+# 스케줄 갱신 주기 / 이 시간이 지난 요약은 stale 로 보고 백그라운드 재검증
+TREND_REFRESH_INTERVAL_SEC = float(os.getenv("TREND_REFRESH_INTERVAL_SEC", 6 * 60 * 60))
+TREND_MAX_AGE_SEC = float(os.getenv("TREND_MAX_AGE_SEC", 12 * 60 * 60))
+# 수집 실패 시 다음 시도까지 대기 시간
+TREND_RETRY_INTERVAL_SEC = float(os.getenv("TREND_RETRY_INTERVAL_SEC", 5 * 60))
+# 검색 + 자막 수집 전체에 주는 시간. 이 안에 도착한 자막만 요약에 사용
+TREND_FETCH_DEADLINE_SEC = float(os.getenv("TREND_FETCH_DEADLINE_SEC", 20))
+TREND_FETCH_WORKERS = int(os.getenv("TREND_FETCH_WORKERS", 8))
+
+
+class TrendKey(NamedTuple):
+    year: int
+    month: int
+    season: str
+
+
+def current_trend_key(now: Optional[datetime] = None) -> TrendKey:
+    """트렌드 요약이 달라지는 단위 (연, 월, 계절)"""
+    now = now or datetime.now()
+    month = now.month
+    season = "봄" if 3 <= month <= 5 else "여름" if 6 <= month <= 8 else "가을" if 9 <= month <= 11 else "겨울"
+    return TrendKey(now.year, month, season)
+
+
+# =============================================================================
+# 검색/자막 병렬 수집 (전역 데드라인)
+# =============================================================================
+
+def youtube_search(query: str, limit: int = 5) -> list[str]:
+    """검색어 → 영상 ID 목록 (yt-dlp ytsearch, 영상 페이지는 열지 않음)"""
+    from yt_dlp import YoutubeDL
+
+    opts = {"quiet": True, "no_warnings": True, "extract_flat": True, "skip_download": True}
+    with YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(f"ytsearch{limit}:{query}", download=False)
+    return [e["id"] for e in (info or {}).get("entries") or [] if e.get("id")]
+
+
+def youtube_transcript(video_id: str) -> str:
+    """영상 자막 전체 텍스트 (한국어 우선, 없으면 영어)"""
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    fetched = YouTubeTranscriptApi().fetch(video_id, languages=["ko", "en"])
+    return " ".join(snippet.text for snippet in fetched).strip()
+
+
+class SourceStats:
+    """소스(search / transcript / summarize)별 호출 수, 실패, 데드라인 초과, 지연"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+
+    def _bucket(self, source: str) -> dict:
+        return self._data.setdefault(
+            source, {"calls": 0, "failures": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+
+    def record(self, source: str, elapsed: float, ok: bool) -> None:
+        ms = elapsed * 1000
+        with self._lock:
+            b = self._bucket(source)
+            b["calls"] += 1
+            b["failures"] += 0 if ok else 1
+            b["total_ms"] += ms
+            b["max_ms"] = max(b["max_ms"], ms)
+
+    def record_timeout(self, source: str, count: int = 1) -> None:
+        with self._lock:
+            self._bucket(source)["timeouts"] += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                source: {
+                    "calls": b["calls"],
+                    "failures": b["failures"],
+                    "timeouts": b["timeouts"],
+                    "avg_ms": round(b["total_ms"] / b["calls"], 1) if b["calls"] else 0.0,
+                    "max_ms": round(b["max_ms"], 1),
+                }
+                for source, b in self._data.items()
+            }
+
+
+class TrendFetcher:
+    """
+    검색어들을 동시에 검색하고, 결과가 오는 대로 자막을 동시에 요청.
+    deadline 안에 도착한 자막만 사용하고 나머지는 기다리지 않음.
+    search/transcript를 바꿔 끼우면 로컬 가짜 API로 검증 가능.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], list[str]] = youtube_search,
+        transcript: Callable[[str], str] = youtube_transcript,
+        deadline: float = TREND_FETCH_DEADLINE_SEC,
+        max_videos: int = 5,
+        workers: int = TREND_FETCH_WORKERS,
+    ):
+        self._search = search
+        self._transcript = transcript
+        self.deadline = deadline
+        self.max_videos = max_videos
+        self.workers = workers
+        self.stats = SourceStats()
+
+    def timed(self, source: str, fn: Callable, *args):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.stats.record(source, time.perf_counter() - t0, ok=False)
+            metrics.record(f"trend_{source}", time.perf_counter() - t0)
+            raise
+        self.stats.record(source, time.perf_counter() - t0, ok=True)
+        metrics.record(f"trend_{source}", time.perf_counter() - t0)
+        return result
+
+    def fetch(self, queries: list[str]) -> list[tuple[str, str]]:
+        """[(video_id, 자막 텍스트)] - 영상 ID 발견 순서"""
+        until = time.monotonic() + self.deadline
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trend-fetch")
+        searches = {pool.submit(self.timed, "search", self._search, q): q for q in queries}
+        transcripts: dict[Future, str] = {}
+        video_ids: list[str] = []
+        texts: dict[str, str] = {}
+        pending = set(searches)
+        try:
+            while pending:
+                remaining = until - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut in searches:
+                        if fut.exception() is not None:
+                            continue
+                        for vid in fut.result():
+                            if len(video_ids) >= self.max_videos:
+                                break
+                            if vid not in video_ids:
+                                video_ids.append(vid)
+                                tf = pool.submit(self.timed, "transcript", self._transcript, vid)
+                                transcripts[tf] = vid
+                                pending.add(tf)
+                    elif fut.exception() is None and fut.result():
+                        texts[transcripts[fut]] = fut.result()
+                if len(video_ids) >= self.max_videos:
+                    # 영상이 다 모이면 남은 검색은 기다리지 않음
+                    pending -= searches.keys()
+        finally:
+            for source, futs in (("search", searches), ("transcript", transcripts)):
+                late = sum(1 for f in futs if f in pending)
+                if late:
+                    self.stats.record_timeout(source, late)
+            # 데드라인을 넘긴 호출은 결과를 버림 (스레드는 백그라운드에서 종료)
+            pool.shutdown(wait=False, cancel_futures=True)
+        return [(vid, texts[vid]) for vid in video_ids if vid in texts]
+
+
+def collect_trend_summary(
+    generate: Callable[[str], Any], key: TrendKey, fetcher: Optional[TrendFetcher] = None
+) -> Optional[str]:
+    """
+    유튜브 패션 영상 자막을 수집해 Gemini로 트렌드 요약 생성.
+    generate: 프롬프트 → 응답(.text) 동기 호출 (앱에서는 LLM 게이트웨이)
+    수집/요약 실패 시 None 반환 (캐시는 이전 요약을 유지).
+    """
+    fetcher = fetcher or TrendFetcher()
+    year, month, season = key
+    search_queries = [
+        f"{year}년 {month}월 패션 트렌드",
+        f"{year} {season} 코디 추천",
+        f"Fashion trends {year} Korea",
+    ]
+
+    transcripts_text = []
+    for video_id, text in fetcher.fetch(search_queries):
+        if len(text) > 2000:
+            text = text[:2000] + "..."
+        transcripts_text.append(f"[영상 {video_id}]\n{text}")
+
+    if not transcripts_text:
+        return None
+
+    combined = "\n\n".join(transcripts_text)
+    prompt = (
+        "다음은 최신 패션 유튜버들의 영상 자막이다. "
+        "여기서 언급되는 **핵심 아이템, 컬러, 스타일 트렌드**를 3줄로 요약해줘."
+        "\n\n---\n\n" + combined
+    )
+
+    try:
+        response = fetcher.timed("summarize", generate, prompt)
+        summary = (response.text or "").strip()
+        return summary or None
+    except Exception:
+        return None
+
+
+# =============================================================================
+# 트렌드 요약 캐시 (stale-while-revalidate)
+# =============================================================================
+
+@dataclass
+class _TrendEntry:
+    summary: str
+    fetched_at: float
+
+
+class TrendCache:
+    """
+    (year, month, season) 키별 트렌드 요약 캐시.
+
+    - get(): 절대 수집을 기다리지 않음. 캐시된 요약을 즉시 반환하고,
+      오래됐거나 키가 바뀌었으면 백그라운드 재수집만 예약.
+    - 아무 요약도 없는 콜드 스타트에서만 DEFAULT_TREND_SUMMARY 반환.
+    - start()/stop(): lifespan에서 주기적 갱신 태스크 관리.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[TrendKey], Optional[str]],
+        refresh_interval: float = TREND_REFRESH_INTERVAL_SEC,
+        max_age: float = TREND_MAX_AGE_SEC,
+        retry_interval: float = TREND_RETRY_INTERVAL_SEC,
+    ):
+        self._fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self._entries: dict[TrendKey, _TrendEntry] = {}
+        self._inflight: dict[TrendKey, asyncio.Task] = {}
+        # 키별 마지막 수집 실패 시각 → get()은 retry_interval 동안 재수집을 다시 예약하지 않음
+        self._failed_at: dict[TrendKey, float] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def get(self, key: Optional[TrendKey] = None) -> str:
+        key = key or current_trend_key()
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.fetched_at > self.max_age:
+            self._schedule_refresh(key)
+        if entry is not None:
+            return entry.summary
+        # 월/계절이 막 바뀐 경우: 새 요약이 준비될 때까지 가장 최근 요약 사용
+        latest = max(self._entries.values(), key=lambda e: e.fetched_at, default=None)
+        return latest.summary if latest else DEFAULT_TREND_SUMMARY
+
+    async def refresh(self, key: Optional[TrendKey] = None) -> bool:
+        """키 하나를 재수집. 같은 키의 동시 갱신은 하나로 합침."""
+        return await asyncio.shield(self._ensure_task(key or current_trend_key()))
+
+    def _ensure_task(self, key: TrendKey) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return task
+
+    async def _refresh(self, key: TrendKey) -> bool:
+        try:
+            summary = await asyncio.to_thread(self._fetch, key)
+        except Exception:
+            logger.exception("트렌드 수집 실패: %s", key)
+            summary = None
+        if not summary:
+            self._failed_at[key] = time.monotonic()
+            return False
+        self._failed_at.pop(key, None)
+        self._entries[key] = _TrendEntry(summary, time.monotonic())
+        # 새 키 요약이 준비되면 지난 키 요약은 폐기
+        for old in [k for k in self._entries if k != key]:
+            del self._entries[old]
+        return True
+
+    def _schedule_refresh(self, key: TrendKey) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        failed_at = self._failed_at.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+            return
+        self._ensure_task(key)
+
+    async def _run(self) -> None:
+        while True:
+            ok = await self.refresh()
+            await asyncio.sleep(self.refresh_interval if ok else self.retry_interval)
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
@@ -0,0 +1,109 @@
+"""
+업로드 크기 제한 - 요청 본문/파일/base64 이미지를 메모리에 올리기 전에 바이트 상한 검사
+- BodySizeLimitMiddleware: Content-Length가 크면 본문을 읽기 전에 413, 길이 없이 흘러오는 본문도 누적 바이트로 차단
+- read_upload: UploadFile을 상한+1 바이트까지만 읽음 (큰 파일을 통째로 read() 하지 않음)
+- b64decode_limited: 디코딩 후 크기를 문자열 길이로 먼저 계산해 상한 초과 시 디코딩하지 않음
+픽셀 수 상한(decompression bomb)과 디코딩 메모리 예산은 imaging.py
+"""
+
+import base64
+import json
+import os
+
+from fastapi import UploadFile
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 20 * 2**20))  # 이미지 1장
+# /api/wardrobe/process-batch 1회 최대 파일 수 (= Gemini 1회 호출에 들어가는 이미지 수)
+WARDROBE_BATCH_MAX_FILES = int(os.getenv("WARDROBE_BATCH_MAX_FILES", 20))
+# multipart 경계/파트 헤더/폼 필드 여유분
+MULTIPART_OVERHEAD_BYTES = 2**20
+# 요청 본문 전체 (여러 장 업로드 / base64 JSON 포함). 기본값은 최대 배치(파일 수 x 1장 상한)가 들어가는 크기
+REQUEST_MAX_BYTES = int(
+    os.getenv("REQUEST_MAX_BYTES", WARDROBE_BATCH_MAX_FILES * UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES)
+)
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"업로드 크기가 너무 큽니다 (최대 {limit / 2**20:.0f}MB)")
+        self.limit = limit
+
+
+async def read_upload(file: UploadFile, limit: int = UPLOAD_MAX_BYTES) -> bytes:
+    # multipart 파싱 때 크기를 이미 알고 있으면 읽지 않고 거절
+    if file.size is not None and file.size > limit:
+        raise UploadTooLarge(limit)
+    content = await file.read(limit + 1)
+    if len(content) > limit:
+        raise UploadTooLarge(limit)
+    return content
+
+
+def b64decode_limited(data: str, limit: int = UPLOAD_MAX_BYTES) -> bytes:
+    if len(data) // 4 * 3 > limit + 2:
+        raise UploadTooLarge(limit)
+    content = base64.b64decode(data)
+    if len(content) > limit:
+        raise UploadTooLarge(limit)
+    return content
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class BodySizeLimitMiddleware:
+    """순수 ASGI 미들웨어 - 본문이 REQUEST_MAX_BYTES를 넘으면 413"""
+
+    def __init__(self, app, limit: int = REQUEST_MAX_BYTES):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope.get("headers", [])).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.limit:
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = rejected = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal rejected
+            if not exceeded:
+                await send(message)
+            elif message["type"] == "http.response.start" and not rejected:
+                # 본문 파싱 오류로 바뀐 앱의 응답(400 등) 대신 413
+                rejected = True
+                await self._reject(send)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not rejected:
+                rejected = True
+                await self._reject(send)
+
+    async def _reject(self, send) -> None:
+        # 다른 API 오류와 같은 FastAPI 형식 {"detail": ...}
+        body = json.dumps({"detail": str(UploadTooLarge(self.limit))}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
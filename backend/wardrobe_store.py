@@ -0,0 +1,249 @@
+"""
+서버 측 옷장 저장소 - /api/wardrobe/process 결과(컷아웃 PNG + 메타데이터)를 ID로 보관
+- 기본: SQLite + 로컬 파일 (이미지는 SHA-256 이름으로 저장 → 같은 컷아웃은 1벌만)
+- 선택: Supabase (테이블 + Storage 버킷), WARDROBE_STORE_BACKEND=supabase
+- 코디 요청은 ID만 보내고, 이미지는 LLM 입력 형태로 캐시(LLMImageCache)에서 꺼내 씀
+
+메서드는 모두 동기 → 핸들러에서는 asyncio.to_thread로 호출.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import imaging
+from storage import content_path
+
+_data_dir = Path(__file__).resolve().parent / ".data"
+
+WARDROBE_STORE_BACKEND = os.getenv("WARDROBE_STORE_BACKEND", "sqlite")
+WARDROBE_DB_PATH = os.getenv("WARDROBE_DB_PATH", str(_data_dir / "wardrobe.sqlite3"))
+WARDROBE_IMAGE_DIR = os.getenv("WARDROBE_IMAGE_DIR", str(_data_dir / "wardrobe"))
+WARDROBE_TABLE = os.getenv("WARDROBE_TABLE", "wardrobe_items")
+# LLM 입력으로 변환된 옷장 이미지 캐시 용량
+WARDROBE_IMAGE_CACHE_MB = float(os.getenv("WARDROBE_IMAGE_CACHE_MB", 64))
+
+
+@dataclass
+class WardrobeRecord:
+    id: str
+    item_type: str
+    image_sha256: str
+    image_url: Optional[str] = None
+    created_at: str = ""
+    metadata: dict = field(default_factory=dict)
+
+
+class WardrobeStore:
+    """저장소 공통 인터페이스"""
+
+    # 이미지를 보관하는 Storage 버킷 (Supabase 저장소만) - 업로드 큐가 같은 버킷에 올리면 put(image_queued=True)
+    bucket: Optional[str] = None
+
+    def put(
+        self, png: bytes, item_type: str, image_url: Optional[str] = None, metadata: Optional[dict] = None,
+        image_queued: bool = False,
+    ) -> WardrobeRecord:
+        """image_queued: 같은 버킷의 같은 경로로 업로드 큐(storage.UploadQueue)가 이미 올리는 중 → 이미지 업로드 생략"""
+        raise NotImplementedError
+
+    def get_many(self, ids: list[str]) -> dict[str, WardrobeRecord]:
+        raise NotImplementedError
+
+    def load_png(self, record: WardrobeRecord) -> bytes:
+        raise NotImplementedError
+
+    def load_image(self, sha: str) -> Optional[bytes]:
+        """image_sha256로 PNG 조회 (없으면 None) - /api/images 의 캐시 미스 폴백"""
+        raise NotImplementedError
+
+    def get(self, item_id: str) -> Optional[WardrobeRecord]:
+        return self.get_many([item_id]).get(item_id)
+
+    @staticmethod
+    def _new_record(png: bytes, item_type: str, image_url: Optional[str], metadata: Optional[dict]) -> WardrobeRecord:
+        return WardrobeRecord(
+            id=str(uuid.uuid4()),
+            item_type=item_type,
+            image_sha256=hashlib.sha256(png).hexdigest(),
+            image_url=image_url,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            metadata=metadata or {},
+        )
+
+
+class SQLiteWardrobeStore(WardrobeStore):
+    def __init__(self, db_path: str = WARDROBE_DB_PATH, image_dir: str = WARDROBE_IMAGE_DIR):
+        self._image_dir = Path(image_dir)
+        self._image_dir.mkdir(parents=True, exist_ok=True)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS wardrobe_items (
+                id TEXT PRIMARY KEY,
+                item_type TEXT NOT NULL,
+                image_sha256 TEXT NOT NULL,
+                image_url TEXT,
+                created_at TEXT NOT NULL,
+                metadata TEXT NOT NULL DEFAULT '{}'
+            )
+            """
+        )
+        self._db.commit()
+
+    def put(self, png, item_type, image_url=None, metadata=None, image_queued=False):
+        record = self._new_record(png, item_type, image_url, metadata)
+        path = self._image_dir / f"{record.image_sha256}.png"
+        if not path.exists():
+            tmp = path.with_suffix(f".{record.id}.tmp")
+            tmp.write_bytes(png)
+            os.replace(tmp, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO wardrobe_items VALUES (?, ?, ?, ?, ?, ?)",
+                (record.id, record.item_type, record.image_sha256, record.image_url,
+                 record.created_at, json.dumps(record.metadata, ensure_ascii=False)),
+            )
+            self._db.commit()
+        return record
+
+    def get_many(self, ids):
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, item_type, image_sha256, image_url, created_at, metadata "
+                f"FROM wardrobe_items WHERE id IN ({placeholders})",
+                list(ids),
+            ).fetchall()
+        return {
+            r[0]: WardrobeRecord(r[0], r[1], r[2], r[3], r[4], json.loads(r[5] or "{}"))
+            for r in rows
+        }
+
+    def load_png(self, record):
+        return (self._image_dir / f"{record.image_sha256}.png").read_bytes()
+
+    def load_image(self, sha):
+        try:
+            return (self._image_dir / f"{sha}.png").read_bytes()
+        except FileNotFoundError:
+            return None
+
+
+class SupabaseWardrobeStore(WardrobeStore):
+    """
+    메타데이터는 Supabase 테이블, 이미지는 Storage 버킷.
+    테이블 컬럼: id, item_type, image_sha256, image_url, created_at, metadata(jsonb)
+    """
+
+    def __init__(self, url: str, key: str, bucket: str, table: str = WARDROBE_TABLE):
+        from supabase import create_client
+
+        self._client = create_client(url, key)
+        self.bucket = bucket
+        self._table = table
+
+    def upload_image(self, sha: str, png: bytes) -> None:
+        """버킷의 콘텐츠 주소 경로(storage.content_path - 업로드 큐와 같은 규칙)에 PNG 보관"""
+        self._client.storage.from_(self.bucket).upload(
+            content_path(sha), png, {"content-type": "image/png", "upsert": "true"},
+        )
+
+    def put(self, png, item_type, image_url=None, metadata=None, image_queued=False):
+        record = self._new_record(png, item_type, image_url, metadata)
+        # 버킷에도 콘텐츠 주소 경로로 보관 (image_url이 사라져도 원본 복구 가능)
+        if not image_queued:
+            self.upload_image(record.image_sha256, png)
+        self._client.table(self._table).insert({
+            "id": record.id,
+            "item_type": record.item_type,
+            "image_sha256": record.image_sha256,
+            "image_url": record.image_url,
+            "created_at": record.created_at,
+            "metadata": record.metadata,
+        }).execute()
+        return record
+
+    def get_many(self, ids):
+        if not ids:
+            return {}
+        rows = self._client.table(self._table).select("*").in_("id", list(ids)).execute().data
+        return {
+            r["id"]: WardrobeRecord(
+                r["id"], r["item_type"], r["image_sha256"], r.get("image_url"),
+                r.get("created_at") or "", r.get("metadata") or {},
+            )
+            for r in rows
+        }
+
+    def load_png(self, record):
+        return self._client.storage.from_(self.bucket).download(content_path(record.image_sha256))
+
+    def load_image(self, sha):
+        try:
+            return self._client.storage.from_(self.bucket).download(content_path(sha))
+        except Exception:
+            return None
+
+
+def create_store() -> WardrobeStore:
+    if WARDROBE_STORE_BACKEND == "supabase":
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not key:
+            raise RuntimeError("WARDROBE_STORE_BACKEND=supabase 에는 SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY 필요")
+        return SupabaseWardrobeStore(url, key, os.getenv("SUPABASE_STORAGE_BUCKET", "wardrobe-images"))
+    return SQLiteWardrobeStore()
+
+
+# =============================================================================
+# LLM 입력 이미지 캐시 (디코딩 + 축소 + JPEG 재인코딩 결과)
+# =============================================================================
+
+class LLMImageCache:
+    """image_sha256 → imaging.EncodedImage, 바이트 상한 LRU"""
+
+    def __init__(self, max_bytes: int = int(WARDROBE_IMAGE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, imaging.EncodedImage] = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, sha: str) -> Optional[imaging.EncodedImage]:
+        with self._lock:
+            img = self._items.get(sha)
+            if img is not None:
+                self._items.move_to_end(sha)
+            self.stats["hits" if img is not None else "misses"] += 1
+            return img
+
+    def put(self, sha: str, img: imaging.EncodedImage) -> None:
+        with self._lock:
+            if sha in self._items or len(img.data) > self.max_bytes:
+                return
+            self._items[sha] = img
+            self._used += len(img.data)
+            while self._used > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._used -= len(evicted.data)
+
+    def resolve(self, store: WardrobeStore, record: WardrobeRecord) -> imaging.EncodedImage:
+        img = self.get(record.image_sha256)
+        if img is None:
+            img = imaging.llm_input(store.load_png(record))
+            self.put(record.image_sha256, img)
+        return img
@@ -0,0 +1,146 @@
+"""
+기동 워밍업 + 준비 상태(readiness) - 배포/오토스케일 직후 첫 요청이 모델 로드·무거운 import를 떠안지 않게
+- lifespan에서 등록된 단계(모델 세션 로드, 더미 추론, 클라이언트 생성 등)를 순서대로 실행하고 단계별 소요 시간 기록
+- GET /ready 는 워밍업이 끝나야 200 (GET /health 는 프로세스 생존만 확인)
+- WARMUP_MODE
+    background: 서버는 바로 요청을 받고 워밍업은 뒤에서 진행 (준비 전까지 /ready 503)
+    blocking:   워밍업이 끝난 뒤에 요청을 받기 시작 (readiness probe가 없는 환경용)
+    lazy:       워밍업 생략 - 기존처럼 첫 사용 시점에 로드 (메모리가 작은 배포용, /ready 는 바로 200)
+- 실패한 필수 단계는 뒤에서 지수 백오프로 다시 실행 (모델 다운로드 일시 실패 등 → 성공하면 /ready 200)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("core-d.warmup")
+
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")  # background | blocking | lazy
+# 실패한 필수 단계 재시도 간격 (첫 간격, 실패할 때마다 2배, 최대값)
+WARMUP_RETRY_BASE_SEC = float(os.getenv("WARMUP_RETRY_BASE_SEC", 5))
+WARMUP_RETRY_MAX_SEC = float(os.getenv("WARMUP_RETRY_MAX_SEC", 300))
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    fn: Callable[[], Awaitable[None]]
+    # 필수 단계가 실패하면 준비 상태가 되지 않음 (선택 단계 실패는 로그만 남기고 계속)
+    required: bool = True
+    status: str = "pending"  # pending | running | ok | failed | skipped
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+    def public(self) -> dict:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "required": self.required,
+            "elapsed_ms": self.elapsed_ms,
+            "error": self.error,
+            "attempts": self.attempts,
+        }
+
+
+class Warmup:
+    """이벤트 루프 스레드에서만 사용. step()으로 등록 후 lifespan에서 start()/stop()."""
+
+    def __init__(
+        self, mode: str = WARMUP_MODE, retry_base: float = WARMUP_RETRY_BASE_SEC, retry_max: float = WARMUP_RETRY_MAX_SEC
+    ):
+        self.mode = mode
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.steps: list[WarmupStep] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def step(self, name: str, fn: Callable[[], Awaitable[None]], required: bool = True) -> None:
+        self.steps.append(WarmupStep(name, fn, required))
+
+    @property
+    def ready(self) -> bool:
+        if self.mode == "lazy":
+            return True
+        return self.finished_at is not None and all(
+            s.status == "ok" for s in self.steps if s.required
+        )
+
+    async def start(self) -> None:
+        if self.mode == "lazy":
+            logger.info("WARMUP_MODE=lazy - 워밍업 생략")
+            for step in self.steps:
+                step.status = "skipped"
+            return
+        if self.mode == "blocking":
+            await self.run()
+            if self._failed_required():
+                self._task = asyncio.create_task(self.retry())
+        else:
+            self._task = asyncio.create_task(self._run_and_retry())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self) -> None:
+        """등록된 단계를 순서대로 1번씩 실행"""
+        self.started_at = time.perf_counter()
+        for step in self.steps:
+            await self._run_step(step)
+        self.finished_at = time.perf_counter()
+        logger.info("워밍업 완료 (%.0fms, ready=%s)", self.total_ms, self.ready)
+
+    async def retry(self) -> None:
+        """실패한 필수 단계를 모두 성공할 때까지 지수 백오프로 다시 실행"""
+        delay = self.retry_base
+        while failed := self._failed_required():
+            logger.info("워밍업 필수 단계 %s - %.0f초 후 재시도", [s.name for s in failed], delay)
+            await asyncio.sleep(delay)
+            for step in failed:
+                await self._run_step(step)
+            delay = min(delay * 2, self.retry_max)
+        logger.info("워밍업 재시도 완료 (ready=%s)", self.ready)
+
+    async def _run_and_retry(self) -> None:
+        await self.run()
+        await self.retry()
+
+    def _failed_required(self) -> list[WarmupStep]:
+        return [s for s in self.steps if s.required and s.status == "failed"]
+
+    async def _run_step(self, step: WarmupStep) -> None:
+        step.status, step.error = "running", None
+        step.attempts += 1
+        t0 = time.perf_counter()
+        try:
+            await step.fn()
+            step.status = "ok"
+        except Exception as e:
+            step.status, step.error = "failed", f"{type(e).__name__}: {e}"
+            log = logger.error if step.required else logger.warning
+            log("워밍업 단계 실패: %s (%s)", step.name, step.error)
+        step.elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        logger.info("워밍업 %s: %s %.0fms", step.name, step.status, step.elapsed_ms)
+
+    @property
+    def total_ms(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at or time.perf_counter()
+        return round((end - self.started_at) * 1000, 1)
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "total_ms": self.total_ms,
+            "steps": [s.public() for s in self.steps],
+        }
@@ -13,6 +13,48 @@ import CoordinateModal from "@/components/coordinate-modal";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? "http://localhost:8000";
 
+// 서버 1회 요청 최대 장 수 (backend WARDROBE_BATCH_MAX_FILES)
+const BATCH_MAX_FILES = 20;
+
+type BatchItem = {
+  success: boolean;
+  processed_image_url?: string | null;
+  processed_image_base64?: string | null;
+  image_url?: string | null;
+  item_type?: string | null;
+  item_id?: string | null;
+};
+
+/** POST /api/wardrobe/process-batch → SSE item 이벤트가 올 때마다 onItem 호출 */
+async function processBatch(files: File[], onItem: (item: BatchItem) => void): Promise<void> {
+  const formData = new FormData();
+  files.forEach((f) => formData.append("files", f));
+  const res = await fetch(`${API_URL}/api/wardrobe/process-batch`, {
+    method: "POST",
+    body: formData,
+  });
+  if (!res.ok || !res.body) {
+    const detail = await res.json().catch(() => null);
+    throw new Error(detail?.detail ?? `HTTP ${res.status}`);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep: number;
+    while ((sep = buffer.indexOf("\n\n")) >= 0) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = block.match(/^data: (.*)$/m)?.[1];
+      if (event === "item" && data) onItem(JSON.parse(data));
+    }
+  }
+}
+
 const ITEM_TYPE_BADGE: Record<string, string> = {
   아우터: "bg-gray-100 text-gray-600",
   이너: "bg-gray-100 text-gray-600",
@@ -69,30 +111,34 @@ export default function Home() {
     setUploadError(null);
     setUploadProgress({ current: 0, total: imageFiles.length });
 
-    for (let i = 0; i < imageFiles.length; i++) {
-      setUploadProgress({ current: i + 1, total: imageFiles.length });
-      const formData = new FormData();
-      formData.append("file", imageFiles[i]);
+    // 여러 장을 한 번에 보내고, 서버가 끝나는 순서대로 보내주는 결과(SSE item 이벤트)를 바로 저장
+    let done = 0;
+    const handleItem = (data: BatchItem) => {
+      done += 1;
+      setUploadProgress({ current: done, total: imageFiles.length });
+      if (!data.success) return;
+      // Supabase URL 우선, 없으면 백엔드 이미지 URL (GET /api/images/{sha}, 브라우저 캐시 가능)
+      const imageUrl =
+        data.image_url ?? (data.processed_image_url ? `${API_URL}${data.processed_image_url}` : null);
+      const newItem: WardrobeItem = {
+        id: data.item_id ?? crypto.randomUUID(),
+        image_url: imageUrl,
+        image_base64: imageUrl ? null : (data.processed_image_base64 ?? null),
+        item_type: data.item_type as WardrobeItem["item_type"],
+        created_at: new Date().toISOString(),
+        server_stored: Boolean(data.item_id),
+      };
+      saveToWardrobe(newItem);
+      setWardrobe(getWardrobe());
+    };
 
-      try {
-        const res = await fetch(`${API_URL}/api/wardrobe/process`, {
-          method: "POST",
-          body: formData,
-        });
-        const data = await res.json();
-        if (data.success) {
-          const newItem: WardrobeItem = {
-            id: crypto.randomUUID(),
-            image_url: data.image_url ?? null,
-            image_base64: data.image_url ? null : (data.processed_image_base64 ?? null),
-            item_type: data.item_type as WardrobeItem["item_type"],
-            created_at: new Date().toISOString(),
-          };
-          saveToWardrobe(newItem);
-        }
-      } catch (err) {
-        console.error("업로드 실패:", err);
+    try {
+      for (let start = 0; start < imageFiles.length; start += BATCH_MAX_FILES) {
+        await processBatch(imageFiles.slice(start, start + BATCH_MAX_FILES), handleItem);
       }
+    } catch (err) {
+      console.error("업로드 실패:", err);
+      setUploadError(err instanceof Error ? err.message : "업로드에 실패했습니다.");
     }
 
     setWardrobe(getWardrobe());
@@ -13,10 +13,17 @@ interface WardrobeItemInput {
   image_url: string | null;
   image_base64: string | null;
   item_type: string;
+  server_stored?: boolean;
 }
 
 interface CoordinateSession {
-  selected_item: { image_url: string | null; image_base64: string | null; item_type: string };
+  selected_item: {
+    id?: string;
+    server_stored?: boolean;
+    image_url: string | null;
+    image_base64: string | null;
+    item_type: string;
+  };
   wardrobe_items: WardrobeItemInput[];
   aesthetic: string;
   personal_color: string;
@@ -36,6 +43,7 @@ interface Coordination {
 interface ClosetResult {
   success: boolean;
   coordinations: Coordination[];
+  missing_item_ids?: string[];
   error?: string;
 }
 
@@ -143,9 +151,40 @@ export default function ClosetResultPage() {
     return "";
   };
 
+  const postCoordinate = async (payload: object): Promise<ClosetResult> => {
+    const res = await fetch(`${API_URL}/api/closet-coordinate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+    return res.json();
+  };
+
+  /** 모든 아이템이 서버 옷장에 있으면 이미지 없이 ID만 전송 */
+  const buildIdPayload = (sess: CoordinateSession) => {
+    const { selected_item: sel, wardrobe_items: items } = sess;
+    if (!sel.id || !sel.server_stored || !items.every((w) => w.server_stored)) return null;
+    return {
+      selected_item: { id: sel.id, item_type: sel.item_type },
+      wardrobe_item_ids: items.map((w) => w.id),
+      aesthetic: sess.aesthetic,
+      personal_color: sess.personal_color,
+    };
+  };
+
   const fetchCoordinate = async (sess: CoordinateSession) => {
     setLoading(true);
     try {
+      const idPayload = buildIdPayload(sess);
+      if (idPayload) {
+        const data = await postCoordinate(idPayload);
+        // 서버 옷장에 없는 아이템이 있으면 기존 base64 방식으로 재요청
+        if (!data.missing_item_ids?.length) {
+          setResult(data);
+          return;
+        }
+      }
+
       const [selectedBase64, ...wardrobeBase64List] = await Promise.all([
         resolveBase64(sess.selected_item),
         ...sess.wardrobe_items.map((w) => resolveBase64(w)),
@@ -162,13 +201,7 @@ export default function ClosetResultPage() {
         personal_color: sess.personal_color,
       };
 
-      const res = await fetch(`${API_URL}/api/closet-coordinate`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
-      });
-      const data: ClosetResult = await res.json();
-      setResult(data);
+      setResult(await postCoordinate(payload));
     } catch {
       setResult({ success: false, coordinations: [], error: "서버에 연결할 수 없습니다." });
     } finally {
@@ -24,6 +24,8 @@ export default function CoordinateModal({ item, wardrobe, onClose }: Props) {
       "core-d-coordinate",
       JSON.stringify({
         selected_item: {
+          id: item.id,
+          server_stored: item.server_stored ?? false,
           image_url: item.image_url ?? null,
           image_base64: item.image_base64 ?? null,
           item_type: item.item_type,
@@ -33,6 +35,7 @@ export default function CoordinateModal({ item, wardrobe, onClose }: Props) {
           image_url: w.image_url ?? null,
           image_base64: w.image_base64 ?? null,
           item_type: w.item_type,
+          server_stored: w.server_stored ?? false,
         })),
         aesthetic,
         personal_color: personalColor,
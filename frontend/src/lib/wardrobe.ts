@@ -1,9 +1,10 @@
 export interface WardrobeItem {
   id: string;
-  image_url: string | null;      // Supabase Storage URL (우선 사용)
+  image_url: string | null;      // Supabase Storage URL 또는 백엔드 /api/images URL (우선 사용)
   image_base64: string | null;   // 폴백용 base64 (Supabase 미설정 시)
   item_type: "아우터" | "이너" | "하의";
   created_at: string;
+  server_stored?: boolean;       // 서버 옷장에 저장됨 (id = 서버 ID, 코디 요청 시 이미지 대신 ID 전송)
 }
 
 /** 이미지 src 결정: URL 우선, 없으면 base64 data URI */